@@ -1,10 +1,15 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context, g, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS
 import jax
 import jax.numpy as jnp
 import optax
+from jax import lax
+from jax.experimental.compilation_cache import compilation_cache
+from jax.experimental.shard_map import shard_map
+from jax.sharding import Mesh, NamedSharding, PartitionSpec as P
 import numpy as np
-from typing import Dict, List, Tuple, Any
+from typing import Callable, Dict, List, Tuple, Any
 import logging
 import urllib.request
 import gzip
@@ -13,6 +18,27 @@ from pathlib import Path
 import zipfile
 import subprocess
 import json
+import re
+import functools
+from contextlib import contextmanager
+import threading
+import atexit
+import time
+
+import config
+from downloads import DownloadManager, DownloadError, load_manifest
+from jobs import Job, JobManager
+from dataset_cache import DatasetCache
+from readers import IDXReader, IDXDatasetSource, CSVDatasetSource
+from model_registry import ModelRegistry, DEFAULT_MODEL_ID
+from state_backend import create_state_backend
+from checkpoints import AUTO_TAG, CheckpointManager
+from distributed_training import DistributedTrainingManager
+from diagnostics import DiagnosticsCollector
+from metrics import MetricsRegistry, CompileTracker, EventRate
+from request_timing import RequestTimer
+from profiling import ProfilerManager
+from traffic_recording import TrafficRecorder
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -21,25 +47,299 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Vue.js frontend
 
+# Sampled per-step diagnostics (off unless enabled; see /diagnostics)
+diagnostics = DiagnosticsCollector(
+    enabled=config.DIAGNOSTICS_ENABLED,
+    sample_every=config.DIAGNOSTICS_SAMPLE_EVERY,
+    capacity=config.DIAGNOSTICS_BUFFER_SIZE
+)
+
+# Process metrics in the Prometheus text format (see /metrics)
+metrics = MetricsRegistry()
+compile_tracker = CompileTracker(metrics)
+compile_tracker.install()
+request_latency = metrics.histogram(
+    'http_request_duration_seconds', 'Request latency per route', ['route', 'method']
+)
+request_count = metrics.counter('http_requests_total', 'Requests per route and status', ['route', 'method', 'status'])
+request_errors = metrics.counter(
+    'http_request_errors_total', 'Responses with status >= 400 per route', ['route', 'method', 'status']
+)
+json_request_bytes = metrics.counter('json_request_bytes_total', 'Bytes of JSON request bodies parsed', ['route'])
+json_response_bytes = metrics.counter('json_response_bytes_total', 'Bytes of JSON responses serialised', ['route'])
+host_to_device_bytes = metrics.counter('host_to_device_bytes_total', 'Bytes copied from host memory to JAX devices')
+training_steps = metrics.counter('training_steps_total', 'Training steps taken, per kind of step', ['kind'])
+training_step_rate = EventRate(config.METRICS_RATE_WINDOW)
+metrics.gauge('training_steps_per_second', f'Training steps per second over the last {config.METRICS_RATE_WINDOW:g}s',
+              function=training_step_rate.rate)
+
+# Opt-in per-request phase timing, reported in Server-Timing headers (see /timing)
+request_timer = RequestTimer(enabled=config.SERVER_TIMING_ENABLED, history=config.SERVER_TIMING_HISTORY)
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Charges request JSON parsing and response serialisation to the timed request's phases"""
+    
+    def loads(self, s, **kwargs):
+        with request_timer.phase('parse'):
+            return super().loads(s, **kwargs)
+    
+    def dumps(self, obj, **kwargs):
+        with request_timer.phase('serialize'):
+            return super().dumps(obj, **kwargs)
+
+app.json = TimedJSONProvider(app)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    # Timed while enabled, or on request with an `X-Server-Timing: 1` header
+    request_timer.begin(request.headers.get('X-Server-Timing', '').lower() in ('1', 'true'))
+    # Profiled (cProfile on this thread) while a profiling session wants this route
+    g.request_profile = profiler.begin_request(request.url_rule.rule if request.url_rule is not None else 'unmatched')
+
+@app.teardown_request
+def finish_request_profile(exc):
+    # A teardown hook runs even when the handler raised (after_request may not), so cProfile is always disabled
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    profiler.end_request(g.pop('request_profile', None), route)
+
+@app.after_request
+def record_request_metrics(response):
+    # Streamed responses are timed up to their first byte
+    route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    server_timing = request_timer.finish(route)
+    if server_timing is not None:
+        response.headers['Server-Timing'] = server_timing
+        # Lets the (cross-origin) frontend read the phases through the Performance API
+        response.headers['Timing-Allow-Origin'] = '*'
+    started = g.get('request_started')
+    if started is not None:
+        request_latency.observe(time.perf_counter() - started, route=route, method=request.method)
+    request_count.inc(route=route, method=request.method, status=response.status_code)
+    if response.status_code >= 400:
+        request_errors.inc(route=route, method=request.method, status=response.status_code)
+    if request.is_json and request.content_length:
+        json_request_bytes.inc(request.content_length, route=route)
+    if response.mimetype == 'application/json' and response.content_length:
+        json_response_bytes.inc(response.content_length, route=route)
+    if traffic_recorder.active and started is not None and not route.startswith('/traffic'):
+        traffic_recorder.record(
+            method=request.method,
+            path=request.path,
+            route=route,
+            query=request.query_string.decode('utf-8', 'replace'),
+            status=response.status_code,
+            duration=time.perf_counter() - started,
+            request_bytes=request.content_length or 0,
+            response_bytes=response.content_length or 0,
+            # Already parsed (and cached) by the handler for JSON requests
+            body=request.get_json(silent=True) if request.is_json else None
+        )
+    return response
+
+def to_device(array: np.ndarray) -> jnp.ndarray:
+    """Copy a host array to the default device, counting the transfer"""
+    host_to_device_bytes.inc(array.nbytes)
+    with request_timer.phase('transfer'):
+        device_array = jnp.asarray(array)
+        if request_timer.active():
+            device_array.block_until_ready()
+    return device_array
+
+def request_array(value, dtype=None) -> jnp.ndarray:
+    """A request's JSON value (nested lists) as a device array.
+    
+    Through numpy: jnp.array() on nested lists converts element by element and dominates small requests.
+    """
+    with request_timer.phase('parse'):
+        array = np.asarray(value, dtype=dtype)
+    return to_device(array)
+
+def to_list(array) -> Any:
+    """A device (or numpy) array as nested lists for a JSON response"""
+    if request_timer.active() and isinstance(array, jax.Array):
+        with request_timer.phase('sync'):
+            array.block_until_ready()
+    with request_timer.phase('convert'):
+        # Through a transient host view: jax.Array.tolist() keeps a host copy on the array, and a buffer with
+        # outside references is copied rather than donated to the next train step
+        return np.asarray(array).tolist()
+
+def instrument_kernel(name: str, fn: Callable) -> Callable:
+    """Wrap a calculator kernel: its compilations are reported under `name` and timed requests charge it to compute"""
+    return compile_tracker.track(name, request_timer.time_kernel(fn))
+
+def count_training_steps(kind: str, steps: int = 1):
+    training_steps.inc(steps, kind=kind)
+    training_step_rate.mark(steps)
+
 # JAX configuration
 jax.config.update("jax_enable_x64", True)  # Use 64-bit precision
 
-# Global model state for persistent storage
-model_state = {
-    'weights': None,
-    'biases': None,
-    'training_history': [],
-    'current_epoch': 0,
-    'is_training': False,
-    'last_loss': 0.0,
-    'last_train_accuracy': 0.0,
-    'last_test_accuracy': 0.0,
-    'last_gradient_norm': 0.0,
-    'use_ternary_weights': True,
-    'weight_distribution': None,
-    'optimizer': None,
-    'opt_state': None
-}
+def enable_compilation_cache(cache_dir: str):
+    """Persist compiled XLA executables on disk so restarts and new workers skip recompilation.
+    
+    jax only uses the cache on GPU and TPU, so it is not set up on CPU, where every process
+    compiles its kernels (see warm_up_kernels). Must run after configure_host_devices, as
+    checking the backend initializes it.
+    """
+    if not cache_dir or jax.default_backend() == 'cpu':
+        return
+    jax.config.update('jax_persistent_cache_min_compile_time_secs', 0)
+    compilation_cache.initialize_cache(cache_dir)
+
+def configure_host_devices(count: int):
+    """Split the host CPU into `count` XLA devices for data-parallel training"""
+    if count > 1 and '--xla_force_host_platform_device_count' not in os.environ.get('XLA_FLAGS', ''):
+        os.environ['XLA_FLAGS'] = (os.environ.get('XLA_FLAGS', '') +
+                                   f' --xla_force_host_platform_device_count={count}').strip()
+
+configure_host_devices(config.HOST_DEVICE_COUNT)
+enable_compilation_cache(config.JAX_CACHE_DIR)
+
+def batch_bucket(batch_size: int, buckets: List[int] = None) -> int:
+    """Smallest bucket holding batch_size; bigger batches round up to a multiple of the largest bucket"""
+    buckets = config.BATCH_BUCKETS if buckets is None else buckets
+    if not buckets:
+        return batch_size
+    for bucket in buckets:
+        if batch_size <= bucket:
+            return bucket
+    return -(-batch_size // buckets[-1]) * buckets[-1]
+
+def pad_batch(batch_features: jnp.ndarray, batch_labels: jnp.ndarray,
+              multiple: int = 1) -> Tuple[jnp.ndarray, jnp.ndarray, jnp.ndarray]:
+    """Pad a batch to its bucket (and a multiple of `multiple`) by repeating the first sample.
+    
+    Returns the padded features and labels and a mask of the real samples; the
+    loss kernels leave masked rows out, so every batch size in a bucket shares
+    one compilation.
+    """
+    batch_size = batch_features.shape[0]
+    padded_size = batch_bucket(batch_size)
+    padded_size += -padded_size % multiple
+    padding = padded_size - batch_size if batch_size else 0
+    mask = jnp.arange(batch_size + padding) < batch_size
+    if padding:
+        batch_features = jnp.concatenate([batch_features, jnp.repeat(batch_features[:1], padding, axis=0)])
+        batch_labels = jnp.concatenate([batch_labels, jnp.repeat(batch_labels[:1], padding, axis=0)])
+    return batch_features, batch_labels, mask
+
+def new_model_state() -> Dict[str, Any]:
+    """Fresh training state for one model in the registry"""
+    return {
+        'weights': None,
+        'biases': None,
+        'training_history': [],
+        'current_epoch': 0,
+        'is_training': False,
+        'last_loss': 0.0,
+        'last_train_accuracy': 0.0,
+        'last_test_accuracy': 0.0,
+        'last_gradient_norm': 0.0,
+        'use_ternary_weights': True,
+        'weight_distribution': None,
+        'optimizer': None,
+        'optimizer_config': None,
+        'opt_state': None,
+        'model_version': 0,  # Incremented whenever weights or biases change
+        'state_revision': 0,  # Revision last read from or written to the shared state backend
+        'last_checkpoint_step': 0,
+        'evaluation_cache': {}
+    }
+
+def build_lr_schedule(optimizer_config: Dict[str, Any]):
+    """Constant learning rate or optax schedule (optional linear warmup, then constant, cosine or step decay)"""
+    learning_rate = optimizer_config['learning_rate']
+    schedule = optimizer_config.get('lr_schedule', 'constant')
+    warmup_steps = int(optimizer_config.get('warmup_steps', 0))
+    
+    if schedule == 'constant':
+        decay = None
+    elif schedule == 'cosine':
+        decay_steps = int(optimizer_config.get('decay_steps', 1000))
+        end_learning_rate = optimizer_config.get('end_learning_rate', 0.0)
+        decay = optax.cosine_decay_schedule(
+            learning_rate, decay_steps, alpha=end_learning_rate / learning_rate if learning_rate else 0.0
+        )
+    elif schedule == 'step':
+        decay = optax.exponential_decay(
+            learning_rate, transition_steps=int(optimizer_config.get('step_size', 100)),
+            decay_rate=optimizer_config.get('decay_rate', 0.5), staircase=True
+        )
+    else:
+        raise ValueError(f'Unknown learning rate schedule: {schedule}. Use constant, cosine or step')
+    
+    if warmup_steps <= 0:
+        return decay if decay is not None else learning_rate
+    warmup = optax.linear_schedule(0.0, learning_rate, warmup_steps)
+    if decay is None:
+        return warmup
+    return optax.join_schedules([warmup, decay], [warmup_steps])
+
+def _adam_l2(learning_rate, weight_decay):
+    # L2 penalty added to the gradient (optax.adam itself has no weight_decay argument)
+    return optax.chain(optax.add_decayed_weights(weight_decay), optax.adam(learning_rate=learning_rate))
+
+def build_optimizer(optimizer_config: Dict[str, Any]):
+    """Optax optimizer for a config dict, so every worker can rebuild the same optimizer.
+    
+    Hyperparameters are injected into the optimizer state rather than baked into
+    the update function, so changing the learning rate does not recompile the train
+    step. With accumulation_steps > 1 gradients of that many micro-batches are
+    averaged (optax.MultiSteps) before each update.
+    """
+    optimizer_type = optimizer_config['optimizer_type']
+    learning_rate = build_lr_schedule(optimizer_config)
+    momentum = optimizer_config.get('momentum', 0.0)
+    weight_decay = optimizer_config.get('weight_decay', 0.0)
+    accumulation_steps = int(optimizer_config.get('accumulation_steps', 1))
+    
+    if optimizer_type == 'sgd':
+        if momentum > 0:
+            optimizer = optax.inject_hyperparams(optax.sgd)(learning_rate=learning_rate, momentum=momentum)
+        else:
+            optimizer = optax.inject_hyperparams(optax.sgd)(learning_rate=learning_rate)
+    elif optimizer_type == 'adam':
+        if weight_decay > 0:
+            optimizer = optax.inject_hyperparams(_adam_l2)(learning_rate=learning_rate, weight_decay=weight_decay)
+        else:
+            optimizer = optax.inject_hyperparams(optax.adam)(learning_rate=learning_rate)
+    elif optimizer_type == 'adamw':
+        optimizer = optax.inject_hyperparams(optax.adamw)(learning_rate=learning_rate, weight_decay=weight_decay)
+    else:
+        raise ValueError(f'Unknown optimizer type: {optimizer_type}')
+    
+    if accumulation_steps > 1:
+        return optax.MultiSteps(optimizer, every_k_schedule=accumulation_steps)
+    return optimizer
+
+def optimizer_structure_key(optimizer_config: Dict[str, Any]) -> str:
+    """Identifies optimizers that share a compiled train step (same update function, any injected hyperparameters)"""
+    key = {name: value for name, value in optimizer_config.items()
+           if name not in ('learning_rate', 'momentum', 'weight_decay')}
+    key['momentum'] = optimizer_config.get('momentum', 0.0) > 0
+    key['weight_decay'] = optimizer_config.get('weight_decay', 0.0) > 0
+    if callable(build_lr_schedule(optimizer_config)):
+        # Schedules are traced into the step, so their learning rate is part of the compiled function
+        key['learning_rate'] = optimizer_config['learning_rate']
+    return json.dumps(key, sort_keys=True)
+
+def train_step_devices(optimizer_config: Dict[str, Any]) -> int:
+    """Number of devices an optimizer config trains on (1 unless data_parallel is set)"""
+    if not optimizer_config.get('data_parallel'):
+        return 1
+    return optimizer_config.get('num_devices') or jax.local_device_count()
+
+def optimizer_progress(opt_state) -> Dict[str, Any]:
+    """Current learning rate and gradient accumulation position from an optimizer state"""
+    accumulating = isinstance(opt_state, optax.MultiStepsState)
+    inner_state = opt_state.inner_opt_state if accumulating else opt_state
+    return {
+        'learning_rate': float(inner_state.hyperparams['learning_rate']),
+        'accumulation_step': int(opt_state.mini_step) if accumulating else 0,
+        'optimizer_steps': int(opt_state.gradient_step if accumulating else inner_state.count)
+    }
 
 class JAXMNISTCalculator:
     """High-performance MNIST calculations using JAX"""
@@ -62,6 +362,35 @@ class JAXMNISTCalculator:
             'tanh': self._tanh,
             'linear': self._linear
         }
+        
+        # Compiled per-chunk evaluation kernel (one compilation per metric/activation/chunk shape)
+        self._evaluate_chunk_jit = instrument_kernel('evaluate_chunk', jax.jit(
+            self._evaluate_chunk, static_argnames=('similarity_metric', 'activation_function')
+        ))
+        self._forward_chunk_jit = instrument_kernel('forward_chunk', jax.jit(
+            self._forward_chunk, static_argnames=('similarity_metric', 'activation_function')
+        ))
+        
+        # Compiled single-sample forward pass and loss/gradient kernels (one compilation per
+        # metric/activation/batch shape; warmed up at startup for the configured buckets)
+        self._forward_jit = instrument_kernel('forward', jax.jit(
+            self._forward_pass_internal, static_argnames=('similarity_metric', 'activation_function')
+        ))
+        self._loss_and_grad_jit = instrument_kernel('loss_and_grad', jax.jit(
+            jax.value_and_grad(self.compute_loss, argnums=(0, 1)),
+            static_argnames=('similarity_metric', 'activation_function')
+        ))
+        self._optax_loss_and_grad_jit = instrument_kernel('optax_loss_and_grad', jax.jit(
+            jax.value_and_grad(self.compute_optax_loss), static_argnames=('similarity_metric',)
+        ))
+        # Multi-metric diagnostics kernels (see multi_metric_scores)
+        self._multi_metric_diagnostics_jit = instrument_kernel('multi_metric_diagnostics', jax.jit(
+            self._multi_metric_diagnostics, static_argnames=('similarity_metrics', 'activation_function')
+        ))
+        self._similarity_report_jit = instrument_kernel('similarity_report', jax.jit(self._similarity_report))
+        # Fused optax train steps, one per optimizer structure (see optax_train_step)
+        self._train_steps = {}
+        self._sweep_runs = {}
     
     # Similarity functions
     def _dot_product(self, weights: jnp.ndarray, features: jnp.ndarray) -> jnp.ndarray:
@@ -224,23 +553,23 @@ class JAXMNISTCalculator:
                     similarity_metric: str, activation_function: str) -> Dict[str, Any]:
         """Perform forward pass through the network (external API)"""
         
-        scores, activations = self._forward_pass_internal(weights, biases, features, similarity_metric, activation_function)
+        scores, activations = self._forward_jit(weights, biases, features, similarity_metric, activation_function)
         
         # Get prediction
         predicted_class = jnp.argmax(activations)
         confidence = jnp.max(activations)
         
         return {
-            'scores': scores.tolist(),
-            'activations': activations.tolist(),
+            'scores': to_list(scores),
+            'activations': to_list(activations),
             'predicted_class': int(predicted_class),
             'confidence': float(confidence)
         }
     
     def compute_loss(self, weights: jnp.ndarray, biases: jnp.ndarray, 
                     batch_features: jnp.ndarray, batch_labels: jnp.ndarray,
-                    similarity_metric: str, activation_function: str) -> float:
-        """Compute categorical cross-entropy loss for a batch"""
+                    similarity_metric: str, activation_function: str, mask: jnp.ndarray = None) -> float:
+        """Compute categorical cross-entropy loss for a batch (over the rows in `mask`, if given)"""
         
         def single_sample_loss(features, label):
             scores, activations = self._forward_pass_internal(weights, biases, features, similarity_metric, activation_function)
@@ -256,17 +585,20 @@ class JAXMNISTCalculator:
         
         # Vectorize the loss computation
         losses = jax.vmap(single_sample_loss)(batch_features, batch_labels)
-        mean_loss = jnp.mean(losses)
+        if mask is None:
+            mean_loss = jnp.mean(losses)
+        else:
+            mean_loss = jnp.sum(jnp.where(mask, losses, 0.0)) / jnp.sum(mask)
         
         # Check for NaN or infinity
         mean_loss = jnp.where(jnp.isnan(mean_loss) | jnp.isinf(mean_loss), 1000.0, mean_loss)
             
         return mean_loss
     
-    def compute_optax_loss(self, params: Tuple[jnp.ndarray, jnp.ndarray], 
-                          batch_features: jnp.ndarray, batch_labels: jnp.ndarray,
-                          similarity_metric: str) -> float:
-        """Compute softmax cross-entropy loss using Optax for a batch"""
+    def _optax_sample_losses(self, params: Tuple[jnp.ndarray, jnp.ndarray],
+                             batch_features: jnp.ndarray, batch_labels: jnp.ndarray,
+                             similarity_metric: str) -> jnp.ndarray:
+        """Per-sample softmax cross-entropy losses"""
         weights, biases = params
         
         def get_logits(features):
@@ -283,9 +615,18 @@ class JAXMNISTCalculator:
         # Convert labels to one-hot
         one_hot_labels = jax.nn.one_hot(batch_labels, num_classes=10)
         
+        return optax.softmax_cross_entropy(logits=logits, labels=one_hot_labels)
+    
+    def compute_optax_loss(self, params: Tuple[jnp.ndarray, jnp.ndarray], 
+                          batch_features: jnp.ndarray, batch_labels: jnp.ndarray,
+                          similarity_metric: str, mask: jnp.ndarray = None) -> float:
+        """Compute softmax cross-entropy loss using Optax for a batch (over the rows in `mask`, if given)"""
         # Compute softmax cross-entropy loss
-        loss = optax.softmax_cross_entropy(logits=logits, labels=one_hot_labels)
-        mean_loss = jnp.mean(loss)
+        loss = self._optax_sample_losses(params, batch_features, batch_labels, similarity_metric)
+        if mask is None:
+            mean_loss = jnp.mean(loss)
+        else:
+            mean_loss = jnp.sum(jnp.where(mask, loss, 0.0)) / jnp.sum(mask)
         
         # Check for NaN or infinity
         mean_loss = jnp.where(jnp.isnan(mean_loss) | jnp.isinf(mean_loss), 1000.0, mean_loss)
@@ -303,13 +644,11 @@ class JAXMNISTCalculator:
         batch_features = batch_features.astype(jnp.float64)
         batch_labels = batch_labels.astype(jnp.int32)  # Labels should be integers
         
-        def loss_fn(params):
-            w, b = params
-            return self.compute_loss(w, b, batch_features, batch_labels, similarity_metric, activation_function)
-        
-        # Compute gradients
-        grad_fn = jax.grad(loss_fn)
-        gradients = grad_fn((weights, biases))
+        # Compute loss and gradients on the batch padded to its bucket (one compilation per bucket)
+        padded_features, padded_labels, mask = pad_batch(batch_features, batch_labels)
+        loss_value, gradients = self._loss_and_grad_jit(
+            weights, biases, padded_features, padded_labels, similarity_metric, activation_function, mask=mask
+        )
         
         weight_gradients, bias_gradients = gradients
         
@@ -325,55 +664,29 @@ class JAXMNISTCalculator:
             logger.warning(f"NaN or infinity detected in bias gradients for {similarity_metric}, using zeros")
             bias_gradients = jnp.zeros_like(biases)
         
-        # Log gradient statistics for debugging
         weight_grad_norm = jnp.linalg.norm(weight_gradients)
         bias_grad_norm = jnp.linalg.norm(bias_gradients)
         
-        if similarity_metric == 'yatProduct':
-            logger.info(f"YAT Product Gradients - Weight norm: {weight_grad_norm:.6f}, "
-                       f"Bias norm: {bias_grad_norm:.6f}, "
-                       f"Has NaN: weight={weight_has_nan}, bias={bias_has_nan}")
-            
-            # Check individual gradient components for YAT
-            weight_grad_max = jnp.max(jnp.abs(weight_gradients))
-            weight_grad_mean = jnp.mean(jnp.abs(weight_gradients))
-            logger.info(f"YAT Weight gradient stats - Max: {weight_grad_max:.6f}, Mean: {weight_grad_mean:.6f}")
-            
-            # Debug: Check YAT scores and predictions for first sample
-            if batch_features.shape[0] > 0:
-                first_sample = batch_features[0]
-                first_label = batch_labels[0]
-                
-                # Get YAT scores
-                yat_scores = calculator._yat_product(weights, first_sample)
-                logger.info(f"YAT Scores for sample 0 - Min: {jnp.min(yat_scores):.6f}, "
-                           f"Max: {jnp.max(yat_scores):.6f}, "
-                           f"Range: {jnp.max(yat_scores) - jnp.min(yat_scores):.6f}, "
-                           f"Mean: {jnp.mean(yat_scores):.6f}")
-                logger.info(f"Raw YAT scores (before activation): {[f'{x:.6f}' for x in yat_scores]}")
-                
-                # Also show what happens after adding biases (this is what goes into softmax)
-                scores_with_bias = yat_scores + biases
-                logger.info(f"YAT scores + biases (input to softmax): {[f'{x:.6f}' for x in scores_with_bias]}")
-                
-                # Get full forward pass prediction
-                forward_result = calculator.forward_pass(weights, biases, first_sample, similarity_metric, 'softmax')
-                predicted_class = forward_result['predicted_class']
-                confidence = forward_result['confidence']
-                
-                logger.info(f"YAT Prediction - True label: {first_label}, Predicted: {predicted_class}, "
-                           f"Confidence: {confidence:.4f}")
-                logger.info(f"YAT Activations (all {len(forward_result['activations'])} classes): {[f'{x:.4f}' for x in forward_result['activations']]}")
-                
-                # Check weight distribution
-                nonzero_weights = jnp.sum(jnp.abs(weights) > 1e-8)
-                total_weights = weights.size
-                logger.info(f"Weight stats - Non-zero: {nonzero_weights}/{total_weights} ({100*nonzero_weights/total_weights:.1f}%)")
-                logger.info(f"Model dimensions - Weights: {weights.shape}, Biases: {biases.shape}, Classes: {weights.shape[0]}")
-                
-                # Check dot products
-                dot_products = jnp.dot(weights, first_sample)
-                logger.info(f"Dot products (all {len(dot_products)} classes): {dot_products.tolist()}")
+        # YAT debugging values for the first sample, only on sampled steps (see /diagnostics)
+        if similarity_metric == 'yatProduct' and batch_features.shape[0] > 0 and diagnostics.sample('yat_gradients'):
+            first_sample = batch_features[0]
+            scores, activations = self._forward_jit(weights, biases, first_sample, similarity_metric, 'softmax')
+            diagnostics.record('yat_gradients', {
+                'weight_gradient_norm': weight_grad_norm,
+                'bias_gradient_norm': bias_grad_norm,
+                'weight_gradient_max': jnp.max(jnp.abs(weight_gradients)),
+                'weight_gradient_mean': jnp.mean(jnp.abs(weight_gradients)),
+                'has_nan': {'weight': bool(weight_has_nan), 'bias': bool(bias_has_nan)},
+                'label': batch_labels[0],
+                'yat_scores': scores,
+                'scores_with_bias': scores + biases,
+                'activations': activations,
+                'predicted_class': jnp.argmax(activations),
+                'confidence': jnp.max(activations),
+                'dot_products': jnp.dot(weights, first_sample),
+                'nonzero_weights': jnp.sum(jnp.abs(weights) > 1e-8),
+                'total_weights': int(weights.size)
+            })
         
         # Apply gradient clipping for stability
         max_norm = 1.0
@@ -385,13 +698,132 @@ class JAXMNISTCalculator:
         if bias_grad_norm > max_norm:
             bias_gradients = bias_gradients * (max_norm / bias_grad_norm)
         
-        # Compute loss separately to avoid tracing issues
-        loss_value = self.compute_loss(weights, biases, batch_features, batch_labels, similarity_metric, activation_function)
-        
         return {
-            'weight_gradients': weight_gradients.tolist(),
-            'bias_gradients': bias_gradients.tolist(),
-            'loss': loss_value.tolist() if hasattr(loss_value, 'tolist') else float(loss_value)
+            'weight_gradients': to_list(weight_gradients),
+            'bias_gradients': to_list(bias_gradients),
+            'loss': to_list(loss_value) if hasattr(loss_value, 'tolist') else float(loss_value)
+        }
+    
+    def similarity_statistics(self, weights: jnp.ndarray, batch_features: jnp.ndarray,
+                              with_l1: bool = False) -> Dict[str, jnp.ndarray]:
+        """Terms every similarity metric is built from: x·w, ||x||², ||w||² (and the L1 distance for manhattan)"""
+        statistics = {
+            'dot': batch_features @ weights.T,
+            'features_sq': jnp.sum(batch_features ** 2, axis=-1),
+            'weights_sq': jnp.sum(weights ** 2, axis=-1)
+        }
+        if with_l1:
+            statistics['l1'] = jnp.sum(jnp.abs(batch_features[:, None, :] - weights[None, :, :]), axis=-1)
+        return statistics
+    
+    def scores_from_statistics(self, statistics: Dict[str, jnp.ndarray],
+                               similarity_metrics: Tuple[str, ...]) -> Dict[str, jnp.ndarray]:
+        """Scores (batch, classes) of several similarity metrics from shared statistics (see similarity_statistics)"""
+        dot = statistics['dot']
+        features_sq = statistics['features_sq'][:, None]
+        weights_sq = statistics['weights_sq'][None, :]
+        # ||x - w||², clamped against rounding below zero
+        distance_sq = jnp.maximum(features_sq + weights_sq - 2 * dot, 0.0)
+        
+        scores = {}
+        for metric in similarity_metrics:
+            if metric == 'dotProduct':
+                scores[metric] = dot
+            elif metric == 'euclidean':
+                scores[metric] = -jnp.sqrt(distance_sq)
+            elif metric == 'cosine':
+                scores[metric] = dot / (jnp.sqrt(weights_sq) * jnp.sqrt(features_sq) + 1e-8)
+            elif metric == 'manhattan':
+                scores[metric] = -statistics['l1']
+            elif metric == 'rbf':
+                scores[metric] = jnp.exp(-distance_sq)
+            elif metric == 'yatProduct':
+                scores[metric] = (dot ** 2) / (distance_sq + 1e-3) * 100
+            else:
+                raise ValueError(f"Unknown similarity metric: {metric}")
+        return scores
+    
+    def multi_metric_scores(self, weights: jnp.ndarray, batch_features: jnp.ndarray,
+                            similarity_metrics: Tuple[str, ...]) -> Tuple[Dict[str, jnp.ndarray], Dict[str, jnp.ndarray]]:
+        """Scores of several similarity metrics computed from one set of shared statistics"""
+        statistics = self.similarity_statistics(weights, batch_features, 'manhattan' in similarity_metrics)
+        return self.scores_from_statistics(statistics, similarity_metrics), statistics
+    
+    def _multi_metric_diagnostics(self, weights: jnp.ndarray, biases: jnp.ndarray, batch_features: jnp.ndarray,
+                                  batch_labels: jnp.ndarray, similarity_metrics: Tuple[str, ...],
+                                  activation_function: str, max_grad_norm: float = 1.0) -> Dict[str, Any]:
+        """Loss and (clipped) gradients of compute_loss for several metrics in one pass.
+        
+        Each metric's loss is differentiated with respect to the shared statistics
+        only (so a metric whose activations overflow cannot leak NaNs into the
+        others); the chain rule back to the weights is then one einsum for all metrics.
+        """
+        activation_fn = jax.vmap(self.activation_functions[activation_function])
+        one_hot = jax.nn.one_hot(batch_labels, weights.shape[0])
+        with_l1 = 'manhattan' in similarity_metrics
+        statistics = self.similarity_statistics(weights, batch_features, with_l1)
+        features_sq = statistics.pop('features_sq')  # Does not depend on the weights
+        
+        def metric_loss(statistics, metric):
+            scores = self.scores_from_statistics(dict(statistics, features_sq=features_sq), (metric,))[metric]
+            activations = jnp.clip(activation_fn(scores), 1e-8, 1.0 - 1e-8)
+            loss = jnp.mean(-jnp.sum(one_hot * jnp.log(activations), axis=-1))
+            return jnp.where(jnp.isnan(loss) | jnp.isinf(loss), 1000.0, loss)
+        
+        losses, statistic_gradients = zip(*[jax.value_and_grad(metric_loss)(statistics, metric)
+                                             for metric in similarity_metrics])
+        stacked = {key: jnp.stack([gradients[key] for gradients in statistic_gradients]) for key in statistics}
+        # d(x·w)/dw = x, d||w||²/dw = 2w, d|w - x|/dw = sign(w - x)
+        weight_gradients = (jnp.einsum('mbc,bd->mcd', stacked['dot'], batch_features)
+                            + 2 * stacked['weights_sq'][:, :, None] * weights[None])
+        if with_l1:
+            weight_gradients += jnp.einsum('mbc,bcd->mcd', stacked['l1'],
+                                           jnp.sign(weights[None, :, :] - batch_features[:, None, :]))
+        
+        def clean(gradients):
+            # Same treatment as compute_gradients: non-finite gradients become zeros, then clip the norm
+            gradients = jnp.where(jnp.any(~jnp.isfinite(gradients)), jnp.zeros_like(gradients), gradients)
+            norm = jnp.linalg.norm(gradients)
+            return jnp.where(norm > max_grad_norm, gradients * (max_grad_norm / norm), gradients)
+        
+        weight_gradients = jax.vmap(clean)(weight_gradients)
+        return {
+            'loss': jnp.stack(losses),
+            'weight_gradient_norm': jnp.sqrt(jnp.sum(weight_gradients ** 2, axis=(1, 2))),
+            'weight_gradient_max': jnp.max(jnp.abs(weight_gradients), axis=(1, 2)),
+            'weight_gradient_mean': jnp.mean(jnp.abs(weight_gradients), axis=(1, 2)),
+            # Biases do not enter the scores (see _forward_pass_internal), so their gradient is zero
+            'bias_gradient_norm': jnp.zeros(len(similarity_metrics))
+        }
+    
+    def multi_metric_diagnostics(self, weights: jnp.ndarray, biases: jnp.ndarray, batch_features: jnp.ndarray,
+                                 batch_labels: jnp.ndarray, similarity_metrics: List[str],
+                                 activation_function: str) -> Dict[str, Dict[str, float]]:
+        """Per-metric loss and gradient statistics (see _multi_metric_diagnostics)"""
+        metrics = tuple(similarity_metrics)
+        result = self._multi_metric_diagnostics_jit(
+            weights.astype(jnp.float64), biases.astype(jnp.float64), batch_features.astype(jnp.float64),
+            batch_labels.astype(jnp.int32), similarity_metrics=metrics, activation_function=activation_function
+        )
+        result = {key: np.asarray(value) for key, value in result.items()}
+        return {metric: {key: float(values[i]) for key, values in result.items()} for i, metric in enumerate(metrics)}
+    
+    def _similarity_report(self, weights: jnp.ndarray, features: jnp.ndarray) -> Dict[str, jnp.ndarray]:
+        """YAT, dot and euclidean scores of one sample plus the values /test_yat reports about them"""
+        scores, statistics = self.multi_metric_scores(weights, features[None, :],
+                                                      ('yatProduct', 'dotProduct', 'euclidean'))
+        dot = statistics['dot'][0]
+        # Measured directly rather than from the shared terms, so the formula check stays independent
+        distance_sq = jnp.sum((weights - features) ** 2, axis=-1)
+        return {
+            'yat_scores': scores['yatProduct'][0],
+            'yat_scores_old_formula': dot ** 2 / (distance_sq + 1e-3),
+            'dot_scores': scores['dotProduct'][0],
+            'euclidean_scores': scores['euclidean'][0],
+            'dot_products': dot,
+            'euclidean_distances': jnp.sqrt(distance_sq),
+            'weights_norm': jnp.sqrt(jnp.sum(statistics['weights_sq'])),
+            'features_norm': jnp.sqrt(statistics['features_sq'][0])
         }
     
     def compute_optax_gradients(self, params: Tuple[jnp.ndarray, jnp.ndarray],
@@ -408,12 +840,8 @@ class JAXMNISTCalculator:
         
         params = (weights, biases)
         
-        # Define loss function for gradient computation
-        def loss_fn(params):
-            return self.compute_optax_loss(params, batch_features, batch_labels, similarity_metric)
-        
         # Compute loss and gradients
-        loss_value, gradients = jax.value_and_grad(loss_fn)(params)
+        loss_value, gradients = self._optax_loss_and_grad_jit(params, batch_features, batch_labels, similarity_metric)
         weight_gradients, bias_gradients = gradients
         
         # Check for NaN or infinity in gradients
@@ -432,8 +860,12 @@ class JAXMNISTCalculator:
         weight_grad_norm = jnp.linalg.norm(weight_gradients)
         bias_grad_norm = jnp.linalg.norm(bias_gradients)
         
-        logger.info(f"Optax Gradients - Loss: {loss_value:.6f}, Weight norm: {weight_grad_norm:.6f}, "
-                   f"Bias norm: {bias_grad_norm:.6f}")
+        if diagnostics.sample('optax_gradients'):
+            diagnostics.record('optax_gradients', {
+                'loss': loss_value,
+                'weight_gradient_norm': weight_grad_norm,
+                'bias_gradient_norm': bias_grad_norm
+            }, similarity_metric=similarity_metric)
         
         # Apply gradient clipping for stability
         max_norm = 1.0
@@ -453,6 +885,212 @@ class JAXMNISTCalculator:
             }
         }
     
+    def _masked_loss_sum_and_grad(self, params: Tuple[jnp.ndarray, jnp.ndarray], batch_features: jnp.ndarray,
+                                  batch_labels: jnp.ndarray, mask: jnp.ndarray, similarity_metric: str):
+        """Summed loss of the unmasked samples and its gradients: one shard's part of a data-parallel step"""
+        def loss_sum(params):
+            losses = self._optax_sample_losses(params, batch_features, batch_labels, similarity_metric)
+            return jnp.sum(jnp.where(mask, losses, 0.0))
+        
+        return jax.value_and_grad(loss_sum)(params)
+    
+    def _data_parallel_loss_and_grad(self, mesh: Mesh, params: Tuple[jnp.ndarray, jnp.ndarray],
+                                     batch_features: jnp.ndarray, batch_labels: jnp.ndarray, mask: jnp.ndarray,
+                                     similarity_metric: str):
+        """Mean loss and gradients with the batch sharded over the mesh's 'data' axis.
+        
+        Each device differentiates the summed loss of its shard (padding rows
+        masked out); the sums are all-reduced and divided by the real batch size.
+        """
+        def shard_loss_and_grad(params, features, labels, mask):
+            loss_sum, gradients = self._masked_loss_sum_and_grad(params, features, labels, mask, similarity_metric)
+            count = lax.psum(jnp.sum(mask.astype(jnp.float64)), 'data')
+            mean_loss = lax.psum(loss_sum, 'data') / count
+            mean_gradients = jax.tree_util.tree_map(lambda g: lax.psum(g, 'data') / count, gradients)
+            return mean_loss, mean_gradients
+        
+        loss_value, gradients = shard_map(
+            shard_loss_and_grad, mesh,
+            in_specs=(P(), P('data'), P('data'), P('data')),
+            out_specs=(P(), P()),
+            # The all-reduce is explicit above, so replication checking (which would insert its own) is off
+            check_rep=False
+        )(params, batch_features, batch_labels, mask)
+        
+        # Check for NaN or infinity (as compute_optax_loss does)
+        loss_value = jnp.where(jnp.isnan(loss_value) | jnp.isinf(loss_value), 1000.0, loss_value)
+        return loss_value, gradients
+    
+    def _optax_train_step(self, optimizer, params: Tuple[jnp.ndarray, jnp.ndarray], opt_state,
+                          batch_features: jnp.ndarray, batch_labels: jnp.ndarray, similarity_metric: str,
+                          max_grad_norm: float = 1.0, mesh: Mesh = None, mask: jnp.ndarray = None) -> Dict[str, Any]:
+        """Gradient, clip, optimizer update, apply and ternary quantization in one traced function"""
+        weights, biases = params
+        params = (weights.astype(jnp.float64), biases.astype(jnp.float64))
+        batch_features = batch_features.astype(jnp.float64)
+        batch_labels = batch_labels.astype(jnp.int32)
+        
+        if mesh is None:
+            loss_value, (weight_gradients, bias_gradients) = jax.value_and_grad(self.compute_optax_loss)(
+                params, batch_features, batch_labels, similarity_metric, mask
+            )
+        else:
+            loss_value, (weight_gradients, bias_gradients) = self._data_parallel_loss_and_grad(
+                mesh, params, batch_features, batch_labels, mask, similarity_metric
+            )
+        
+        return self._optax_apply_gradients(optimizer, params, opt_state, loss_value,
+                                           (weight_gradients, bias_gradients), max_grad_norm)
+    
+    def _optax_apply_gradients(self, optimizer, params: Tuple[jnp.ndarray, jnp.ndarray], opt_state,
+                               loss_value: jnp.ndarray, gradients: Tuple[jnp.ndarray, jnp.ndarray],
+                               max_grad_norm: float = 1.0) -> Dict[str, Any]:
+        """Clip, optimizer update, apply and ternary quantization for already computed (mean) gradients"""
+        weight_gradients, bias_gradients = gradients
+        
+        # Replace non-finite gradients with zeros
+        weight_has_nan = jnp.any(~jnp.isfinite(weight_gradients))
+        bias_has_nan = jnp.any(~jnp.isfinite(bias_gradients))
+        weight_gradients = jnp.where(weight_has_nan, jnp.zeros_like(weight_gradients), weight_gradients)
+        bias_gradients = jnp.where(bias_has_nan, jnp.zeros_like(bias_gradients), bias_gradients)
+        
+        # Clip each gradient to max_grad_norm for stability (norms are reported before clipping)
+        weight_grad_norm = jnp.linalg.norm(weight_gradients)
+        bias_grad_norm = jnp.linalg.norm(bias_gradients)
+        weight_gradients = jnp.where(weight_grad_norm > max_grad_norm,
+                                     weight_gradients * (max_grad_norm / weight_grad_norm), weight_gradients)
+        bias_gradients = jnp.where(bias_grad_norm > max_grad_norm,
+                                   bias_gradients * (max_grad_norm / bias_grad_norm), bias_gradients)
+        
+        updates, new_opt_state = optimizer.update((weight_gradients, bias_gradients), opt_state, params)
+        shadow_weights, new_biases = optax.apply_updates(params, updates)
+        
+        # While accumulating micro-batches the update is zero; keep the weights as they are
+        if isinstance(optimizer, optax.MultiSteps):
+            applied = optimizer.has_updated(new_opt_state)
+        else:
+            applied = jnp.array(True)
+        new_weights = jnp.where(applied, self._quantize_to_ternary(shadow_weights), params[0])
+        
+        return {
+            'applied': applied,
+            'shadow_weights': shadow_weights,
+            'weights': new_weights,
+            'biases': new_biases,
+            'opt_state': new_opt_state,
+            'loss': loss_value,
+            'weight_gradient_norm': weight_grad_norm,
+            'bias_gradient_norm': bias_grad_norm,
+            'has_nan': weight_has_nan | bias_has_nan,
+            'ternary_counts': jnp.stack([jnp.sum(new_weights == -1.0), jnp.sum(new_weights == 0.0),
+                                         jnp.sum(new_weights == 1.0)])
+        }
+    
+    def optax_train_step(self, optimizer, optimizer_key: str, num_devices: int = 1):
+        """Compiled train step for an optimizer; params and opt_state passed to it are donated.
+        
+        Hyperparameters live in the optimizer state (see build_optimizer), so one
+        compilation serves every learning rate of the same optimizer structure.
+        With num_devices > 1 the batch is split across that many local devices
+        with replicated parameters (see _data_parallel_loss_and_grad). Batches
+        are padded to their bucket (see pad_batch), so each bucket compiles once.
+        """
+        cache_key = (optimizer_key, num_devices)
+        step = self._train_steps.get(cache_key)
+        if step is None:
+            if num_devices > 1:
+                step = instrument_kernel('data_parallel_train_step',
+                                         self._data_parallel_train_step(optimizer, num_devices))
+            else:
+                step = self._bucketed_train_step(instrument_kernel('optax_train_step', jax.jit(
+                    functools.partial(self._optax_train_step, optimizer),
+                    static_argnames=('similarity_metric',),
+                    donate_argnums=(0, 1)
+                )))
+            self._train_steps[cache_key] = step
+        return step
+    
+    @staticmethod
+    def _bucketed_train_step(compiled: Callable) -> Callable:
+        def step(params, opt_state, batch_features, batch_labels, similarity_metric):
+            batch_features, batch_labels, mask = pad_batch(batch_features, batch_labels)
+            return compiled(params, opt_state, batch_features, batch_labels,
+                            similarity_metric=similarity_metric, mask=mask)
+        
+        return step
+    
+    def _data_parallel_train_step(self, optimizer, num_devices: int):
+        devices = jax.local_devices()
+        if num_devices > len(devices):
+            raise ValueError(f"{num_devices} devices requested but only {len(devices)} available "
+                             f"(set JAX_HOST_DEVICE_COUNT to split the CPU into more devices)")
+        mesh = Mesh(np.array(devices[:num_devices]), ('data',))
+        replicated = NamedSharding(mesh, P())
+        sharded = NamedSharding(mesh, P('data'))
+        # Inputs live on the default device and are copied to the mesh, so there is nothing to donate
+        compiled = jax.jit(
+            functools.partial(self._optax_train_step, optimizer, mesh=mesh),
+            static_argnames=('similarity_metric',)
+        )
+        
+        def step(params, opt_state, batch_features, batch_labels, similarity_metric):
+            # Pad the batch to its bucket and a multiple of the device count, masked out of the loss
+            batch_features, batch_labels, mask = pad_batch(batch_features, batch_labels, multiple=num_devices)
+            
+            result = compiled(
+                jax.device_put(params, replicated), jax.device_put(opt_state, replicated),
+                jax.device_put(batch_features, sharded), jax.device_put(batch_labels, sharded),
+                mask=jax.device_put(mask, sharded), similarity_metric=similarity_metric
+            )
+            # Back on the default device, so the results mix with the rest of the model's (unsharded) arrays
+            return jax.device_put(result, devices[0])
+        
+        return step
+    
+    def _sweep_train(self, optimizer, params: Tuple[jnp.ndarray, jnp.ndarray], opt_state,
+                     batch_features: jnp.ndarray, batch_labels: jnp.ndarray,
+                     eval_features: jnp.ndarray, eval_labels: jnp.ndarray, similarity_metric: str):
+        """Train stacked model variants (leading axis of params and opt_state) on the same batches.
+        
+        batch_features/batch_labels are shaped (evaluations, steps per evaluation, batch, ...);
+        accuracy on the evaluation set is measured after each group of steps.
+        """
+        train_variants = jax.vmap(
+            lambda params, opt_state, features, labels: self._optax_train_step(
+                optimizer, params, opt_state, features, labels, similarity_metric
+            ),
+            in_axes=(0, 0, None, None)
+        )
+        evaluate_variants = jax.vmap(
+            lambda weights, biases: self.compute_accuracy(weights, biases, eval_features, eval_labels,
+                                                          similarity_metric, 'softmax')
+        )
+        
+        def train_step(carry, batch):
+            params, opt_state = carry
+            step = train_variants(params, opt_state, *batch)
+            return ((step['weights'], step['biases']), step['opt_state']), step['loss']
+        
+        def train_and_evaluate(carry, batches):
+            carry, losses = lax.scan(train_step, carry, batches)
+            return carry, (losses, evaluate_variants(*carry[0]))
+        
+        (params, opt_state), (losses, accuracies) = lax.scan(
+            train_and_evaluate, (params, opt_state), (batch_features, batch_labels)
+        )
+        # Curves per variant: (variants, steps) and (variants, evaluations)
+        return params, losses.reshape(-1, losses.shape[-1]).T, accuracies.T
+    
+    def sweep_run(self, optimizer, optimizer_key: str):
+        """Compiled sweep over stacked variants, one per optimizer structure (and metric, at trace time)"""
+        run = self._sweep_runs.get(optimizer_key)
+        if run is None:
+            run = instrument_kernel('sweep', jax.jit(
+                functools.partial(self._sweep_train, optimizer), static_argnames=('similarity_metric',)
+            ))
+            self._sweep_runs[optimizer_key] = run
+        return run
+    
     def compute_accuracy(self, weights: jnp.ndarray, biases: jnp.ndarray,
                         test_features: jnp.ndarray, test_labels: jnp.ndarray,
                         similarity_metric: str, activation_function: str) -> float:
@@ -469,6 +1107,125 @@ class JAXMNISTCalculator:
         
         return accuracy
 
+    def _forward_chunk(self, weights: jnp.ndarray, biases: jnp.ndarray, features: jnp.ndarray,
+                       similarity_metric: str, activation_function: str) -> Tuple[jnp.ndarray, jnp.ndarray]:
+        """Scores and activations for a chunk of samples"""
+        return jax.vmap(
+            lambda x: self._forward_pass_internal(weights, biases, x, similarity_metric, activation_function)
+        )(features)
+    
+    def forward_chunks(self, weights: jnp.ndarray, biases: jnp.ndarray, num_samples: int, get_features,
+                       similarity_metric: str, activation_function: str, chunk_size: int = 256):
+        """Yield (start, scores, activations) as numpy arrays, one fixed-size chunk at a time.
+        
+        get_features(start, end) returns the feature rows for that range, so the caller
+        decides where inputs come from (request body, cached dataset) and only one
+        chunk is materialised at a time.
+        """
+        pending = None
+        for start in range(0, num_samples, chunk_size):
+            chunk = np.asarray(get_features(start, min(start + chunk_size, num_samples)), dtype=np.float64)
+            valid = len(chunk)
+            if valid < chunk_size:
+                chunk = np.concatenate([chunk, np.zeros((chunk_size - valid,) + chunk.shape[1:])])
+            
+            scores, activations = self._forward_chunk_jit(
+                weights, biases, to_device(chunk),
+                similarity_metric=similarity_metric, activation_function=activation_function
+            )
+            # Dispatch this chunk before blocking on the previous one
+            if pending is not None:
+                yield pending[0], np.asarray(pending[1])[:pending[3]], np.asarray(pending[2])[:pending[3]]
+            pending = (start, scores, activations, valid)
+        if pending is not None:
+            yield pending[0], np.asarray(pending[1])[:pending[3]], np.asarray(pending[2])[:pending[3]]
+    
+    def _evaluate_chunk(self, weights: jnp.ndarray, biases: jnp.ndarray, features: jnp.ndarray,
+                        labels: jnp.ndarray, mask: jnp.ndarray,
+                        similarity_metric: str, activation_function: str) -> Tuple[jnp.ndarray, jnp.ndarray]:
+        """Predictions and masked cross-entropy losses for one fixed-size chunk"""
+        
+        def single_sample(features, label):
+            scores, activations = self._forward_pass_internal(weights, biases, features, similarity_metric, activation_function)
+            epsilon = 1e-8
+            clipped = jnp.clip(activations, epsilon, 1.0 - epsilon)
+            return jnp.argmax(activations), -jnp.log(clipped[label])
+        
+        predictions, losses = jax.vmap(single_sample)(features, labels)
+        return predictions, jnp.where(mask, losses, 0.0)
+    
+    def evaluate(self, weights: jnp.ndarray, biases: jnp.ndarray,
+                 features: np.ndarray, labels: np.ndarray,
+                 similarity_metric: str, activation_function: str,
+                 chunk_size: int = 1024) -> Dict[str, Any]:
+        """Evaluate a whole split in fixed-size chunks: accuracy, confusion matrix, precision/recall, loss.
+        
+        Every chunk (the last one zero-padded) has the same shape, so the kernel compiles
+        once, and only one chunk is on the device at a time. The next chunk is dispatched
+        before the previous one's results are pulled back to the host.
+        """
+        num_classes = int(weights.shape[0])
+        num_samples = len(labels)
+        confusion = np.zeros((num_classes, num_classes), dtype=np.int64)
+        total_loss = 0.0
+        
+        def collect(pending):
+            nonlocal total_loss
+            predictions, losses, chunk_labels = pending
+            predictions = np.asarray(predictions)[:len(chunk_labels)]
+            confusion.flat[:] += np.bincount(chunk_labels * num_classes + predictions,
+                                             minlength=num_classes * num_classes)
+            total_loss += float(jnp.sum(losses))
+        
+        pending = None
+        for start in range(0, num_samples, chunk_size):
+            chunk_features = np.asarray(features[start:start + chunk_size])
+            chunk_labels = np.asarray(labels[start:start + chunk_size]).astype(np.int64)
+            valid = len(chunk_labels)
+            if valid < chunk_size:
+                pad = chunk_size - valid
+                chunk_features = np.concatenate([chunk_features, np.zeros((pad,) + chunk_features.shape[1:], chunk_features.dtype)])
+                padded_labels = np.concatenate([chunk_labels, np.zeros(pad, dtype=np.int64)])
+            else:
+                padded_labels = chunk_labels
+            mask = np.arange(chunk_size) < valid
+            
+            predictions, losses = self._evaluate_chunk_jit(
+                weights, biases, to_device(chunk_features), to_device(padded_labels), to_device(mask),
+                similarity_metric=similarity_metric, activation_function=activation_function
+            )
+            if pending is not None:
+                collect(pending)
+            pending = (predictions, losses, chunk_labels)
+        if pending is not None:
+            collect(pending)
+        
+        correct = np.diag(confusion)
+        predicted_totals = confusion.sum(axis=0)
+        actual_totals = confusion.sum(axis=1)
+        precision = np.divide(correct, predicted_totals, out=np.zeros(num_classes), where=predicted_totals > 0)
+        recall = np.divide(correct, actual_totals, out=np.zeros(num_classes), where=actual_totals > 0)
+        
+        mean_loss = total_loss / num_samples if num_samples else 0.0
+        if np.isnan(mean_loss) or np.isinf(mean_loss):
+            mean_loss = 1000.0
+        
+        return {
+            'num_samples': num_samples,
+            'accuracy': float(correct.sum() / num_samples) if num_samples else 0.0,
+            'mean_loss': float(mean_loss),
+            'confusion_matrix': to_list(confusion),
+            'per_class': [
+                {
+                    'class_id': i,
+                    'precision': float(precision[i]),
+                    'recall': float(recall[i]),
+                    'support': int(actual_totals[i])
+                }
+                for i in range(num_classes)
+            ]
+        }
+
 class MNISTDatasetLoader:
     """Load different MNIST-style datasets from various sources including Kaggle"""
     
@@ -533,10 +1290,45 @@ class MNISTDatasetLoader:
             }
         }
         
-        self.loaded_datasets = {}
+        # Loaded datasets, evicted least-recently (or least-frequently) used beyond the byte budget.
+        # Partially read splits are cached too (under "<key>:partial"), so they count against the budget.
+        self.loaded_datasets = DatasetCache(
+            max_bytes=config.DATASET_CACHE_MAX_BYTES,
+            policy=config.DATASET_CACHE_POLICY,
+            on_remove=self._release_partial
+        )
+        
+        # Concurrent, resumable downloader and the checksum/mirror manifest for direct datasets
+        self.download_manager = DownloadManager(
+            max_workers=config.DOWNLOAD_MAX_WORKERS,
+            retries=config.DOWNLOAD_RETRIES,
+            timeout=config.DOWNLOAD_TIMEOUT
+        )
+        self.manifest = load_manifest(config.DOWNLOAD_MANIFEST)
+        
+        # Kaggle availability probe cache: (available, checked_at)
+        self._kaggle_probe = None
+        self._kaggle_probe_lock = threading.Lock()
+        self.download_jobs = JobManager(max_workers=config.KAGGLE_DOWNLOAD_WORKERS, name='kaggle-download')
+        self.load_jobs = JobManager(max_workers=config.DATASET_LOAD_WORKERS, name='dataset-load')
+        
+        # Guards creation of partial-read states (max_samples loads), which later requests resume
+        self._partial_lock = threading.Lock()
     
-    def check_kaggle_setup(self) -> bool:
-        """Check if Kaggle API is properly set up"""
+    def check_kaggle_setup(self, force: bool = False) -> bool:
+        """Check if Kaggle API is properly set up (result cached for KAGGLE_PROBE_TTL seconds)"""
+        with self._kaggle_probe_lock:
+            if not force and self._kaggle_probe is not None:
+                available, checked_at = self._kaggle_probe
+                if time.time() - checked_at < config.KAGGLE_PROBE_TTL:
+                    return available
+            
+            available = self._probe_kaggle()
+            self._kaggle_probe = (available, time.time())
+            return available
+    
+    def _probe_kaggle(self) -> bool:
+        """Run `kaggle --version` to see whether the Kaggle CLI is installed"""
         try:
             result = subprocess.run(['kaggle', '--version'], capture_output=True, text=True)
             if result.returncode == 0:
@@ -549,7 +1341,42 @@ class MNISTDatasetLoader:
             logger.warning("Kaggle API not found. Install with: pip install kaggle")
             return False
     
-    def download_kaggle_dataset(self, kaggle_dataset: str) -> bool:
+    def _kaggle_dataset_dir(self, kaggle_dataset: str) -> Path:
+        """Directory a Kaggle dataset or competition is extracted into"""
+        if 'c/' in kaggle_dataset:
+            return self.data_dir / f"competition_{kaggle_dataset.replace('c/', '')}"
+        return self.data_dir / kaggle_dataset.replace('/', '_')
+    
+    def kaggle_files_present(self, dataset_name: str) -> bool:
+        """Check whether a Kaggle dataset's extracted train and test files are already on disk"""
+        dataset_info = self.datasets[dataset_name]
+        dataset_dir = self._kaggle_dataset_dir(dataset_info['kaggle_dataset'])
+        return all((dataset_dir / dataset_info[key]).exists() for key in ('train_file', 'test_file'))
+    
+    def _run_kaggle_command(self, command: List[str], progress_callback=None) -> Tuple[int, str]:
+        """Run a Kaggle CLI command, forwarding the percentages it prints to progress_callback"""
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+        output = []
+        line = ''
+        while True:
+            char = process.stdout.read(1)
+            if not char:
+                break
+            if char in '\r\n':
+                # tqdm redraws its progress bar with carriage returns
+                match = re.search(r'(\d{1,3})%', line)
+                if match and progress_callback:
+                    progress_callback(int(match.group(1)) / 100.0)
+                if line.strip():
+                    output.append(line)
+                line = ''
+            else:
+                line += char
+        if line.strip():
+            output.append(line)
+        return process.wait(), '\n'.join(output[-20:])
+    
+    def download_kaggle_dataset(self, kaggle_dataset: str, progress_callback=None) -> bool:
         """Download a dataset from Kaggle"""
         if not self.check_kaggle_setup():
             return False
@@ -561,23 +1388,23 @@ class MNISTDatasetLoader:
             
             # Download the dataset
             logger.info(f"Downloading Kaggle dataset: {kaggle_dataset}")
-            result = subprocess.run([
+            returncode, output = self._run_kaggle_command([
                 'kaggle', 'datasets', 'download', '-d', kaggle_dataset, 
                 '-p', str(dataset_dir), '--unzip'
-            ], capture_output=True, text=True)
+            ], progress_callback)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 logger.info(f"Successfully downloaded {kaggle_dataset}")
                 return True
             else:
-                logger.error(f"Failed to download {kaggle_dataset}: {result.stderr}")
+                logger.error(f"Failed to download {kaggle_dataset}: {output}")
                 return False
                 
         except Exception as e:
             logger.error(f"Error downloading Kaggle dataset {kaggle_dataset}: {e}")
             return False
     
-    def download_kaggle_competition(self, competition: str) -> bool:
+    def download_kaggle_competition(self, competition: str, progress_callback=None) -> bool:
         """Download a competition dataset from Kaggle"""
         if not self.check_kaggle_setup():
             return False
@@ -589,12 +1416,12 @@ class MNISTDatasetLoader:
             
             # Download the competition data
             logger.info(f"Downloading Kaggle competition: {competition}")
-            result = subprocess.run([
+            returncode, output = self._run_kaggle_command([
                 'kaggle', 'competitions', 'download', '-c', competition, 
                 '-p', str(comp_dir)
-            ], capture_output=True, text=True)
+            ], progress_callback)
             
-            if result.returncode == 0:
+            if returncode == 0:
                 # Unzip all downloaded files
                 for zip_file in comp_dir.glob('*.zip'):
                     with zipfile.ZipFile(zip_file, 'r') as zip_ref:
@@ -604,86 +1431,168 @@ class MNISTDatasetLoader:
                 logger.info(f"Successfully downloaded competition {competition}")
                 return True
             else:
-                logger.error(f"Failed to download competition {competition}: {result.stderr}")
+                logger.error(f"Failed to download competition {competition}: {output}")
                 return False
                 
         except Exception as e:
             logger.error(f"Error downloading Kaggle competition {competition}: {e}")
             return False
     
-    def load_csv_dataset(self, csv_path: str, has_labels: bool = True) -> Dict[str, Any]:
-        """Load a dataset from CSV format (common for Kaggle datasets)"""
-        import pandas as pd
-        
-        df = pd.read_csv(csv_path)
-        
-        if has_labels:
-            # First column is usually the label
-            labels = df.iloc[:, 0].values
-            features = df.iloc[:, 1:].values
-        else:
-            # No labels (test set)
-            labels = None
-            features = df.values
+    def _download_kaggle_job(self, job: Job, dataset_name: str) -> Dict[str, Any]:
+        """Background job body: download a Kaggle dataset, falling back to the competition API"""
+        kaggle_dataset = self.datasets[dataset_name]['kaggle_dataset']
+        
+        if self.kaggle_files_present(dataset_name):
+            return {'dataset_name': dataset_name, 'already_present': True}
+        
+        job.update(message=f'Downloading {kaggle_dataset}')
+        progress = lambda fraction: job.update(progress=fraction * 0.99)
+        if not self.download_kaggle_dataset(kaggle_dataset, progress):
+            if 'c/' not in kaggle_dataset:
+                raise RuntimeError(f"Failed to download Kaggle dataset: {kaggle_dataset}")
+            # Try as competition
+            competition = kaggle_dataset.replace('c/', '')
+            job.update(progress=0.0, message=f'Downloading competition {competition}')
+            if not self.download_kaggle_competition(competition, progress):
+                raise RuntimeError(f"Failed to download Kaggle dataset: {kaggle_dataset}")
+        
+        return {'dataset_name': dataset_name, 'already_present': False}
+    
+    def submit_kaggle_download(self, dataset_name: str) -> Job:
+        """Start (or join) a background download of a Kaggle dataset"""
+        return self.download_jobs.submit('kaggle_download', dataset_name, self._download_kaggle_job, dataset_name)
+    
+    def load_csv_dataset(self, csv_path: str, has_labels: bool = None, max_rows: int = None) -> Dict[str, Any]:
+        """Load a dataset from CSV format (common for Kaggle datasets), optionally only the first max_rows.
         
-        # Reshape features to images if they're flattened (784 = 28x28)
-        if features.shape[1] == 784:
-            images = features.reshape(-1, 28, 28)
-        else:
-            # Assume square images
-            img_size = int(np.sqrt(features.shape[1]))
-            images = features.reshape(-1, img_size, img_size)
+        has_labels=None detects the label column from the CSV header.
+        """
+        source = CSVDatasetSource(csv_path, has_labels=has_labels)
+        images, labels = source.read(max_rows)
+        source.close()
         
         # Normalize features
-        features = features.astype(np.float32) / 255.0
+        features = self.preprocess_images(images, normalize=True, flatten=True)
         
         return {
-            'images': images.astype(np.uint8),
+            'images': images,
             'labels': labels,
             'features': features
         }
     
     def download_file(self, url: str, filename: str) -> bool:
-        """Download a file if it doesn't exist"""
-        filepath = self.data_dir / filename
-        if filepath.exists():
-            return True
-            
+        """Download a file if it isn't already cached and intact"""
         try:
-            logger.info(f"Downloading {filename}...")
-            urllib.request.urlretrieve(url, filepath)
-            logger.info(f"Downloaded {filename}")
+            self.download_manager.fetch([url], self.data_dir / filename)
             return True
-        except Exception as e:
-            logger.error(f"Failed to download {filename}: {e}")
+        except DownloadError as e:
+            logger.error(str(e))
             return False
     
-    def load_idx_images(self, filepath: str) -> np.ndarray:
-        """Load IDX format images"""
-        with gzip.open(filepath, 'rb') as f:
-            # Read header
-            magic = int.from_bytes(f.read(4), 'big')
-            num_images = int.from_bytes(f.read(4), 'big')
-            rows = int.from_bytes(f.read(4), 'big')
-            cols = int.from_bytes(f.read(4), 'big')
-            
-            # Read images
-            images = np.frombuffer(f.read(), dtype=np.uint8)
-            images = images.reshape(num_images, rows, cols)
+    def _candidate_urls(self, dataset_name: str, file_key: str) -> List[str]:
+        """Mirror URLs for a dataset file: configured mirrors, the dataset URL, then manifest mirrors"""
+        primary_url = self.datasets[dataset_name][file_key]
+        basename = primary_url.rsplit('/', 1)[-1]
+        mirrors = self.manifest.get(dataset_name, {}).get('mirrors', [])
+        
+        urls = [mirror.rstrip('/') + '/' + basename for mirror in config.DOWNLOAD_MIRRORS]
+        urls.append(primary_url)
+        urls.extend(mirror.rstrip('/') + '/' + basename for mirror in mirrors)
+        return list(dict.fromkeys(urls))  # De-duplicate, keep order
+    
+    def download_dataset_files(self, dataset_name: str, subset: str) -> Tuple[Path, Path]:
+        """Fetch a direct dataset's image and label files concurrently, verified against the manifest"""
+        expected = self.manifest.get(dataset_name, {}).get('files', {})
+        jobs = []
+        for kind in ('images', 'labels'):
+            file_key = f'{subset}_{kind}'
+            jobs.append({
+                'urls': self._candidate_urls(dataset_name, file_key),
+                'filepath': self.data_dir / f"{dataset_name}_{subset}_{kind}.gz",
+                'expected': expected.get(file_key)
+            })
+        
+        try:
+            paths = self.download_manager.fetch_many(jobs)
+        except DownloadError as e:
+            raise RuntimeError(str(e))
+        
+        return paths[jobs[0]['filepath'].name], paths[jobs[1]['filepath'].name]
+    
+    def load_idx_images(self, filepath: str, max_items: int = None) -> np.ndarray:
+        """Load IDX format images, reading only the first max_items if given"""
+        with IDXReader(filepath) as reader:
+            return reader.read(max_items)
+    
+    def load_idx_labels(self, filepath: str, max_items: int = None) -> np.ndarray:
+        """Load IDX format labels, reading only the first max_items if given"""
+        with IDXReader(filepath) as reader:
+            return reader.read(max_items)
+    
+    @staticmethod
+    def _release_partial(key: str, state: Dict[str, Any]):
+        """Close the open source of a partial read dropped from the cache"""
+        if not key.endswith(':partial'):
+            return
+        state['evicted'] = True
+        # A reader still using the source closes it itself when it finishes (see _read_incremental)
+        if state['lock'].acquire(blocking=False):
+            try:
+                state['source'].close()
+            finally:
+                state['lock'].release()
+    
+    def _read_incremental(self, cache_key: str, source_factory, max_samples: int = None) -> Tuple[Dict[str, Any], bool]:
+        """Read the first max_samples records of a split (all if None).
+        
+        Records already read by an earlier partial load are cached along with the
+        open source, so asking for more (or for the full split) only reads the rest.
+        That state counts against the cache budget; when it is evicted, its source
+        is closed and the next request starts over. Returns the data read so far
+        and whether the split is complete.
+        """
+        partial_key = f"{cache_key}:partial"
+        with self._partial_lock:
+            state = self.loaded_datasets.peek(partial_key)
+            if state is None:
+                state = {'source': source_factory(), 'images': None, 'labels': None,
+                         'features': None, 'lock': threading.Lock(), 'evicted': False}
+        
+        with state['lock']:
+            if state['evicted']:
+                # Evicted (and its source closed) after the lookup above: start over
+                state.update(source=source_factory(), images=None, labels=None, features=None, evicted=False)
+            source = state['source']
+            num_loaded = 0 if state['images'] is None else len(state['images'])
+            wanted = None if max_samples is None else max_samples - num_loaded
             
-            return images
-    
-    def load_idx_labels(self, filepath: str) -> np.ndarray:
-        """Load IDX format labels"""
-        with gzip.open(filepath, 'rb') as f:
-            # Read header
-            magic = int.from_bytes(f.read(4), 'big')
-            num_labels = int.from_bytes(f.read(4), 'big')
+            if (wanted is None or wanted > 0) and not source.exhausted:
+                images, labels = source.read(wanted)
+                features = self.preprocess_images(images, normalize=True, flatten=True)
+                if state['images'] is None:
+                    state['images'], state['labels'], state['features'] = images, labels, features
+                else:
+                    state['images'] = np.concatenate([state['images'], images])
+                    state['features'] = np.concatenate([state['features'], features])
+                    if labels is not None:
+                        state['labels'] = np.concatenate([state['labels'], labels])
             
-            # Read labels
-            labels = np.frombuffer(f.read(), dtype=np.uint8)
+            complete = source.exhausted
+            if complete or state['evicted']:
+                source.close()
+                with self._partial_lock:
+                    if self.loaded_datasets.peek(partial_key) is state:
+                        self.loaded_datasets.pop(partial_key)
+            else:
+                # (Re-)cached at its new size, which may evict other entries
+                with self._partial_lock:
+                    self.loaded_datasets.put(partial_key, state)
             
-            return labels
+            data = {key: state[key] for key in ('images', 'labels', 'features')}
+        
+        if max_samples is not None:
+            data = {key: (value[:max_samples] if value is not None else None) for key, value in data.items()}
+        return data, complete
     
     def preprocess_images(self, images: np.ndarray, normalize: bool = True, flatten: bool = True) -> np.ndarray:
         """Preprocess images: normalize and optionally flatten"""
@@ -709,9 +1618,9 @@ class MNISTDatasetLoader:
         cache_key = f"{dataset_name}_{subset}"
         
         # Check cache
-        if cache_key in self.loaded_datasets:
+        cached = self.loaded_datasets.get(cache_key)
+        if cached is not None:
             logger.info(f"Using cached {dataset_name} {subset} dataset")
-            cached = self.loaded_datasets[cache_key]
             if max_samples and max_samples < len(cached['labels']):
                 return {
                     'images': cached['images'][:max_samples],
@@ -731,12 +1640,103 @@ class MNISTDatasetLoader:
             # Fallback to traditional method
             return self._load_traditional_dataset(dataset_name, subset, max_samples)
     
+    def is_loaded(self, dataset_name: str, subset: str = 'train') -> bool:
+        """Check whether a dataset split is fully loaded in memory"""
+        return f"{dataset_name}_{subset}" in self.loaded_datasets
+    
+    def _load_dataset_job(self, job: Job, dataset_name: str, subset: str) -> Dict[str, Any]:
+        """Background job body: download (if needed), parse and cache a full dataset split"""
+        dataset_info = self.datasets[dataset_name]
+        
+        if dataset_info['source'] == 'kaggle':
+            if not self.kaggle_files_present(dataset_name) and self.check_kaggle_setup():
+                job.update(message='Downloading from Kaggle')
+                download = self.submit_kaggle_download(dataset_name)
+                while not download.wait(0.5):
+                    job.update(progress=download.progress * 0.7)
+        else:
+            job.update(message='Downloading')
+            self.download_dataset_files(dataset_name, subset)
+        
+        job.update(progress=0.7, message='Parsing')
+        dataset = self.load_dataset(dataset_name, subset)
+        
+        # Kaggle datasets may have fallen back to a backup source cached under another key
+        self.loaded_datasets[f"{dataset_name}_{subset}"] = dataset
+        
+        return {'num_samples': len(dataset['labels']), 'source_dataset': dataset['dataset_name']}
+    
+    def submit_load(self, dataset_name: str, subset: str = 'train') -> Job:
+        """Start (or join) a background load of a full dataset split"""
+        if dataset_name not in self.datasets:
+            raise ValueError(f"Unknown dataset: {dataset_name}. Available: {list(self.datasets.keys())}")
+        return self.load_jobs.submit('dataset_load', f"{dataset_name}_{subset}",
+                                     self._load_dataset_job, dataset_name, subset)
+    
+    def get_dataset(self, dataset_name: str, subset: str = 'train', max_samples: int = None) -> Dict[str, Any]:
+        """Return a dataset, waiting on the shared load job so concurrent first requests load it once"""
+        if not self.is_loaded(dataset_name, subset):
+            if max_samples:
+                # A partial read of the first records is fast, no need for the full load
+                return self.load_dataset(dataset_name, subset, max_samples)
+            job = self.submit_load(dataset_name, subset)
+            job.wait()
+            if job.status == Job.FAILED:
+                raise RuntimeError(job.error)
+        return self.load_dataset(dataset_name, subset, max_samples)
+    
+    @contextmanager
+    def pinned(self, dataset_name: str, subset: str):
+        """Keep a split from being evicted while a run (evaluation, sweep, ...) is using it"""
+        cache_key = f"{dataset_name}_{subset}"
+        self.loaded_datasets.pin(cache_key)
+        try:
+            yield
+        finally:
+            self.loaded_datasets.unpin(cache_key)
+    
+    def preload(self, specs: List[str]) -> List[Job]:
+        """Queue background loads for "name" (train and test) or "name:subset" entries"""
+        jobs = []
+        for spec in specs:
+            dataset_name, _, subset = spec.partition(':')
+            for split in ([subset] if subset else ['train', 'test']):
+                try:
+                    jobs.append(self.submit_load(dataset_name, split))
+                    logger.info(f"Preloading {dataset_name} {split} in the background")
+                except ValueError as e:
+                    logger.error(f"Cannot preload {spec}: {e}")
+        return jobs
+    
+    def dataset_status(self) -> Dict[str, Dict[str, Any]]:
+        """Readiness and load progress of every known dataset split"""
+        status = {}
+        for dataset_name in self.datasets:
+            status[dataset_name] = {}
+            for subset in ('train', 'test'):
+                job = self.load_jobs.find('dataset_load', f"{dataset_name}_{subset}")
+                # One lookup: the split may be evicted between an is_loaded() check and reading it
+                cached = self.loaded_datasets.peek(f"{dataset_name}_{subset}")
+                if cached is not None:
+                    entry = {'state': 'ready', 'progress': 1.0,
+                             'num_samples': len(cached['labels']),
+                             'pinned': self.loaded_datasets.is_pinned(f"{dataset_name}_{subset}")}
+                elif job is not None:
+                    entry = {'state': 'loading' if job.active else job.status, 'progress': round(job.progress, 4),
+                             'message': job.message, 'error': job.error}
+                else:
+                    entry = {'state': 'not_loaded', 'progress': 0.0}
+                if job is not None:
+                    entry['job_id'] = job.job_id
+                status[dataset_name][subset] = entry
+        return status
+    
     def _load_kaggle_dataset(self, dataset_name: str, subset: str, max_samples: int = None) -> Dict[str, Any]:
         """Load a dataset from Kaggle"""
         dataset_info = self.datasets[dataset_name]
         
-        # Check if Kaggle is available
-        if not self.check_kaggle_setup():
+        # Check if Kaggle is available (not needed when the files were downloaded before)
+        if not self.kaggle_files_present(dataset_name) and not self.check_kaggle_setup():
             logger.warning(f"Kaggle API not available for {dataset_name}. Please set up Kaggle API credentials.")
             logger.info("See KAGGLE_SETUP.md for setup instructions.")
             
@@ -761,18 +1761,15 @@ class MNISTDatasetLoader:
             )
         
         try:
-            # Download if needed
-            if not self.download_kaggle_dataset(dataset_info['kaggle_dataset']):
-                if 'c/' in dataset_info['kaggle_dataset']:
-                    # Try as competition
-                    competition = dataset_info['kaggle_dataset'].replace('c/', '')
-                    if not self.download_kaggle_competition(competition):
-                        raise RuntimeError(f"Failed to download Kaggle dataset: {dataset_info['kaggle_dataset']}")
+            # Download if needed, sharing any in-flight /kaggle/download job
+            if not self.kaggle_files_present(dataset_name):
+                job = self.submit_kaggle_download(dataset_name)
+                job.wait()
+                if job.status == Job.FAILED:
+                    raise RuntimeError(job.error)
             
             # Find the CSV file
-            dataset_dir = self.data_dir / dataset_info['kaggle_dataset'].replace('/', '_')
-            if 'c/' in dataset_info['kaggle_dataset']:
-                dataset_dir = self.data_dir / f"competition_{dataset_info['kaggle_dataset'].replace('c/', '')}"
+            dataset_dir = self._kaggle_dataset_dir(dataset_info['kaggle_dataset'])
             
             csv_filename = dataset_info[f'{subset}_file']
             csv_path = dataset_dir / csv_filename
@@ -786,15 +1783,12 @@ class MNISTDatasetLoader:
                 else:
                     raise FileNotFoundError(f"Could not find {csv_filename} in {dataset_dir}")
             
-            # Load the CSV data
-            has_labels = subset == 'train' or 'train' in csv_filename.lower()
-            data = self.load_csv_dataset(str(csv_path), has_labels=has_labels)
-            
-            # Limit samples if requested
-            if max_samples and data['labels'] is not None and max_samples < len(data['labels']):
-                data['images'] = data['images'][:max_samples]
-                data['labels'] = data['labels'][:max_samples]
-                data['features'] = data['features'][:max_samples]
+            # Load the CSV data (only the first max_samples rows if requested).
+            # Whether there is a label column is read from the CSV header.
+            cache_key = f"{dataset_name}_{subset}"
+            data, complete = self._read_incremental(
+                cache_key, lambda: CSVDatasetSource(str(csv_path)), max_samples
+            )
             
             result = {
                 'images': data['images'],
@@ -804,9 +1798,9 @@ class MNISTDatasetLoader:
                 'dataset_name': dataset_name
             }
             
-            # Cache the result
-            cache_key = f"{dataset_name}_{subset}"
-            self.loaded_datasets[cache_key] = result
+            # Cache the result once the whole file has been read
+            if complete:
+                self.loaded_datasets[cache_key] = result
             
             logger.info(f"✅ Loaded {len(data['labels']) if data['labels'] is not None else len(data['features'])} samples from Kaggle dataset {dataset_name} {subset}")
             return result
@@ -841,35 +1835,14 @@ class MNISTDatasetLoader:
         dataset_info = self.datasets[dataset_name]
         cache_key = f"{dataset_name}_{subset}"
         
-        # Download files if needed
-        images_filename = f"{dataset_name}_{subset}_images.gz"
-        labels_filename = f"{dataset_name}_{subset}_labels.gz"
-        
-        images_url = dataset_info[f'{subset}_images']
-        labels_url = dataset_info[f'{subset}_labels']
-        
-        if not self.download_file(images_url, images_filename):
-            raise RuntimeError(f"Failed to download {images_filename}")
-        
-        if not self.download_file(labels_url, labels_filename):
-            raise RuntimeError(f"Failed to download {labels_filename}")
-        
-        # Load data
-        images_path = self.data_dir / images_filename
-        labels_path = self.data_dir / labels_filename
+        # Download files if needed (images and labels in parallel)
+        images_path, labels_path = self.download_dataset_files(dataset_name, subset)
         
         logger.info(f"Loading {dataset_name} {subset} dataset...")
-        images = self.load_idx_images(str(images_path))
-        labels = self.load_idx_labels(str(labels_path))
-        
-        # Preprocess
-        features = self.preprocess_images(images, normalize=True, flatten=True)
-        
-        # Limit samples if requested
-        if max_samples and max_samples < len(labels):
-            images = images[:max_samples]
-            labels = labels[:max_samples]
-            features = features[:max_samples]
+        data, complete = self._read_incremental(
+            cache_key, lambda: IDXDatasetSource(str(images_path), str(labels_path)), max_samples
+        )
+        images, labels, features = data['images'], data['labels'], data['features']
         
         result = {
             'images': images,
@@ -879,8 +1852,9 @@ class MNISTDatasetLoader:
             'dataset_name': dataset_name
         }
         
-        # Cache the result
-        self.loaded_datasets[cache_key] = result
+        # Cache the result once the whole split has been read
+        if complete:
+            self.loaded_datasets[cache_key] = result
         
         logger.info(f"Loaded {len(labels)} samples from direct download {dataset_name} {subset} dataset")
         return result
@@ -892,35 +1866,14 @@ class MNISTDatasetLoader:
         dataset_info = self.datasets[dataset_name]
         cache_key = f"{dataset_name}_{subset}"
         
-        # Download files if needed
-        images_filename = f"{dataset_name}_{subset}_images.gz"
-        labels_filename = f"{dataset_name}_{subset}_labels.gz"
-        
-        images_url = dataset_info[f'{subset}_images']
-        labels_url = dataset_info[f'{subset}_labels']
-        
-        if not self.download_file(images_url, images_filename):
-            raise RuntimeError(f"Failed to download {images_filename}")
-        
-        if not self.download_file(labels_url, labels_filename):
-            raise RuntimeError(f"Failed to download {labels_filename}")
-        
-        # Load data
-        images_path = self.data_dir / images_filename
-        labels_path = self.data_dir / labels_filename
+        # Download files if needed (images and labels in parallel)
+        images_path, labels_path = self.download_dataset_files(dataset_name, subset)
         
         logger.info(f"Loading {dataset_name} {subset} dataset...")
-        images = self.load_idx_images(str(images_path))
-        labels = self.load_idx_labels(str(labels_path))
-        
-        # Preprocess
-        features = self.preprocess_images(images, normalize=True, flatten=True)
-        
-        # Limit samples if requested
-        if max_samples and max_samples < len(labels):
-            images = images[:max_samples]
-            labels = labels[:max_samples]
-            features = features[:max_samples]
+        data, complete = self._read_incremental(
+            cache_key, lambda: IDXDatasetSource(str(images_path), str(labels_path)), max_samples
+        )
+        images, labels, features = data['images'], data['labels'], data['features']
         
         result = {
             'images': images,
@@ -930,8 +1883,9 @@ class MNISTDatasetLoader:
             'dataset_name': dataset_name
         }
         
-        # Cache the result
-        self.loaded_datasets[cache_key] = result
+        # Cache the result once the whole split has been read
+        if complete:
+            self.loaded_datasets[cache_key] = result
         
         logger.info(f"Loaded {len(labels)} samples from traditional source {dataset_name} {subset} dataset")
         return result
@@ -940,53 +1894,437 @@ class MNISTDatasetLoader:
 calculator = JAXMNISTCalculator(use_ternary_weights=True)
 dataset_loader = MNISTDatasetLoader()
 
-@app.route('/health', methods=['GET'])
-def health_check():
-    """Health check endpoint"""
-    return jsonify({'status': 'healthy', 'jax_devices': str(jax.devices())})
+# Shared calculators for models with ternary weights on/off, so compiled kernels are reused across models
+calculators = {True: calculator, False: JAXMNISTCalculator(use_ternary_weights=False)}
 
-@app.route('/forward', methods=['POST'])
-def forward_pass():
-    """Perform forward pass for a single sample"""
-    try:
-        data = request.get_json()
-        
-        weights = jnp.array(data['weights'])
-        biases = jnp.array(data['biases'])
-        features = jnp.array(data['features'])
-        similarity_metric = data['similarity_metric']
-        activation_function = data['activation_function']
-        
-        result = calculator.forward_pass(weights, biases, features, similarity_metric, activation_function)
-        
-        return jsonify({
-            'success': True,
-            'result': result
-        })
-        
-    except Exception as e:
-        logger.error(f"Error in forward pass: {str(e)}")
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        }), 400
+# Read from the cache's own counters at scrape time
+metrics.counter('dataset_cache_hits_total', 'Dataset cache lookups that found the dataset loaded',
+                function=lambda: dataset_loader.loaded_datasets.hits)
+metrics.counter('dataset_cache_misses_total', 'Dataset cache lookups that had to load the dataset',
+                function=lambda: dataset_loader.loaded_datasets.misses)
+metrics.gauge('dataset_cache_bytes', 'Bytes of datasets held in the cache',
+              function=lambda: dataset_loader.loaded_datasets.current_bytes)
 
-@app.route('/gradients', methods=['POST'])
-def compute_gradients():
-    """Compute gradients for a batch"""
-    try:
-        data = request.get_json()
-        
-        weights = jnp.array(data['weights'])
-        biases = jnp.array(data['biases'])
-        batch_features = jnp.array(data['batch_features'])
-        batch_labels = jnp.array(data['batch_labels'])
-        similarity_metric = data['similarity_metric']
-        activation_function = data['activation_function']
-        
-        result = calculator.compute_gradients(
-            weights, biases, batch_features, batch_labels, 
-            similarity_metric, activation_function
+def get_calculator(state: Dict[str, Any]) -> JAXMNISTCalculator:
+    """Calculator matching a model's ternary setting"""
+    return calculators[bool(state['use_ternary_weights'])]
+
+# Models keyed by ID; requests without a model_id use the default model. Idle models are only evicted when
+# a shared state backend holds their state (they are reloaded from it on the next request) or they have no weights.
+model_registry = ModelRegistry(new_model_state, idle_ttl=config.MODEL_IDLE_TTL, max_models=config.MAX_MODELS,
+                               evictable=lambda state: state_backend.shared or state['weights'] is None)
+model_state = model_registry.get(DEFAULT_MODEL_ID)
+
+# Parameters and versions shared with other worker processes
+state_backend = create_state_backend(config.STATE_BACKEND, config.STATE_DIR)
+
+SHARED_STATE_ARRAYS = ('weights', 'biases', 'shadow_weights', 'accumulated_weight_gradients')
+SHARED_STATE_FIELDS = ('training_history', 'current_epoch', 'is_training', 'last_loss', 'last_train_accuracy',
+                       'last_test_accuracy', 'last_gradient_norm', 'use_ternary_weights', 'weight_distribution',
+                       'optimizer_config', 'model_version', 'last_checkpoint_step')
+
+def export_model_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot of a model's shared state as numpy arrays plus JSON metadata"""
+    arrays = {key: np.asarray(state[key]) for key in SHARED_STATE_ARRAYS if state.get(key) is not None}
+    opt_leaves = jax.tree_util.tree_leaves(state['opt_state']) if state['opt_state'] is not None else []
+    for i, leaf in enumerate(opt_leaves):
+        arrays[f'opt_state_{i}'] = np.asarray(leaf)
+    meta = {key: state.get(key) for key in SHARED_STATE_FIELDS}
+    meta['opt_state_leaves'] = len(opt_leaves) if state['opt_state'] is not None else None
+    return {'arrays': arrays, 'meta': meta}
+
+def snapshot_device_array(snapshot: Dict[str, Any], name: str) -> jnp.ndarray:
+    """A snapshot array on the device, in one transfer from its memory-mapped file.
+    
+    Snapshot files are only ever replaced by rename, never rewritten, so the
+    mapping stays valid. Arrays a checkpoint packed to int8 are widened on the device.
+    """
+    array = jnp.asarray(snapshot['arrays'][name])
+    dtype = snapshot['meta'].get('packed_arrays', {}).get(name)
+    return array.astype(np.dtype(dtype)) if dtype else array
+
+def import_model_state(state: Dict[str, Any], snapshot: Dict[str, Any]):
+    """Replace a model's in-memory state with a snapshot written by another worker"""
+    arrays, meta = snapshot['arrays'], snapshot['meta']
+    for key in SHARED_STATE_ARRAYS:
+        state[key] = snapshot_device_array(snapshot, key) if key in arrays else None
+    for key in SHARED_STATE_FIELDS:
+        state[key] = meta.get(key, state.get(key))
+    
+    # Optax optimizers are functions, so rebuild from the config and refill the state pytree
+    state['optimizer'] = build_optimizer(state['optimizer_config']) if state['optimizer_config'] else None
+    state['opt_state'] = None
+    if state['optimizer'] is not None and meta.get('opt_state_leaves') is not None and state['weights'] is not None:
+        treedef = jax.tree_util.tree_structure(state['optimizer'].init((state['weights'], state['biases'])))
+        leaves = [snapshot_device_array(snapshot, f'opt_state_{i}') for i in range(meta['opt_state_leaves'])]
+        state['opt_state'] = jax.tree_util.tree_unflatten(treedef, leaves)
+    state['state_revision'] = meta.get('revision', state['state_revision'])
+
+def sync_model_state(state: Dict[str, Any]) -> bool:
+    """Load newer state written by another worker; False if the model was deleted elsewhere.
+    
+    The caller must hold the model's backend lock.
+    """
+    if not state_backend.shared:
+        return True
+    revision = state_backend.revision(state['model_id'])
+    if revision is None:
+        # Written before (so it existed in the backend) but gone now; the default model always exists
+        return state['state_revision'] == 0 or state['model_id'] == DEFAULT_MODEL_ID
+    if revision > state['state_revision']:
+        import_model_state(state, state_backend.load(state['model_id']))
+        logger.info(f"Synced model {state['model_id']} to revision {revision} from shared state")
+    return True
+
+def persist_model_state(state: Dict[str, Any]):
+    """Publish a model's state to other workers; the caller must hold the exclusive backend lock"""
+    if not state_backend.shared:
+        return
+    snapshot = export_model_state(state)
+    revision = (state_backend.revision(state['model_id']) or 0) + 1
+    snapshot['meta']['revision'] = revision
+    state_backend.save(state['model_id'], snapshot)
+    state['state_revision'] = revision
+
+# Full training state checkpoints, written in the background
+checkpoint_manager = CheckpointManager(config.CHECKPOINT_DIR, max_to_keep=config.CHECKPOINT_MAX_TO_KEEP,
+                                       max_auto_to_keep=config.CHECKPOINT_MAX_AUTO_TO_KEEP)
+
+# Multi-process training runs (worker processes launched from, and reporting back to, this app)
+distributed_manager = DistributedTrainingManager(config.DISTRIBUTED_DIR, timeout=config.DISTRIBUTED_TIMEOUT)
+
+# On-demand profiling sessions (JAX trace + cProfile of the handlers; see /profiler)
+profiler = ProfilerManager(config.PROFILE_DIR, max_seconds=config.PROFILE_MAX_SECONDS)
+
+# Request logs for replay.py (see /traffic/recording); one recording per process. Sessions started through
+# /traffic/recording/start are followed by every serving process (see the server entry points).
+traffic_recorder = TrafficRecorder(config.TRAFFIC_RECORDING_DIR)
+if config.TRAFFIC_RECORDING_ENABLED:
+    traffic_recorder.start_local(bodies=config.TRAFFIC_RECORD_BODIES, name='startup')
+# Closes this process's recording when it (e.g. a gunicorn worker) exits, leaving the session to the others
+atexit.register(traffic_recorder.close)
+
+def maybe_auto_checkpoint(state: Dict[str, Any]):
+    """Queue a checkpoint once training has advanced CHECKPOINT_EVERY_STEPS steps since the last one"""
+    every = config.CHECKPOINT_EVERY_STEPS
+    if every <= 0 or state['weights'] is None or state['current_epoch'] - state['last_checkpoint_step'] < every:
+        return
+    state['last_checkpoint_step'] = state['current_epoch']
+    checkpoint_manager.save(state['model_id'], export_model_state(state), state['current_epoch'], tag=AUTO_TAG)
+
+def _state_fingerprint(state: Dict[str, Any]) -> List[Any]:
+    # Shared values are replaced rather than mutated (apart from the history list), so identity detects changes
+    return ([state.get(key) for key in SHARED_STATE_ARRAYS + SHARED_STATE_FIELDS + ('opt_state',)]
+            + [len(state['training_history'])])
+
+def _state_changed(before: List[Any], after: List[Any]) -> bool:
+    return before[-1] != after[-1] or any(a is not b for a, b in zip(before[:-1], after[:-1]))
+
+def lookup_model(model_id: str, create: bool = False) -> Dict[str, Any]:
+    """Registry entry for a model, including models created by other workers"""
+    if create or state_backend.exists(model_id):
+        return model_registry.get_or_create(model_id)
+    return model_registry.get(model_id)
+
+def requested_model_id() -> str:
+    """Model ID from the JSON body or query string, falling back to the default model"""
+    data = request.get_json(silent=True) or {}
+    return data.get('model_id') or request.args.get('model_id') or DEFAULT_MODEL_ID
+
+def with_model(handler=None, *, create: bool = False):
+    """Resolve the requested model and hold its lock while the handler runs.
+    
+    The handler receives the model's state dict as its `model_state` argument.
+    With create=True an unknown model ID is created instead of rejected.
+    The model is first synced from the shared state backend, and any change the
+    handler makes is published back to it before the lock is released (GET
+    requests only take a shared lock and never publish).
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            model_id = requested_model_id()
+            try:
+                state = lookup_model(model_id, create=create)
+            except (KeyError, RuntimeError) as e:
+                return jsonify({
+                    'success': False,
+                    'error': str(e).strip("'")
+                }), 404
+            read_only = request.method == 'GET'
+            with state['lock'], state_backend.lock(model_id, shared=read_only):
+                if not sync_model_state(state):
+                    model_registry.discard(model_id)
+                    return jsonify({
+                        'success': False,
+                        'error': f'Unknown model: {model_id}'
+                    }), 404
+                before = _state_fingerprint(state)
+                response = handler(*args, model_state=state, **kwargs)
+                if not read_only and _state_changed(before, _state_fingerprint(state)):
+                    maybe_auto_checkpoint(state)
+                    persist_model_state(state)
+                return response
+        return wrapper
+    return decorator(handler) if handler is not None else decorator
+
+# Warm the dataset cache in the background without delaying startup
+dataset_loader.preload(config.DATASET_PRELOAD)
+
+def warm_up_kernels(job: Job, metrics: List[str], activations: List[str], batch_sizes: List[int],
+                    optimizer_types: List[str], num_classes: int = 10, num_features: int = 784) -> Dict[str, Any]:
+    """Compile the forward, gradient and optax step kernels for each metric/activation/batch size"""
+    rng = np.random.default_rng(0)
+    weights = jnp.asarray(rng.normal(0.0, 0.1, (num_classes, num_features)))
+    biases = jnp.zeros(num_classes)
+    timings = []
+    
+    def timed(kernel, fn, **labels):
+        start = time.time()
+        jax.block_until_ready(fn())
+        timings.append(dict(labels, kernel=kernel, seconds=round(time.time() - start, 4)))
+    
+    def optax_step(calc, optimizer_type, features, labels, metric):
+        optimizer_config = {'optimizer_type': optimizer_type, 'learning_rate': 0.01, 'momentum': 0.9}
+        optimizer = build_optimizer(optimizer_config)
+        train_step = calc.optax_train_step(optimizer, optimizer_structure_key(optimizer_config))
+        # Copies, since the step donates its parameter and optimizer state buffers
+        step_params = (jnp.array(weights), jnp.array(biases))
+        return train_step(step_params, optimizer.init(step_params), features, labels, similarity_metric=metric)
+    
+    tasks = []
+    for calc in calculators.values():
+        for metric in metrics:
+            for activation in activations:
+                tasks.append(('forward', functools.partial(
+                    calc.forward_pass, weights, biases, jnp.asarray(rng.random(num_features)), metric, activation
+                ), {'metric': metric, 'activation': activation, 'batch_size': 1}))
+            for batch_size in batch_sizes:
+                features = jnp.asarray(rng.random((batch_size, num_features)))
+                labels = jnp.asarray(rng.integers(0, num_classes, batch_size))
+                for activation in activations:
+                    tasks.append(('gradients', functools.partial(
+                        calc.compute_gradients, weights, biases, features, labels, metric, activation
+                    ), {'metric': metric, 'activation': activation, 'batch_size': batch_size}))
+                for optimizer_type in optimizer_types:
+                    tasks.append(('optax_train_step', functools.partial(
+                        optax_step, calc, optimizer_type, features, labels, metric
+                    ), {'metric': metric, 'batch_size': batch_size, 'optimizer': optimizer_type}))
+    
+    start = time.time()
+    for i, (kernel, fn, labels) in enumerate(tasks):
+        job.update(progress=i / len(tasks), message=f"Compiling {kernel} {labels}")
+        timed(kernel, fn, **labels)
+    total = time.time() - start
+    
+    by_kernel = {}
+    for entry in timings:
+        by_kernel[entry['kernel']] = round(by_kernel.get(entry['kernel'], 0.0) + entry['seconds'], 4)
+    logger.info(f"Warm-up compiled {len(timings)} kernels in {total:.2f}s: {by_kernel}")
+    return {
+        'total_seconds': round(total, 4),
+        'num_kernels': len(timings),
+        'seconds_by_kernel': by_kernel,
+        # Not used by jax on CPU (see enable_compilation_cache)
+        'compilation_cache_dir': (config.JAX_CACHE_DIR or None) if jax.default_backend() != 'cpu' else None,
+        'kernels': timings
+    }
+
+# Compiled in the background once the server starts (see start_warmup); /health reports ready once it finishes
+warmup_jobs = JobManager(max_workers=1, name='warmup')
+warmup_job = None
+
+def start_warmup():
+    """Start compiling the configured kernels for every batch bucket, once per process.
+    
+    Called by the server entry points (__main__ and gunicorn.conf.py), so
+    importing this module (distributed workers, benchmark.py) compiles nothing.
+    """
+    global warmup_job
+    if config.WARMUP_ENABLED and warmup_job is None:
+        warmup_job = warmup_jobs.submit(
+            'warmup', 'startup', warm_up_kernels, config.WARMUP_METRICS, config.WARMUP_ACTIVATIONS,
+            config.BATCH_BUCKETS, config.WARMUP_OPTIMIZERS
+        )
+    return warmup_job
+
+def warmup_summary() -> Dict[str, Any]:
+    if warmup_job is None:
+        return {'status': 'not_started' if config.WARMUP_ENABLED else 'disabled'}
+    summary = warmup_job.to_dict()
+    if warmup_job.result is not None:
+        summary.update({key: value for key, value in warmup_job.result.items() if key != 'kernels'})
+    return summary
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint (503 until the startup warm-up has finished)"""
+    if warmup_job is not None and warmup_job.active:
+        return jsonify({
+            'status': 'warming_up',
+            'jax_devices': str(jax.devices()),
+            'warmup': warmup_summary()
+        }), 503
+    return jsonify({'status': 'healthy', 'jax_devices': str(jax.devices()), 'warmup': warmup_summary()})
+
+@app.route('/warmup', methods=['GET'])
+def get_warmup():
+    """Warm-up progress and per-kernel compile timings"""
+    return jsonify({
+        'success': True,
+        'warmup': warmup_summary(),
+        'kernels': warmup_job.result['kernels'] if warmup_job is not None and warmup_job.result else []
+    })
+
+@app.route('/models', methods=['GET'])
+def list_models():
+    """List registered models"""
+    # Pick up models created by other workers
+    for model_id in state_backend.list_ids():
+        state = model_registry.get_or_create(model_id)
+        with state['lock'], state_backend.lock(model_id, shared=True):
+            sync_model_state(state)
+    
+    return jsonify({
+        'success': True,
+        'models': model_registry.list()
+    })
+
+@app.route('/models', methods=['POST'])
+def create_model():
+    """Create a new, empty model with its own parameters, optimizer and history"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        overrides = {}
+        if 'use_ternary_weights' in data:
+            overrides['use_ternary_weights'] = bool(data['use_ternary_weights'])
+        
+        if data.get('model_id') and state_backend.exists(data['model_id']):
+            raise ValueError(f"Model already exists: {data['model_id']}")
+        
+        state = model_registry.create(data.get('model_id'), **overrides)
+        with state['lock'], state_backend.lock(state['model_id']):
+            persist_model_state(state)
+        
+        return jsonify({
+            'success': True,
+            'model_id': state['model_id'],
+            'use_ternary_weights': state['use_ternary_weights']
+        }), 201
+        
+    except Exception as e:
+        logger.error(f"Error creating model: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/models/<model_id>/clone', methods=['POST'])
+def clone_model(model_id):
+    """Clone a model, including weights, optimizer state, settings and history"""
+    try:
+        data = request.get_json(silent=True) or {}
+        new_model_id = data.get('new_model_id')
+        if new_model_id and state_backend.exists(new_model_id):
+            raise ValueError(f"Model already exists: {new_model_id}")
+        
+        source = lookup_model(model_id)
+        with source['lock'], state_backend.lock(model_id, shared=True):
+            if not sync_model_state(source):
+                raise KeyError(f"Unknown model: {model_id}")
+            state = model_registry.clone(model_id, new_model_id)
+        with state['lock'], state_backend.lock(state['model_id']):
+            persist_model_state(state)
+        
+        return jsonify({
+            'success': True,
+            'model_id': state['model_id'],
+            'source_model_id': model_id
+        }), 201
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except Exception as e:
+        logger.error(f"Error cloning model: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/models/<model_id>', methods=['DELETE'])
+def delete_model(model_id):
+    """Delete a model"""
+    try:
+        if model_id != DEFAULT_MODEL_ID and state_backend.exists(model_id):
+            # The model's thread lock first: the backend's file lock only excludes other processes
+            state = model_registry.get_or_create(model_id)
+            with state['lock'], state_backend.lock(model_id):
+                state_backend.delete(model_id)
+                model_registry.discard(model_id)
+        else:
+            model_registry.delete(model_id)
+        return jsonify({
+            'success': True,
+            'message': f'Deleted model {model_id}'
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/forward', methods=['POST'])
+def forward_pass():
+    """Perform forward pass for a single sample"""
+    try:
+        data = request.get_json()
+        
+        weights = request_array(data['weights'])
+        biases = request_array(data['biases'])
+        features = request_array(data['features'])
+        similarity_metric = data['similarity_metric']
+        activation_function = data['activation_function']
+        
+        result = calculator.forward_pass(weights, biases, features, similarity_metric, activation_function)
+        
+        return jsonify({
+            'success': True,
+            'result': result
+        })
+        
+    except Exception as e:
+        logger.error(f"Error in forward pass: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/gradients', methods=['POST'])
+def compute_gradients():
+    """Compute gradients for a batch"""
+    try:
+        data = request.get_json()
+        
+        weights = request_array(data['weights'])
+        biases = request_array(data['biases'])
+        batch_features = request_array(data['batch_features'])
+        batch_labels = request_array(data['batch_labels'])
+        similarity_metric = data['similarity_metric']
+        activation_function = data['activation_function']
+        
+        result = calculator.compute_gradients(
+            weights, biases, batch_features, batch_labels, 
+            similarity_metric, activation_function
         )
         
         return jsonify({
@@ -1007,9 +2345,9 @@ def batch_forward():
     try:
         data = request.get_json()
         
-        weights = jnp.array(data['weights'])
-        biases = jnp.array(data['biases'])
-        batch_features = jnp.array(data['batch_features'])
+        weights = request_array(data['weights'])
+        biases = request_array(data['biases'])
+        batch_features = request_array(data['batch_features'])
         similarity_metric = data['similarity_metric']
         activation_function = data['activation_function']
         
@@ -1031,16 +2369,121 @@ def batch_forward():
             'error': str(e)
         }), 400
 
+@app.route('/batch_forward/stream', methods=['POST'])
+def batch_forward_stream():
+    """Stream forward-pass results as NDJSON, one line per chunk (or per sample).
+    
+    Inputs are either inline `batch_features` or a dataset slice reference
+    (`dataset_name`, `subset`, `start_idx`, `count`). Weights default to the
+    current model when not provided.
+    
+    Only the dataset path runs in constant memory: inline `batch_features` are
+    parsed with the rest of the JSON body before the first line is streamed.
+    """
+    data = request.get_json(silent=True) or {}
+    
+    # Load the dataset before taking the model lock, so a slow load doesn't hold up training
+    dataset = None
+    if 'batch_features' not in data and 'dataset_name' in data:
+        try:
+            dataset = dataset_loader.get_dataset(data['dataset_name'], data.get('subset', 'test'))
+        except Exception as e:
+            logger.error(f"Error in streaming forward pass: {str(e)}")
+            return jsonify({
+                'success': False,
+                'error': str(e)
+            }), 400
+    
+    return _batch_forward_stream(data, dataset)
+
+@with_model
+def _batch_forward_stream(data, dataset, model_state):
+    try:
+        if 'weights' in data and 'biases' in data:
+            weights = request_array(data['weights'])
+            biases = request_array(data['biases'])
+        elif model_state['weights'] is not None and model_state['biases'] is not None:
+            # The stream outlives the model lock: copy, as the next train step donates these buffers
+            weights = jnp.array(model_state['weights'])
+            biases = jnp.array(model_state['biases'])
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'No weights available. Provide weights or train a model first.'
+            }), 400
+        
+        similarity_metric = data.get('similarity_metric', 'dotProduct')
+        activation_function = data.get('activation_function', 'softmax')
+        chunk_size = int(data.get('chunk_size', 256))
+        per_sample = data.get('granularity', 'chunk') == 'sample'
+        
+        if 'batch_features' in data:
+            batch_features = data['batch_features']
+            offset = 0
+            num_samples = len(batch_features)
+            labels = None
+            get_features = lambda start, end: batch_features[start:end]
+        elif dataset is not None:
+            offset = int(data.get('start_idx', 0))
+            total = len(dataset['features'])
+            num_samples = max(0, min(int(data.get('count', total - offset)), total - offset))
+            labels = dataset['labels']
+            get_features = lambda start, end: dataset['features'][offset + start:offset + end]
+        else:
+            return jsonify({
+                'success': False,
+                'error': 'Provide batch_features or a dataset_name slice'
+            }), 400
+        
+        def generate():
+            try:
+                for start, scores, activations in calculator.forward_chunks(
+                    weights, biases, num_samples, get_features,
+                    similarity_metric, activation_function, chunk_size
+                ):
+                    results = []
+                    for i in range(len(scores)):
+                        result = {
+                            'index': offset + start + i,
+                            'scores': to_list(scores[i]),
+                            'activations': to_list(activations[i]),
+                            'predicted_class': int(np.argmax(activations[i])),
+                            'confidence': float(np.max(activations[i]))
+                        }
+                        if labels is not None:
+                            result['label'] = int(labels[offset + start + i])
+                        results.append(result)
+                    
+                    if per_sample:
+                        for result in results:
+                            yield json.dumps(result) + '\n'
+                    else:
+                        yield json.dumps({'start': offset + start, 'results': results}) + '\n'
+                
+                yield json.dumps({'done': True, 'num_samples': num_samples}) + '\n'
+            except Exception as e:
+                logger.error(f"Error in streaming forward pass: {str(e)}")
+                yield json.dumps({'done': True, 'error': str(e)}) + '\n'
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+        
+    except Exception as e:
+        logger.error(f"Error in streaming forward pass: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
 @app.route('/accuracy', methods=['POST'])
 def compute_accuracy():
     """Compute accuracy on test data"""
     try:
         data = request.get_json()
         
-        weights = jnp.array(data['weights'])
-        biases = jnp.array(data['biases'])
-        test_features = jnp.array(data['test_features'])
-        test_labels = jnp.array(data['test_labels'])
+        weights = request_array(data['weights'])
+        biases = request_array(data['biases'])
+        test_features = request_array(data['test_features'])
+        test_labels = request_array(data['test_labels'])
         similarity_metric = data['similarity_metric']
         activation_function = data['activation_function']
         
@@ -1051,7 +2494,7 @@ def compute_accuracy():
         
         return jsonify({
             'success': True,
-            'accuracy': accuracy.tolist() if hasattr(accuracy, 'tolist') else float(accuracy)
+            'accuracy': to_list(accuracy) if hasattr(accuracy, 'tolist') else float(accuracy)
         })
         
     except Exception as e:
@@ -1061,8 +2504,76 @@ def compute_accuracy():
             'error': str(e)
         }), 400
 
+@app.route('/evaluate', methods=['POST'])
+@with_model
+def evaluate_model(model_state):
+    """Evaluate the current model on a cached dataset split, entirely server-side"""
+    try:
+        data = request.get_json()
+        
+        dataset_name = data.get('dataset_name', 'mnist')
+        subset = data.get('subset', 'test')
+        similarity_metric = data.get('similarity_metric', 'dotProduct')
+        activation_function = data.get('activation_function', 'softmax')
+        chunk_size = int(data.get('chunk_size', 1024))
+        max_samples = data.get('max_samples', None)
+        
+        if model_state['weights'] is None or model_state['biases'] is None:
+            return jsonify({
+                'success': False,
+                'error': 'Model not initialized. Initialize model first.'
+            }), 400
+        
+        # Results are cached per model version; any weight update invalidates them
+        version = model_state['model_version']
+        cache_key = (version, dataset_name, subset, similarity_metric, activation_function, max_samples)
+        result = model_state['evaluation_cache'].get(cache_key)
+        cached = result is not None
+        
+        if not cached:
+            with dataset_loader.pinned(dataset_name, subset):
+                dataset = dataset_loader.get_dataset(dataset_name, subset, max_samples)
+                if dataset['labels'] is None:
+                    return jsonify({
+                        'success': False,
+                        'error': f'{dataset_name} {subset} has no labels to evaluate against'
+                    }), 400
+                
+                result = calculator.evaluate(
+                    model_state['weights'], model_state['biases'],
+                    dataset['features'], dataset['labels'],
+                    similarity_metric, activation_function, chunk_size
+                )
+                result.update({'dataset_name': dataset_name, 'subset': subset, 'model_version': version})
+                
+                # Keep only results for the current model version
+                model_state['evaluation_cache'] = {
+                    key: value for key, value in model_state['evaluation_cache'].items() if key[0] == version
+                }
+                model_state['evaluation_cache'][cache_key] = result
+        
+        # Only a full-split evaluation stands for the model's accuracy in /training/metrics
+        if max_samples is None:
+            if subset == 'test':
+                model_state['last_test_accuracy'] = result['accuracy']
+            else:
+                model_state['last_train_accuracy'] = result['accuracy']
+        
+        return jsonify({
+            'success': True,
+            'result': dict(result, cached=cached)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error evaluating model: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
 @app.route('/optimizer/init', methods=['POST'])
-def init_optimizer():
+@with_model
+def init_optimizer(model_state):
     """Initialize Optax optimizer"""
     try:
         data = request.get_json()
@@ -1072,20 +2583,41 @@ def init_optimizer():
         momentum = data.get('momentum', 0.9)
         weight_decay = data.get('weight_decay', 0.0)
         
-        # Initialize optimizer based on type
-        if optimizer_type == 'sgd':
-            if momentum > 0:
-                optimizer = optax.sgd(learning_rate=learning_rate, momentum=momentum)
-            else:
-                optimizer = optax.sgd(learning_rate=learning_rate)
-        elif optimizer_type == 'adam':
-            optimizer = optax.adam(learning_rate=learning_rate, weight_decay=weight_decay)
-        elif optimizer_type == 'adamw':
-            optimizer = optax.adamw(learning_rate=learning_rate, weight_decay=weight_decay)
-        else:
+        # Gradient accumulation: average this many posted batches per optimizer update
+        accumulation_steps = int(data.get('accumulation_steps', 1))
+        if accumulation_steps < 1:
+            return jsonify({
+                'success': False,
+                'error': 'accumulation_steps must be at least 1'
+            }), 400
+        
+        optimizer_config = {
+            'optimizer_type': optimizer_type,
+            'learning_rate': learning_rate,
+            'momentum': momentum,
+            'weight_decay': weight_decay,
+            'accumulation_steps': accumulation_steps,
+            # Learning rate schedule: constant, cosine or step, each with optional linear warmup
+            'lr_schedule': data.get('lr_schedule', 'constant'),
+            'warmup_steps': int(data.get('warmup_steps', 0)),
+            'decay_steps': int(data.get('decay_steps', 1000)),
+            'end_learning_rate': data.get('end_learning_rate', 0.0),
+            'step_size': int(data.get('step_size', 100)),
+            'decay_rate': data.get('decay_rate', 0.5),
+            # Data-parallel training: shard each batch across this many local devices (0 = all)
+            'data_parallel': bool(data.get('data_parallel', False)),
+            'num_devices': int(data.get('num_devices', 0))
+        }
+        try:
+            optimizer = build_optimizer(optimizer_config)
+            if train_step_devices(optimizer_config) > jax.local_device_count():
+                raise ValueError(f"{optimizer_config['num_devices']} devices requested but only "
+                                 f"{jax.local_device_count()} available (set JAX_HOST_DEVICE_COUNT to split "
+                                 f"the CPU into more devices)")
+        except ValueError as e:
             return jsonify({
                 'success': False,
-                'error': f'Unknown optimizer type: {optimizer_type}'
+                'error': str(e)
             }), 400
         
         # Initialize optimizer state if we have weights
@@ -1093,8 +2625,9 @@ def init_optimizer():
             params = (model_state['weights'], model_state['biases'])
             opt_state = optimizer.init(params)
             
-            # Store in global state
+            # Store in the model's state
             model_state['optimizer'] = optimizer
+            model_state['optimizer_config'] = optimizer_config
             model_state['opt_state'] = opt_state
             
             return jsonify({
@@ -1104,7 +2637,11 @@ def init_optimizer():
                     'optimizer_type': optimizer_type,
                     'learning_rate': learning_rate,
                     'momentum': momentum if optimizer_type == 'sgd' else None,
-                    'weight_decay': weight_decay if 'adam' in optimizer_type else None
+                    'weight_decay': weight_decay if 'adam' in optimizer_type else None,
+                    'accumulation_steps': accumulation_steps,
+                    'lr_schedule': optimizer_config['lr_schedule'],
+                    'warmup_steps': optimizer_config['warmup_steps'],
+                    'num_devices': train_step_devices(optimizer_config)
                 }
             })
         else:
@@ -1120,14 +2657,73 @@ def init_optimizer():
             'error': str(e)
         }), 400
 
+def record_optax_step(state: Dict[str, Any], step: Dict[str, Any], similarity_metric: str) -> Dict[str, Any]:
+    """Store the result of a fused optax step (see JAXMNISTCalculator._optax_train_step) in a model's state"""
+    new_weights, new_biases = step['weights'], step['biases']
+    applied = bool(step['applied'])
+    loss = float(step['loss'])
+    gradient_norms = {
+        'weight_gradient_norm': float(step['weight_gradient_norm']),
+        'bias_gradient_norm': float(step['bias_gradient_norm'])
+    }
+    if bool(step['has_nan']):
+        logger.warning(f"NaN or infinity detected in gradients for {similarity_metric}, using zeros")
+    
+    # Update the model's state (weights only change on the last micro-batch of an accumulation)
+    state['weights'] = new_weights
+    state['biases'] = new_biases
+    state['opt_state'] = step['opt_state']
+    state['last_loss'] = loss
+    state['last_gradient_norm'] = gradient_norms['weight_gradient_norm']
+    progress = optimizer_progress(step['opt_state'])
+    
+    if applied:
+        state['model_version'] += 1
+        state['current_epoch'] += 1
+        
+        # Ternary training keeps the unquantized weights as shadow weights
+        if state['use_ternary_weights']:
+            state['shadow_weights'] = step['shadow_weights']
+            negative_one, zero, positive_one = (int(count) for count in step['ternary_counts'])
+            total = int(new_weights.size)
+            state['weight_distribution'] = {
+                'negative_one_ratio': negative_one / total,
+                'zero_ratio': zero / total,
+                'positive_one_ratio': positive_one / total,
+                'total_weights': total
+            }
+    
+    # Add to training history
+    state['training_history'].append({
+        'epoch': state['current_epoch'],
+        'loss': loss,
+        'gradient_norm': gradient_norms['weight_gradient_norm'],
+        'optimizer': 'optax',
+        'learning_rate': progress['learning_rate'],
+        'applied': applied
+    })
+    
+    # Keep only last 100 history entries
+    if len(state['training_history']) > 100:
+        state['training_history'] = state['training_history'][-100:]
+    count_training_steps('optax')
+    
+    return {
+        'loss': loss,
+        'gradient_norms': gradient_norms,
+        'applied': applied,
+        'progress': progress
+    }
+
 @app.route('/train_step_optax', methods=['POST'])
-def train_step_optax():
+@with_model
+def train_step_optax(model_state):
     """Perform a single training step using Optax optimizer"""
     try:
         data = request.get_json()
         
-        batch_features = jnp.array(data['batch_features'])
-        batch_labels = jnp.array(data['batch_labels'])
+        batch_features = request_array(data['batch_features'])
+        batch_labels = request_array(data['batch_labels'])
         similarity_metric = data['similarity_metric']
         
         # Check if optimizer is initialized
@@ -1144,68 +2740,33 @@ def train_step_optax():
                 'error': 'Model not initialized. Initialize model first.'
             }), 400
         
-        # Get current parameters
+        # Current parameters and optimizer state are donated to the fused step and updated in place
         params = (model_state['weights'], model_state['biases'])
-        optimizer = model_state['optimizer']
-        opt_state = model_state['opt_state']
-        
-        # Compute gradients using Optax loss
-        grad_result = calculator.compute_optax_gradients(
-            params, batch_features, batch_labels, similarity_metric
+        calc = get_calculator(model_state)
+        num_devices = train_step_devices(model_state['optimizer_config'])
+        train_step = calc.optax_train_step(
+            model_state['optimizer'], optimizer_structure_key(model_state['optimizer_config']), num_devices
         )
+        step = train_step(params, model_state['opt_state'], batch_features, batch_labels,
+                          similarity_metric=similarity_metric)
         
-        gradients = (grad_result['weight_gradients'], grad_result['bias_gradients'])
-        
-        # Apply optimizer update
-        updates, new_opt_state = optimizer.update(gradients, opt_state, params)
-        new_params = optax.apply_updates(params, updates)
-        
-        new_weights, new_biases = new_params
-        
-        # Handle ternary weight quantization if enabled
-        if calculator.use_ternary_weights:
-            # Store shadow weights for ternary training
-            if 'shadow_weights' not in model_state:
-                model_state['shadow_weights'] = new_weights.astype(jnp.float64)
-            else:
-                model_state['shadow_weights'] = new_weights
-            
-            # Quantize the weights
-            new_weights = calculator._quantize_to_ternary(new_weights)
-            
-            logger.info(f"Applied ternary quantization. Distribution: {calculator._analyze_ternary_distribution(new_weights)}")
-        
-        # Update global model state
-        model_state['weights'] = new_weights
-        model_state['biases'] = new_biases
-        model_state['opt_state'] = new_opt_state
-        model_state['last_loss'] = float(grad_result['loss'])
-        model_state['last_gradient_norm'] = grad_result['gradient_norms']['weight_gradient_norm']
-        model_state['current_epoch'] += 1
-        
-        # Update weight distribution for ternary weights
-        if calculator.use_ternary_weights:
-            model_state['weight_distribution'] = calculator._analyze_ternary_distribution(new_weights)
-        
-        # Add to training history
-        model_state['training_history'].append({
-            'epoch': model_state['current_epoch'],
-            'loss': float(grad_result['loss']),
-            'gradient_norm': grad_result['gradient_norms']['weight_gradient_norm'],
-            'optimizer': 'optax'
-        })
-        
-        # Keep only last 100 history entries
-        if len(model_state['training_history']) > 100:
-            model_state['training_history'] = model_state['training_history'][-100:]
+        record = record_optax_step(model_state, step, similarity_metric)
+        new_weights, new_biases = model_state['weights'], model_state['biases']
+        loss, gradient_norms, applied = record['loss'], record['gradient_norms'], record['applied']
+        progress = record['progress']
         
         return jsonify({
             'success': True,
             'result': {
-                'new_weights': new_weights.tolist(),
-                'new_biases': new_biases.tolist(),
-                'loss': float(grad_result['loss']),
-                'gradient_norms': grad_result['gradient_norms']
+                'new_weights': to_list(new_weights),
+                'new_biases': to_list(new_biases),
+                'loss': loss,
+                'gradient_norms': gradient_norms,
+                'applied': applied,
+                'accumulation_step': progress['accumulation_step'],
+                'accumulation_steps': model_state['optimizer_config'].get('accumulation_steps', 1),
+                'learning_rate': progress['learning_rate'],
+                'num_devices': num_devices
             }
         })
         
@@ -1217,15 +2778,16 @@ def train_step_optax():
         }), 400
 
 @app.route('/train_step', methods=['POST'])
-def train_step():
+@with_model
+def train_step(model_state):
     """Perform a single training step"""
     try:
         data = request.get_json()
         
-        weights = jnp.array(data['weights'])
-        biases = jnp.array(data['biases'])
-        batch_features = jnp.array(data['batch_features'])
-        batch_labels = jnp.array(data['batch_labels'])
+        weights = request_array(data['weights'])
+        biases = request_array(data['biases'])
+        batch_features = request_array(data['batch_features'])
+        batch_labels = request_array(data['batch_labels'])
         similarity_metric = data['similarity_metric']
         activation_function = data['activation_function']
         learning_rate = data.get('learning_rate', 0.01)
@@ -1246,30 +2808,35 @@ def train_step():
         bias_gradients = jnp.array(grad_result['bias_gradients'])
         
         # For ternary weights, we need to accumulate gradients to avoid losing small updates
-        if calculator.use_ternary_weights:
+        if model_state['use_ternary_weights']:
             # Get or initialize accumulated gradients in model state
-            if 'accumulated_weight_gradients' not in model_state:
+            if model_state.get('accumulated_weight_gradients') is None:
                 model_state['accumulated_weight_gradients'] = jnp.zeros_like(weights)
             
             # Accumulate gradients
             accumulated_grads = model_state['accumulated_weight_gradients'] + learning_rate * weight_gradients
             
             # Apply updates to a "shadow" copy of weights (continuous values)
-            if 'shadow_weights' not in model_state:
-                model_state['shadow_weights'] = weights.astype(jnp.float64)
+            if model_state.get('shadow_weights') is None:
+                # A copy: astype() to the same dtype returns the weights array itself, which train steps donate
+                model_state['shadow_weights'] = jnp.array(weights, dtype=jnp.float64)
             
             shadow_weights = model_state['shadow_weights'] - learning_rate * weight_gradients
             
             # Quantize the shadow weights to get the actual ternary weights
-            new_weights = calculator._quantize_to_ternary(shadow_weights)
+            new_weights = get_calculator(model_state)._quantize_to_ternary(shadow_weights)
             
             # Update shadow weights and accumulated gradients
             model_state['shadow_weights'] = shadow_weights
             model_state['accumulated_weight_gradients'] = accumulated_grads
             
-            logger.info(f"Ternary training - Shadow weight norm: {jnp.linalg.norm(shadow_weights):.6f}, "
-                       f"Accumulated grad norm: {jnp.linalg.norm(accumulated_grads):.6f}")
-            logger.info(f"Applied ternary quantization. Distribution: {calculator._analyze_ternary_distribution(new_weights)}")
+            if diagnostics.sample('ternary_training'):
+                diagnostics.record('ternary_training', {
+                    'shadow_weight_norm': jnp.linalg.norm(shadow_weights),
+                    'accumulated_gradient_norm': jnp.linalg.norm(accumulated_grads),
+                    'ternary_counts': jnp.stack([jnp.sum(new_weights == -1.0), jnp.sum(new_weights == 0.0),
+                                                 jnp.sum(new_weights == 1.0)])
+                }, model_id=model_state['model_id'])
         else:
             # Standard gradient update for continuous weights
             new_weights = weights - learning_rate * weight_gradients
@@ -1277,26 +2844,30 @@ def train_step():
         # Always update biases normally (they're not ternary)
         new_biases = biases - learning_rate * bias_gradients
         
-        # Log training statistics for debugging (convert to Python scalars outside of traced functions)
+        # Training statistics for the response and sampled diagnostics
         weight_grad_norm = jnp.linalg.norm(weight_gradients)
         bias_grad_norm = jnp.linalg.norm(bias_gradients)
         weight_norm = jnp.linalg.norm(weights)
         
-        logger.info(f"Training step - Loss: {grad_result['loss']:.6f}, "
-                   f"Weight grad norm: {weight_grad_norm:.6f}, "
-                   f"Bias grad norm: {bias_grad_norm:.6f}, "
-                   f"Weight norm: {weight_norm:.6f}, "
-                   f"LR: {learning_rate}")
+        if diagnostics.sample('train_step'):
+            diagnostics.record('train_step', {
+                'loss': grad_result['loss'],
+                'weight_gradient_norm': weight_grad_norm,
+                'bias_gradient_norm': bias_grad_norm,
+                'weight_norm': weight_norm,
+                'learning_rate': learning_rate
+            }, model_id=model_state['model_id'], similarity_metric=similarity_metric)
         
         # Update global model state
         model_state['weights'] = new_weights
         model_state['biases'] = new_biases
+        model_state['model_version'] += 1
         model_state['last_loss'] = float(grad_result['loss'])
         model_state['last_gradient_norm'] = float(weight_grad_norm)
         model_state['current_epoch'] += 1
         
         # Update weight distribution for ternary weights
-        if calculator.use_ternary_weights:
+        if model_state['use_ternary_weights']:
             model_state['weight_distribution'] = calculator._analyze_ternary_distribution(new_weights)
         
         # Add to training history
@@ -1310,12 +2881,13 @@ def train_step():
         # Keep only last 100 history entries
         if len(model_state['training_history']) > 100:
             model_state['training_history'] = model_state['training_history'][-100:]
+        count_training_steps('train_step')
         
         return jsonify({
             'success': True,
             'result': {
-                'new_weights': new_weights.tolist(),
-                'new_biases': new_biases.tolist(),
+                'new_weights': to_list(new_weights),
+                'new_biases': to_list(new_biases),
                 'loss': grad_result['loss'],
                 'weight_gradients': grad_result['weight_gradients'],
                 'bias_gradients': grad_result['bias_gradients'],
@@ -1340,44 +2912,31 @@ def test_yat_product():
     try:
         data = request.get_json()
         
-        weights = jnp.array(data['weights'])  # Shape: (num_classes, features)
-        features = jnp.array(data['features'])  # Shape: (features,)
+        weights = request_array(data['weights'])  # Shape: (num_classes, features)
+        features = request_array(data['features'])  # Shape: (features,)
         
-        # Test YAT product
-        yat_scores = calculator._yat_product(weights, features)
-        
-        # Also compute other similarities for comparison
-        dot_scores = calculator._dot_product(weights, features)
-        euclidean_scores = calculator._euclidean(weights, features)
-        
-        # Compute some diagnostic information
-        dot_products = jnp.dot(weights, features)
-        euclidean_distances = jnp.linalg.norm(weights - features, axis=-1)
-        
-        # Verify the new YAT formula is equivalent to the old one
-        # Old formula: (dot²) / (||x-w||² + ε)
-        old_yat_scores = []
-        for i in range(weights.shape[0]):
-            w = weights[i]
-            old_dist_sq = jnp.sum((features - w) ** 2)
-            old_score = (dot_products[i] ** 2) / (old_dist_sq + 1e-3)
-            old_yat_scores.append(float(old_score))
+        # All scores and diagnostics from one kernel sharing x·w, ||x||² and ||w||²
+        report = {key: np.asarray(value) for key, value in calculator._similarity_report_jit(
+            weights.astype(jnp.float64), features.astype(jnp.float64)
+        ).items()}
+        yat_scores = report['yat_scores']
+        old_yat_scores = report['yat_scores_old_formula']
         
         return jsonify({
             'success': True,
-            'yat_scores_new': yat_scores.tolist(),
-            'yat_scores_old_formula': old_yat_scores,
-            'dot_scores': dot_scores.tolist(),
-            'euclidean_scores': euclidean_scores.tolist(),
+            'yat_scores_new': to_list(yat_scores),
+            'yat_scores_old_formula': to_list(old_yat_scores),
+            'dot_scores': to_list(report['dot_scores']),
+            'euclidean_scores': to_list(report['euclidean_scores']),
             'diagnostics': {
-                'dot_products': dot_products.tolist(),
-                'euclidean_distances': euclidean_distances.tolist(),
-                'weights_norm': jnp.linalg.norm(weights).tolist(),
-                'features_norm': jnp.linalg.norm(features).tolist(),
-                'yat_new_min': jnp.min(yat_scores).tolist(),
-                'yat_new_max': jnp.max(yat_scores).tolist(),
-                'yat_new_mean': jnp.mean(yat_scores).tolist(),
-                'formula_difference': [abs(new - old) for new, old in zip(yat_scores.tolist(), old_yat_scores)]
+                'dot_products': to_list(report['dot_products']),
+                'euclidean_distances': to_list(report['euclidean_distances']),
+                'weights_norm': float(report['weights_norm']),
+                'features_norm': float(report['features_norm']),
+                'yat_new_min': float(yat_scores.min()),
+                'yat_new_max': float(yat_scores.max()),
+                'yat_new_mean': float(yat_scores.mean()),
+                'formula_difference': to_list(np.abs(yat_scores - old_yat_scores))
             }
         })
         
@@ -1394,36 +2953,21 @@ def debug_gradients():
     try:
         data = request.get_json()
         
-        weights = jnp.array(data['weights'])
-        biases = jnp.array(data['biases'])
-        batch_features = jnp.array(data['batch_features'][:5])  # Use only first 5 samples for debugging
-        batch_labels = jnp.array(data['batch_labels'][:5])
+        weights = request_array(data['weights'])
+        biases = request_array(data['biases'])
+        batch_features = request_array(data['batch_features'][:5])  # Use only first 5 samples for debugging
+        batch_labels = request_array(data['batch_labels'][:5])
         activation_function = data['activation_function']
         
-        results = {}
-        
-        # Test different similarity metrics
-        metrics_to_test = ['dotProduct', 'euclidean', 'yatProduct']
-        
-        for metric in metrics_to_test:
-            try:
-                grad_result = calculator.compute_gradients(
-                    weights, biases, batch_features, batch_labels,
-                    metric, activation_function
-                )
-                
-                weight_grad_norm = jnp.linalg.norm(jnp.array(grad_result['weight_gradients']))
-                
-                results[metric] = {
-                    'loss': grad_result['loss'],
-                    'weight_gradient_norm': float(weight_grad_norm),
-                    'weight_gradient_max': float(jnp.max(jnp.abs(jnp.array(grad_result['weight_gradients'])))),
-                    'weight_gradient_mean': float(jnp.mean(jnp.abs(jnp.array(grad_result['weight_gradients'])))),
-                    'bias_gradient_norm': float(jnp.linalg.norm(jnp.array(grad_result['bias_gradients'])))
-                }
-                
-            except Exception as e:
-                results[metric] = {'error': str(e)}
+        # Test different similarity metrics (all in one pass over shared statistics)
+        metrics_to_test = data.get('similarity_metrics', ['dotProduct', 'euclidean', 'yatProduct'])
+        known = [metric for metric in metrics_to_test if metric in calculator.similarity_functions]
+        results = {metric: {'error': f'Unknown similarity metric: {metric}'}
+                   for metric in metrics_to_test if metric not in calculator.similarity_functions}
+        if known:
+            results.update(calculator.multi_metric_diagnostics(
+                weights, biases, batch_features, batch_labels, known, activation_function
+            ))
         
         return jsonify({
             'success': True,
@@ -1437,21 +2981,122 @@ def debug_gradients():
             'error': str(e)
         }), 400
 
-@app.route('/kaggle/status', methods=['GET'])
-def kaggle_status():
-    """Check Kaggle API status and configuration"""
+@app.route('/diagnostics', methods=['GET'])
+def get_diagnostics():
+    """Sampled diagnostic records (newest last); filter with kind, since (record ID) and limit"""
     try:
-        is_setup = dataset_loader.check_kaggle_setup()
+        records = diagnostics.query(
+            kind=request.args.get('kind'),
+            since_id=int(request.args.get('since', 0)),
+            limit=int(request.args.get('limit', 100))
+        )
+        return jsonify({
+            'success': True,
+            'config': diagnostics.stats(),
+            'records': records
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/diagnostics/config', methods=['POST'])
+def configure_diagnostics():
+    """Enable or disable diagnostics and set the sampling rate (every Nth event) and buffer size"""
+    try:
+        data = request.get_json(silent=True) or {}
+        diagnostics.configure(
+            enabled=bool(data['enabled']) if 'enabled' in data else None,
+            sample_every=int(data['sample_every']) if 'sample_every' in data else None,
+            capacity=int(data['capacity']) if 'capacity' in data else None
+        )
+        return jsonify({
+            'success': True,
+            'config': diagnostics.stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error configuring diagnostics: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/diagnostics/clear', methods=['POST'])
+def clear_diagnostics():
+    """Drop all collected diagnostic records"""
+    cleared = diagnostics.clear()
+    return jsonify({
+        'success': True,
+        'cleared': cleared
+    })
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Process metrics in the Prometheus text exposition format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/timing', methods=['GET'])
+def get_request_timing():
+    """Rolling per-route breakdown of timed requests (mean ms per phase, total latency percentiles)"""
+    return jsonify({
+        'success': True,
+        'config': request_timer.stats(),
+        'routes': request_timer.breakdown(request.args.get('route'))
+    })
+
+@app.route('/timing/config', methods=['POST'])
+def configure_request_timing():
+    """Time every request (or only those sending `X-Server-Timing: 1`) and set the per-route history length"""
+    try:
+        data = request.get_json(silent=True) or {}
+        request_timer.configure(
+            enabled=bool(data['enabled']) if 'enabled' in data else None,
+            history=int(data['history']) if 'history' in data else None
+        )
+        return jsonify({
+            'success': True,
+            'config': request_timer.stats()
+        })
+        
+    except Exception as e:
+        logger.error(f"Error configuring request timing: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/timing/clear', methods=['POST'])
+def clear_request_timing():
+    """Drop the recorded request timings"""
+    cleared = request_timer.clear()
+    return jsonify({
+        'success': True,
+        'cleared': cleared
+    })
+
+@app.route('/kaggle/status', methods=['GET'])
+def kaggle_status():
+    """Check Kaggle API status and configuration"""
+    try:
+        # The probe result is cached; ?refresh=true forces a new `kaggle --version` check
+        refresh = request.args.get('refresh', 'false').lower() == 'true'
+        is_setup = dataset_loader.check_kaggle_setup(force=refresh)
+        
+        kaggle_datasets = [k for k, v in dataset_loader.datasets.items() if v['source'] == 'kaggle']
         
         status = {
             'kaggle_api_installed': is_setup,
-            'available_kaggle_datasets': []
+            'available_kaggle_datasets': [],
+            'downloaded_datasets': [name for name in kaggle_datasets if dataset_loader.kaggle_files_present(name)],
+            'active_downloads': [job.to_dict() for job in dataset_loader.download_jobs.list('kaggle_download') if job.active]
         }
         
         if is_setup:
             # List available Kaggle datasets from our configuration
-            kaggle_datasets = {k: v for k, v in dataset_loader.datasets.items() if v['source'] == 'kaggle'}
-            status['available_kaggle_datasets'] = list(kaggle_datasets.keys())
+            status['available_kaggle_datasets'] = kaggle_datasets
         
         return jsonify({
             'success': True,
@@ -1467,7 +3112,7 @@ def kaggle_status():
 
 @app.route('/kaggle/download', methods=['POST'])
 def download_kaggle_dataset():
-    """Download a specific dataset from Kaggle"""
+    """Start a background download of a specific dataset from Kaggle"""
     try:
         data = request.get_json()
         dataset_name = data.get('dataset_name')
@@ -1492,27 +3137,32 @@ def download_kaggle_dataset():
                 'error': f'Dataset {dataset_name} is not a Kaggle dataset'
             }), 400
         
-        # Download the dataset
-        if 'c/' in dataset_info['kaggle_dataset']:
-            # Competition dataset
-            competition = dataset_info['kaggle_dataset'].replace('c/', '')
-            success = dataset_loader.download_kaggle_competition(competition)
-        else:
-            # Regular dataset
-            success = dataset_loader.download_kaggle_dataset(dataset_info['kaggle_dataset'])
-        
-        if success:
+        # Nothing to do if the extracted files are already on disk
+        if dataset_loader.kaggle_files_present(dataset_name):
             return jsonify({
                 'success': True,
-                'message': f'Successfully downloaded {dataset_name}',
-                'kaggle_dataset': dataset_info['kaggle_dataset']
+                'message': f'{dataset_name} is already downloaded',
+                'kaggle_dataset': dataset_info['kaggle_dataset'],
+                'already_present': True
             })
-        else:
+        
+        if not dataset_loader.check_kaggle_setup():
             return jsonify({
                 'success': False,
-                'error': f'Failed to download {dataset_name}'
+                'error': 'Kaggle API not available. Install with: pip install kaggle'
             }), 400
         
+        # Download in the background; poll /kaggle/download/<job_id> for progress
+        job = dataset_loader.submit_kaggle_download(dataset_name)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Downloading {dataset_name}',
+            'kaggle_dataset': dataset_info['kaggle_dataset'],
+            'already_present': False,
+            'job': job.to_dict()
+        }), 202
+        
     except Exception as e:
         logger.error(f"Error downloading Kaggle dataset: {str(e)}")
         return jsonify({
@@ -1520,6 +3170,29 @@ def download_kaggle_dataset():
             'error': str(e)
         }), 400
 
+@app.route('/kaggle/download/<job_id>', methods=['GET'])
+def get_kaggle_download_status(job_id):
+    """Get status and progress of a background Kaggle download"""
+    job = dataset_loader.download_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown download job: {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+@app.route('/kaggle/jobs', methods=['GET'])
+def list_kaggle_downloads():
+    """List recent Kaggle download jobs"""
+    return jsonify({
+        'success': True,
+        'jobs': [job.to_dict() for job in dataset_loader.download_jobs.list('kaggle_download')]
+    })
+
 @app.route('/datasets/available', methods=['GET'])
 def get_available_datasets():
     """Get list of available datasets"""
@@ -1545,12 +3218,22 @@ def load_dataset():
         subset = data.get('subset', 'train')  # 'train' or 'test'
         max_samples = data.get('max_samples', None)
         
-        dataset = dataset_loader.load_dataset(dataset_name, subset, max_samples)
+        # With wait=false, return immediately and let the client poll /datasets/status
+        if not data.get('wait', True) and not dataset_loader.is_loaded(dataset_name, subset):
+            job = dataset_loader.submit_load(dataset_name, subset)
+            return jsonify({
+                'success': True,
+                'ready': False,
+                'job': job.to_dict()
+            }), 202
+        
+        dataset = dataset_loader.get_dataset(dataset_name, subset, max_samples)
         
         # Convert numpy arrays to lists for JSON serialization
         # Note: We don't send the actual images/features to avoid huge JSON responses
         return jsonify({
             'success': True,
+            'ready': True,
             'dataset_info': {
                 'dataset_name': dataset['dataset_name'],
                 'num_samples': len(dataset['labels']),
@@ -1558,7 +3241,7 @@ def load_dataset():
                 'class_names': dataset['class_names'],
                 'feature_shape': list(dataset['features'].shape),
                 'image_shape': list(dataset['images'].shape),
-                'sample_labels': dataset['labels'][:10].tolist(),  # First 10 labels as sample
+                'sample_labels': to_list(dataset['labels'][:10]),  # First 10 labels as sample
             }
         })
         
@@ -1569,6 +3252,84 @@ def load_dataset():
             'error': str(e)
         }), 400
 
+@app.route('/datasets/status', methods=['GET'])
+def get_datasets_status():
+    """Get readiness and load progress for every dataset split"""
+    return jsonify({
+        'success': True,
+        'datasets': dataset_loader.dataset_status()
+    })
+
+@app.route('/datasets/jobs/<job_id>', methods=['GET'])
+def get_dataset_load_job(job_id):
+    """Get status and progress of a background dataset load"""
+    job = dataset_loader.load_jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown load job: {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+@app.route('/datasets/cache', methods=['GET'])
+def get_dataset_cache_stats():
+    """Get dataset cache usage and hit/miss/eviction counters"""
+    return jsonify({
+        'success': True,
+        'cache': dataset_loader.loaded_datasets.stats()
+    })
+
+@app.route('/datasets/cache/pin', methods=['POST'])
+def pin_dataset():
+    """Pin (or unpin) a dataset split so it is never evicted, e.g. while it feeds training"""
+    try:
+        data = request.get_json()
+        
+        dataset_name = data.get('dataset_name', 'mnist')
+        subset = data.get('subset', 'train')
+        pinned = data.get('pinned', True)
+        
+        if dataset_name not in dataset_loader.datasets:
+            return jsonify({
+                'success': False,
+                'error': f'Unknown dataset: {dataset_name}'
+            }), 400
+        
+        cache_key = f"{dataset_name}_{subset}"
+        if pinned:
+            dataset_loader.loaded_datasets.pin(cache_key)
+        else:
+            dataset_loader.loaded_datasets.unpin(cache_key)
+        
+        return jsonify({
+            'success': True,
+            'dataset_name': dataset_name,
+            'subset': subset,
+            'pinned': dataset_loader.loaded_datasets.is_pinned(cache_key)
+        })
+        
+    except Exception as e:
+        logger.error(f"Error pinning dataset: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/datasets/cache/clear', methods=['POST'])
+def clear_dataset_cache():
+    """Drop all unpinned datasets from memory"""
+    data = request.get_json(silent=True) or {}
+    removed = dataset_loader.loaded_datasets.clear(include_pinned=data.get('include_pinned', False))
+    return jsonify({
+        'success': True,
+        'removed': removed,
+        'cache': dataset_loader.loaded_datasets.stats()
+    })
+
 @app.route('/datasets/sample', methods=['POST'])
 def get_dataset_sample():
     """Get a sample of data from a loaded dataset"""
@@ -1581,16 +3342,16 @@ def get_dataset_sample():
         count = data.get('count', 100)
         
         # Load dataset if not cached
-        dataset = dataset_loader.load_dataset(dataset_name, subset)
+        dataset = dataset_loader.get_dataset(dataset_name, subset)
         
         end_idx = min(start_idx + count, len(dataset['labels']))
         
         return jsonify({
             'success': True,
             'data': {
-                'features': dataset['features'][start_idx:end_idx].tolist(),
-                'labels': dataset['labels'][start_idx:end_idx].tolist(),
-                'images': dataset['images'][start_idx:end_idx].tolist(),
+                'features': to_list(dataset['features'][start_idx:end_idx]),
+                'labels': to_list(dataset['labels'][start_idx:end_idx]),
+                'images': to_list(dataset['images'][start_idx:end_idx]),
                 'class_names': dataset['class_names'],
                 'start_idx': start_idx,
                 'end_idx': end_idx,
@@ -1617,7 +3378,7 @@ def get_training_batch():
         class_filter = data.get('class_filter', None)  # Optional: only include specific classes
         
         # Load dataset
-        dataset = dataset_loader.load_dataset(dataset_name, subset)
+        dataset = dataset_loader.get_dataset(dataset_name, subset)
         
         # Filter by classes if specified
         if class_filter is not None:
@@ -1640,8 +3401,8 @@ def get_training_batch():
         return jsonify({
             'success': True,
             'batch': {
-                'features': batch_features.tolist(),
-                'labels': batch_labels.tolist(),
+                'features': to_list(batch_features),
+                'labels': to_list(batch_labels),
                 'batch_size': len(batch_labels),
                 'class_names': dataset['class_names']
             }
@@ -1678,7 +3439,7 @@ def preprocess_image():
         
         return jsonify({
             'success': True,
-            'processed_features': processed[0].tolist(),  # First (and only) sample
+            'processed_features': to_list(processed[0]),  # First (and only) sample
             'original_shape': image_data.shape,
             'processed_shape': processed.shape
         })
@@ -1691,7 +3452,8 @@ def preprocess_image():
         }), 400
 
 @app.route('/model/weights', methods=['GET'])
-def get_model_weights():
+@with_model
+def get_model_weights(model_state):
     """Get current model weights and statistics"""
     try:
         if model_state['weights'] is None or model_state['biases'] is None:
@@ -1719,8 +3481,8 @@ def get_model_weights():
         return jsonify({
             'success': True,
             'result': {
-                'weights': weights.tolist() if hasattr(weights, 'tolist') else weights,
-                'biases': biases.tolist() if hasattr(biases, 'tolist') else biases,
+                'weights': to_list(weights) if hasattr(weights, 'tolist') else weights,
+                'biases': to_list(biases) if hasattr(biases, 'tolist') else biases,
                 'weight_stats': weight_stats
             }
         })
@@ -1733,7 +3495,8 @@ def get_model_weights():
         }), 500
 
 @app.route('/model/weights', methods=['POST'])
-def update_model_weights():
+@with_model
+def update_model_weights(model_state):
     """Update model weights"""
     try:
         data = request.get_json()
@@ -1745,8 +3508,9 @@ def update_model_weights():
             }), 400
         
         # Update global model state
-        model_state['weights'] = jnp.array(data['weights'])
-        model_state['biases'] = jnp.array(data['biases'])
+        model_state['weights'] = request_array(data['weights'])
+        model_state['biases'] = request_array(data['biases'])
+        model_state['model_version'] += 1
         
         # Compute updated statistics
         weights = model_state['weights']
@@ -1765,8 +3529,8 @@ def update_model_weights():
         return jsonify({
             'success': True,
             'result': {
-                'updated_weights': weights.tolist(),
-                'updated_biases': biases.tolist(),
+                'updated_weights': to_list(weights),
+                'updated_biases': to_list(biases),
                 'weight_stats': weight_stats
             }
         })
@@ -1779,7 +3543,8 @@ def update_model_weights():
         }), 500
 
 @app.route('/model/activations', methods=['POST'])
-def get_model_activations():
+@with_model
+def get_model_activations(model_state):
     """Get model activations for a specific input"""
     try:
         data = request.get_json()
@@ -1790,14 +3555,14 @@ def get_model_activations():
                 'error': 'Missing features in request'
             }), 400
         
-        features = jnp.array(data['features'])
+        features = request_array(data['features'])
         
         # Use provided weights/biases or global model state
         if 'weights' in data and 'biases' in data:
-            weights = jnp.array(data['weights'])
-            biases = jnp.array(data['biases'])
+            weights = request_array(data['weights'])
+            biases = request_array(data['biases'])
         elif model_state['weights'] is not None and model_state['biases'] is not None:
-            weights = model_state['weights']
+            weights = jnp.array(model_state['weights'])
             biases = model_state['biases']
         else:
             return jsonify({
@@ -1842,7 +3607,8 @@ def get_model_activations():
         }), 500
 
 @app.route('/model/weights/visualization', methods=['GET'])
-def get_weight_visualization():
+@with_model
+def get_weight_visualization(model_state):
     """Get weight visualization data"""
     try:
         if model_state['weights'] is None:
@@ -1880,8 +3646,8 @@ def get_weight_visualization():
                 
                 weight_images.append({
                     'class_id': class_id,
-                    'weight_matrix': weight_matrix.tolist(),
-                    'normalized_matrix': normalized_matrix.tolist(),
+                    'weight_matrix': to_list(weight_matrix),
+                    'normalized_matrix': to_list(normalized_matrix),
                     'stats': {
                         'min': float(min_w),
                         'max': float(max_w),
@@ -1902,8 +3668,8 @@ def get_weight_visualization():
                 
                 weight_images.append({
                     'class_id': i,
-                    'weight_matrix': weight_matrix.tolist(),
-                    'normalized_matrix': normalized_matrix.tolist(),
+                    'weight_matrix': to_list(weight_matrix),
+                    'normalized_matrix': to_list(normalized_matrix),
                     'stats': {
                         'min': float(min_w),
                         'max': float(max_w),
@@ -1929,7 +3695,8 @@ def get_weight_visualization():
         }), 500
 
 @app.route('/training/metrics', methods=['GET'])
-def get_training_metrics():
+@with_model
+def get_training_metrics(model_state):
     """Get current training metrics and progress"""
     try:
         return jsonify({
@@ -1956,7 +3723,8 @@ def get_training_metrics():
         }), 500
 
 @app.route('/model/initialize_ternary', methods=['POST'])
-def initialize_ternary_model():
+@with_model(create=True)
+def initialize_ternary_model(model_state):
     """Initialize model with ternary weights"""
     try:
         data = request.get_json()
@@ -1966,11 +3734,12 @@ def initialize_ternary_model():
         sparsity_ratio = data.get('sparsity_ratio', 0.3)
         
         # Initialize ternary weights
-        weights, biases = calculator.initialize_ternary_weights(num_classes, num_features, sparsity_ratio)
+        weights, biases = get_calculator(model_state).initialize_ternary_weights(num_classes, num_features, sparsity_ratio)
         
         # Update global model state
         model_state['weights'] = weights
         model_state['biases'] = biases
+        model_state['model_version'] += 1
         model_state['current_epoch'] = 0
         model_state['training_history'] = []
         
@@ -1980,14 +3749,14 @@ def initialize_ternary_model():
         return jsonify({
             'success': True,
             'result': {
-                'weights': weights.tolist(),
-                'biases': biases.tolist(),
+                'weights': to_list(weights),
+                'biases': to_list(biases),
                 'weight_distribution': weight_distribution,
                 'model_info': {
                     'num_classes': num_classes,
                     'num_features': num_features,
                     'sparsity_ratio': sparsity_ratio,
-                    'use_ternary_weights': calculator.use_ternary_weights
+                    'use_ternary_weights': model_state['use_ternary_weights']
                 }
             }
         })
@@ -2000,7 +3769,8 @@ def initialize_ternary_model():
         }), 500
 
 @app.route('/model/quantize_weights', methods=['POST'])
-def quantize_current_weights():
+@with_model
+def quantize_current_weights(model_state):
     """Force quantization of current weights to ternary values"""
     try:
         if model_state['weights'] is None:
@@ -2013,10 +3783,11 @@ def quantize_current_weights():
         current_weights = model_state['weights']
         
         # Apply ternary quantization
-        quantized_weights = calculator._quantize_to_ternary(current_weights)
+        quantized_weights = get_calculator(model_state)._quantize_to_ternary(current_weights)
         
         # Update model state
         model_state['weights'] = quantized_weights
+        model_state['model_version'] += 1
         
         # Analyze before and after
         original_distribution = calculator._analyze_ternary_distribution(current_weights)
@@ -2025,7 +3796,7 @@ def quantize_current_weights():
         return jsonify({
             'success': True,
             'result': {
-                'quantized_weights': quantized_weights.tolist(),
+                'quantized_weights': to_list(quantized_weights),
                 'original_distribution': original_distribution,
                 'quantized_distribution': quantized_distribution,
                 'quantization_applied': True
@@ -2040,7 +3811,8 @@ def quantize_current_weights():
         }), 500
 
 @app.route('/model/ternary_stats', methods=['GET'])
-def get_ternary_stats():
+@with_model
+def get_ternary_stats(model_state):
     """Get statistics about ternary weight distribution"""
     try:
         if model_state['weights'] is None:
@@ -2062,7 +3834,7 @@ def get_ternary_stats():
                 'class_id': i,
                 'distribution': class_distribution,
                 'weight_norm': float(jnp.linalg.norm(class_weights)),
-                'unique_values': list(set(class_weights.tolist()))
+                'unique_values': list(set(to_list(class_weights)))
             }
             per_class_stats.append(class_stats)
         
@@ -2075,11 +3847,11 @@ def get_ternary_stats():
             'success': True,
             'result': {
                 'is_ternary': bool(is_ternary),
-                'unique_values': unique_values.tolist(),
+                'unique_values': to_list(unique_values),
                 'overall_distribution': overall_distribution,
                 'per_class_stats': per_class_stats,
                 'total_parameters': int(weights.size),
-                'use_ternary_weights': calculator.use_ternary_weights
+                'use_ternary_weights': model_state['use_ternary_weights']
             }
         })
         
@@ -2091,7 +3863,8 @@ def get_ternary_stats():
         }), 500
 
 @app.route('/model/toggle_ternary', methods=['POST'])
-def toggle_ternary_weights():
+@with_model
+def toggle_ternary_weights(model_state):
     """Toggle ternary weights on/off"""
     try:
         data = request.get_json() or {}
@@ -2100,12 +3873,9 @@ def toggle_ternary_weights():
         if 'use_ternary_weights' in data:
             new_setting = bool(data['use_ternary_weights'])
         else:
-            new_setting = not calculator.use_ternary_weights
-        
-        # Update the calculator setting
-        calculator.use_ternary_weights = new_setting
+            new_setting = not model_state['use_ternary_weights']
         
-        # Update model state
+        # Update the model's setting
         model_state['use_ternary_weights'] = new_setting
         
         logger.info(f"Ternary weights {'enabled' if new_setting else 'disabled'}")
@@ -2126,7 +3896,8 @@ def toggle_ternary_weights():
         }), 500
 
 @app.route('/optimizer/status', methods=['GET'])
-def get_optimizer_status():
+@with_model
+def get_optimizer_status(model_state):
     """Get current optimizer status and configuration"""
     try:
         if model_state['optimizer'] is None:
@@ -2142,7 +3913,9 @@ def get_optimizer_status():
         # Extract optimizer information (this is a bit tricky with Optax)
         optimizer_info = {
             'initialized': True,
+            'config': model_state['optimizer_config'],
             'has_state': model_state['opt_state'] is not None,
+            'progress': optimizer_progress(model_state['opt_state']) if model_state['opt_state'] is not None else None,
             'current_epoch': model_state['current_epoch']
         }
         
@@ -2159,10 +3932,12 @@ def get_optimizer_status():
         }), 500
 
 @app.route('/optimizer/reset', methods=['POST'])
-def reset_optimizer():
+@with_model
+def reset_optimizer(model_state):
     """Reset optimizer state"""
     try:
         model_state['optimizer'] = None
+        model_state['optimizer_config'] = None
         model_state['opt_state'] = None
         
         return jsonify({
@@ -2177,7 +3952,656 @@ def reset_optimizer():
             'error': f'Failed to reset optimizer: {str(e)}'
         }), 500
 
+@app.route('/training/scaling', methods=['POST'])
+def measure_training_scaling():
+    """Time the optax train step on 1..N local devices and report data-parallel speedup and efficiency"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        batch_size = int(data.get('batch_size', 1024))
+        steps = int(data.get('steps', 20))
+        similarity_metric = data.get('similarity_metric', 'dotProduct')
+        optimizer_type = data.get('optimizer_type', 'sgd')
+        available = jax.local_device_count()
+        device_counts = data.get('device_counts') or sorted({2 ** i for i in range(available.bit_length())} | {available})
+        device_counts = sorted({1} | {int(n) for n in device_counts})
+        if device_counts[-1] > available:
+            raise ValueError(f"{device_counts[-1]} devices requested but only {available} available")
+        
+        rng = np.random.default_rng(0)
+        weights = rng.normal(0.0, 0.1, (10, 784))
+        features = jnp.asarray(rng.random((batch_size, 784)))
+        labels = jnp.asarray(rng.integers(0, 10, batch_size))
+        
+        results = []
+        for num_devices in device_counts:
+            optimizer_config = {
+                'optimizer_type': optimizer_type, 'learning_rate': 0.01, 'momentum': 0.9,
+                'data_parallel': num_devices > 1, 'num_devices': num_devices
+            }
+            optimizer = build_optimizer(optimizer_config)
+            train_step = calculator.optax_train_step(optimizer, optimizer_structure_key(optimizer_config), num_devices)
+            params = (jnp.array(weights), jnp.zeros(10))
+            
+            # First call compiles; time the steps after it
+            result = jax.block_until_ready(train_step(params, optimizer.init(params), features, labels,
+                                                      similarity_metric=similarity_metric))
+            start = time.time()
+            for _ in range(steps):
+                result = train_step((result['shadow_weights'], result['biases']), result['opt_state'],
+                                    features, labels, similarity_metric=similarity_metric)
+            jax.block_until_ready(result)
+            step_seconds = (time.time() - start) / steps
+            results.append({
+                'num_devices': num_devices,
+                'step_seconds': step_seconds,
+                'samples_per_second': batch_size / step_seconds
+            })
+        
+        baseline = results[0]['step_seconds']
+        for entry in results:
+            entry['speedup'] = baseline / entry['step_seconds']
+            entry['efficiency'] = entry['speedup'] / entry['num_devices']
+        
+        return jsonify({
+            'success': True,
+            'available_devices': available,
+            'batch_size': batch_size,
+            'steps': steps,
+            'similarity_metric': similarity_metric,
+            'results': results
+        })
+        
+    except Exception as e:
+        logger.error(f"Error measuring training scaling: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/training/sweep', methods=['POST'])
+def hyperparameter_sweep():
+    """Train every combination of learning rate, weight decay and initial sparsity at once, per similarity metric.
+    
+    Variants are stacked along a leading axis and trained by one compiled,
+    vmapped program per metric on the same batches, so a sweep costs about one
+    (wider) training run rather than one run per variant.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        learning_rates = [float(value) for value in data.get('learning_rates', [0.01])]
+        weight_decays = [float(value) for value in data.get('weight_decays', [0.0])]
+        sparsity_ratios = [float(value) for value in data.get('sparsity_ratios', [0.3])]
+        similarity_metrics = data.get('similarity_metrics', ['dotProduct'])
+        optimizer_type = data.get('optimizer_type', 'adam')
+        steps = int(data.get('steps', 100))
+        batch_size = int(data.get('batch_size', 32))
+        eval_every = max(1, min(int(data.get('eval_every', 10)), steps))
+        eval_samples = int(data.get('eval_samples', 1000))
+        use_ternary = bool(data.get('use_ternary_weights', True))
+        
+        unknown = [metric for metric in similarity_metrics if metric not in calculator.similarity_functions]
+        if unknown:
+            raise ValueError(f"Unknown similarity metrics: {unknown}")
+        if steps < 1:
+            raise ValueError("steps must be at least 1")
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        num_variants = len(learning_rates) * len(weight_decays) * len(sparsity_ratios)
+        if num_variants < 1 or not similarity_metrics:
+            raise ValueError("A sweep needs at least one value of every hyperparameter and one similarity metric")
+        if num_variants > config.SWEEP_MAX_VARIANTS:
+            raise ValueError(f"{num_variants} variants requested; at most {config.SWEEP_MAX_VARIANTS} are allowed")
+        if num_variants * len(similarity_metrics) * steps > config.SWEEP_MAX_VARIANT_STEPS:
+            raise ValueError(f"{num_variants} variants x {len(similarity_metrics)} metrics x {steps} steps exceeds "
+                             f"the limit of {config.SWEEP_MAX_VARIANT_STEPS} variant steps")
+        if optimizer_type == 'sgd' and any(weight_decays):
+            raise ValueError("Weight decay needs optimizer_type 'adam' or 'adamw'")
+        steps -= steps % eval_every
+        
+        # One optimizer structure for every variant; per-variant values go into the injected hyperparameters
+        optimizer_config = {
+            'optimizer_type': optimizer_type,
+            'learning_rate': learning_rates[0],
+            'momentum': float(data.get('momentum', 0.0)),
+            'weight_decay': max(weight_decays)
+        }
+        optimizer = build_optimizer(optimizer_config)
+        variants = [
+            {'learning_rate': lr, 'weight_decay': wd, 'sparsity_ratio': sparsity}
+            for lr in learning_rates for wd in weight_decays for sparsity in sparsity_ratios
+        ]
+        
+        dataset_name, subset = data.get('dataset_name', 'mnist'), data.get('subset', 'train')
+        # Pinned so the split stays cached for the length of the sweep
+        with dataset_loader.pinned(dataset_name, subset):
+            # The same batches (and evaluation samples) for every variant, so the curves are comparable
+            dataset = dataset_loader.get_dataset(dataset_name, subset)
+            rng = np.random.default_rng(int(data.get('seed', 0)))
+            batch_indices = rng.integers(0, len(dataset['labels']), (steps // eval_every, eval_every, batch_size))
+            batch_features = to_device(np.asarray(dataset['features'][batch_indices], dtype=np.float64))
+            batch_labels = to_device(np.asarray(dataset['labels'][batch_indices]))
+            eval_indices = rng.choice(len(dataset['labels']), min(eval_samples, len(dataset['labels'])), replace=False)
+            eval_features = to_device(np.asarray(dataset['features'][eval_indices], dtype=np.float64))
+            eval_labels = to_device(np.asarray(dataset['labels'][eval_indices]))
+            
+            calc = calculators[use_ternary]
+            initial = {sparsity: calc.initialize_ternary_weights(10, batch_features.shape[-1], sparsity)
+                       for sparsity in sparsity_ratios}
+            stacked_weights = jnp.stack([initial[variant['sparsity_ratio']][0] for variant in variants])
+            stacked_biases = jnp.stack([initial[variant['sparsity_ratio']][1] for variant in variants])
+            sweep_run = calc.sweep_run(optimizer, optimizer_structure_key(optimizer_config))
+            
+            results = []
+            groups = []
+            start = time.time()
+            for similarity_metric in similarity_metrics:
+                group_start = time.time()
+                params = (jnp.array(stacked_weights, dtype=jnp.float64), jnp.array(stacked_biases, dtype=jnp.float64))
+                opt_state = jax.vmap(optimizer.init)(params)
+                hyperparams = dict(opt_state.hyperparams,
+                                   learning_rate=jnp.array([variant['learning_rate'] for variant in variants]))
+                if 'weight_decay' in hyperparams:
+                    hyperparams['weight_decay'] = jnp.array([variant['weight_decay'] for variant in variants])
+                opt_state = opt_state._replace(hyperparams=hyperparams)
+                
+                _, losses, accuracies = sweep_run(params, opt_state, batch_features, batch_labels,
+                                                  eval_features, eval_labels, similarity_metric=similarity_metric)
+                losses, accuracies = np.asarray(losses), np.asarray(accuracies)
+                count_training_steps('sweep', losses.size)
+                groups.append({'similarity_metric': similarity_metric, 'seconds': time.time() - group_start})
+                
+                for i, variant in enumerate(variants):
+                    results.append(dict(
+                        variant,
+                        variant_id=len(results),
+                        similarity_metric=similarity_metric,
+                        loss_curve=to_list(losses[i]),
+                        accuracy_curve=to_list(accuracies[i]),
+                        final_loss=float(losses[i, -1]),
+                        final_accuracy=float(accuracies[i, -1])
+                    ))
+        
+        logger.info(f"Sweep of {len(results)} variants x {steps} steps took {time.time() - start:.2f}s")
+        
+        return jsonify({
+            'success': True,
+            'sweep': {
+                'num_variants': len(results),
+                'steps': steps,
+                'batch_size': batch_size,
+                'optimizer_type': optimizer_type,
+                'use_ternary_weights': use_ternary,
+                'eval_steps': list(range(eval_every, steps + 1, eval_every)),
+                'eval_samples': len(eval_indices),
+                'seconds': time.time() - start,
+                'groups': groups
+            },
+            'variants': results,
+            'best': max(results, key=lambda result: result['final_accuracy'])
+        })
+        
+    except Exception as e:
+        logger.error(f"Error running hyperparameter sweep: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/checkpoints', methods=['GET'])
+@with_model
+def list_checkpoints(model_state):
+    """List a model's checkpoints, newest first"""
+    try:
+        return jsonify({
+            'success': True,
+            'model_id': model_state['model_id'],
+            'checkpoints': checkpoint_manager.list(model_state['model_id'])
+        })
+        
+    except Exception as e:
+        logger.error(f"Error listing checkpoints: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/checkpoints/save', methods=['POST'])
+@with_model
+def save_checkpoint(model_state):
+    """Checkpoint the full training state in the background (pass wait=true to block until written)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        if model_state['weights'] is None:
+            return jsonify({
+                'success': False,
+                'error': 'No model weights available. Initialize model first.'
+            }), 400
+        
+        job = checkpoint_manager.save(
+            model_state['model_id'], export_model_state(model_state), model_state['current_epoch'], tag=data.get('tag')
+        )
+        model_state['last_checkpoint_step'] = model_state['current_epoch']
+        
+        if data.get('wait', False):
+            job.wait()
+        
+        return jsonify({
+            'success': job.status != Job.FAILED,
+            'job': job.to_dict(),
+            'checkpoint': job.result
+        }), 202 if job.active else 200
+        
+    except Exception as e:
+        logger.error(f"Error saving checkpoint: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/checkpoints/jobs/<job_id>', methods=['GET'])
+def get_checkpoint_job(job_id):
+    """Status of a checkpoint save"""
+    job = checkpoint_manager.jobs.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': f'Unknown job: {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict(),
+        'checkpoint': job.result
+    })
+
+@app.route('/checkpoints/restore', methods=['POST'])
+@with_model(create=True)
+def restore_checkpoint(model_state):
+    """Restore a model from a checkpoint (the newest if no checkpoint_id is given)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        start = time.time()
+        snapshot = checkpoint_manager.load(model_state['model_id'], data.get('checkpoint_id'))
+        previous_version = model_state['model_version']
+        import_model_state(model_state, snapshot)
+        # Versions only move forward, so results cached for the replaced weights are never reused
+        model_state['model_version'] = max(previous_version, model_state['model_version']) + 1
+        model_state['last_checkpoint_step'] = model_state['current_epoch']
+        elapsed = time.time() - start
+        
+        logger.info(f"Restored {model_state['model_id']} from checkpoint {snapshot['meta']['checkpoint_id']} "
+                    f"in {elapsed:.3f}s")
+        
+        return jsonify({
+            'success': True,
+            'model_id': model_state['model_id'],
+            'checkpoint_id': snapshot['meta']['checkpoint_id'],
+            'current_epoch': model_state['current_epoch'],
+            'optimizer_restored': model_state['opt_state'] is not None,
+            'restore_seconds': round(elapsed, 4)
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except Exception as e:
+        logger.error(f"Error restoring checkpoint: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/checkpoints/<checkpoint_id>', methods=['DELETE'])
+@with_model
+def delete_checkpoint(checkpoint_id, model_state):
+    """Delete one of a model's checkpoints"""
+    try:
+        checkpoint_manager.delete(model_state['model_id'], checkpoint_id)
+        return jsonify({
+            'success': True,
+            'message': f'Deleted checkpoint {checkpoint_id}'
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/distributed/runs', methods=['POST'])
+@with_model
+def create_distributed_run(model_state):
+    """Train a copy of the model on a cached dataset with several worker processes, each on its own shard"""
+    try:
+        data = request.get_json(silent=True) or {}
+        
+        num_workers = int(data.get('num_workers', 2))
+        if num_workers > config.DISTRIBUTED_MAX_WORKERS:
+            raise ValueError(f"At most {config.DISTRIBUTED_MAX_WORKERS} workers are allowed")
+        if model_state['weights'] is None or model_state['opt_state'] is None:
+            return jsonify({
+                'success': False,
+                'error': 'Model and optimizer must be initialized first (see /optimizer/init)'
+            }), 400
+        
+        dataset_name, subset = data.get('dataset_name', 'mnist'), data.get('subset', 'train')
+        launch = bool(data.get('launch', True))
+        # Workers train on the run's own (memory-mapped) copy of the split, so it is pinned until that is written
+        with dataset_loader.pinned(dataset_name, subset):
+            dataset = dataset_loader.get_dataset(dataset_name, subset, data.get('max_samples'))
+            run = distributed_manager.create(
+                model_state['model_id'], export_model_state(model_state), dataset['features'], dataset['labels'],
+                num_workers, {
+                    'dataset_name': dataset_name,
+                    'subset': subset,
+                    'similarity_metric': data.get('similarity_metric', 'dotProduct'),
+                    'epochs': int(data.get('epochs', 1)),
+                    'batch_size': int(data.get('batch_size', 32)),  # Per worker
+                    'seed': int(data.get('seed', 0))
+                },
+                launch=launch
+            )
+        
+        return jsonify({
+            'success': True,
+            'run': run,
+            # With launch=false, start these on this host to attach the workers
+            'worker_commands': distributed_manager.worker_commands(run['run_id'])
+        }), 202
+        
+    except Exception as e:
+        logger.error(f"Error creating distributed run: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/distributed/runs', methods=['GET'])
+def list_distributed_runs():
+    """List distributed training runs, newest first"""
+    return jsonify({
+        'success': True,
+        'runs': distributed_manager.list()
+    })
+
+@app.route('/distributed/runs/<run_id>', methods=['GET'])
+def get_distributed_run(run_id):
+    """Progress of a distributed run and each of its workers"""
+    try:
+        return jsonify({
+            'success': True,
+            'run': distributed_manager.status(run_id)
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+
+@app.route('/distributed/runs/<run_id>/stop', methods=['POST'])
+def stop_distributed_run(run_id):
+    """Terminate the worker processes of a run launched by this app"""
+    try:
+        stopped = distributed_manager.stop(run_id)
+        return jsonify({
+            'success': True,
+            'stopped_workers': stopped,
+            'run': distributed_manager.status(run_id)
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+
+@app.route('/distributed/runs/<run_id>/apply', methods=['POST'])
+@with_model
+def apply_distributed_run(run_id, model_state):
+    """Load the trained parameters, optimizer state and history of a completed run into the model"""
+    try:
+        snapshot = distributed_manager.result(run_id)
+        previous_version = model_state['model_version']
+        import_model_state(model_state, snapshot)
+        # Versions only move forward, so results cached for the replaced weights are never reused
+        model_state['model_version'] = max(previous_version, model_state['model_version']) + 1
+        
+        return jsonify({
+            'success': True,
+            'model_id': model_state['model_id'],
+            'run_id': run_id,
+            'current_epoch': model_state['current_epoch'],
+            'last_loss': model_state['last_loss']
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except Exception as e:
+        logger.error(f"Error applying distributed run: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/distributed/runs/<run_id>', methods=['DELETE'])
+def delete_distributed_run(run_id):
+    """Stop a run's workers and delete its directory"""
+    try:
+        distributed_manager.delete(run_id)
+        return jsonify({
+            'success': True,
+            'message': f'Deleted distributed run {run_id}'
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+
+@app.route('/profiler/start', methods=['POST'])
+def start_profiler():
+    """Profile the next N requests and/or N seconds: a JAX profiler trace plus cProfile stats of the handlers"""
+    try:
+        data = request.get_json(silent=True) or {}
+        session = profiler.start(
+            requests=int(data['requests']) if data.get('requests') is not None else None,
+            seconds=float(data['seconds']) if data.get('seconds') is not None else None,
+            jax_trace=bool(data.get('jax_trace', True)),
+            python_profile=bool(data.get('python_profile', True)),
+            routes=data.get('routes')
+        )
+        return jsonify({
+            'success': True,
+            'session': session
+        })
+        
+    except Exception as e:
+        logger.error(f"Error starting profiler: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/profiler/stop', methods=['POST'])
+def stop_profiler():
+    """Stop the running profiling session and write its artifacts"""
+    session = profiler.stop()
+    if session is None:
+        return jsonify({
+            'success': False,
+            'error': 'No profiling session is running'
+        }), 400
+    return jsonify({
+        'success': True,
+        'session': session
+    })
+
+@app.route('/profiler/status', methods=['GET'])
+def get_profiler_status():
+    return jsonify({
+        'success': True,
+        'running': profiler.status()
+    })
+
+@app.route('/profiler/sessions', methods=['GET'])
+def list_profiler_sessions():
+    return jsonify({
+        'success': True,
+        'sessions': profiler.list()
+    })
+
+@app.route('/profiler/sessions/<session_id>', methods=['GET'])
+def get_profiler_session(session_id):
+    """A session's settings, artifacts and top Python functions by cumulative time"""
+    try:
+        return jsonify({
+            'success': True,
+            'session': profiler.get(session_id, top=int(request.args.get('top', 20)))
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+
+@app.route('/profiler/sessions/<session_id>/artifacts/<path:artifact>', methods=['GET'])
+def download_profiler_artifact(session_id, artifact):
+    try:
+        return send_file(profiler.artifact_path(session_id, artifact), as_attachment=True)
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+
+@app.route('/profiler/sessions/<session_id>', methods=['DELETE'])
+def delete_profiler_session(session_id):
+    try:
+        profiler.delete(session_id)
+        return jsonify({
+            'success': True,
+            'message': f'Deleted profiling session {session_id}'
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/traffic/recording/start', methods=['POST'])
+def start_traffic_recording():
+    """Record every following request (route, timing, payload shapes and optionally bodies) for replay.py.
+    
+    Starts a session shared by all the server's processes: each (gunicorn
+    worker) writes its own recording, starting within a second.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        recording = traffic_recorder.start(
+            bodies=bool(data.get('bodies', config.TRAFFIC_RECORD_BODIES)),
+            name=data.get('name')
+        )
+        return jsonify({
+            'success': True,
+            'recording': recording
+        })
+        
+    except Exception as e:
+        logger.error(f"Error starting traffic recording: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
+@app.route('/traffic/recording/stop', methods=['POST'])
+def stop_traffic_recording():
+    """End the recording session; the other server processes close their recordings within a second"""
+    recording = traffic_recorder.stop()
+    if recording is None:
+        return jsonify({
+            'success': False,
+            'error': 'No traffic recording is running'
+        }), 400
+    return jsonify({
+        'success': True,
+        'recording': recording
+    })
+
+@app.route('/traffic/recording/status', methods=['GET'])
+def get_traffic_recording_status():
+    return jsonify({
+        'success': True,
+        'running': traffic_recorder.status(),
+        'session': traffic_recorder.session()
+    })
+
+@app.route('/traffic/recordings', methods=['GET'])
+def list_traffic_recordings():
+    return jsonify({
+        'success': True,
+        'recordings': traffic_recorder.list()
+    })
+
+@app.route('/traffic/recordings/<recording_id>', methods=['GET'])
+def download_traffic_recording(recording_id):
+    try:
+        return send_file(traffic_recorder.path(recording_id), as_attachment=True)
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+
+@app.route('/traffic/recordings/<recording_id>', methods=['DELETE'])
+def delete_traffic_recording(recording_id):
+    try:
+        traffic_recorder.delete(recording_id)
+        return jsonify({
+            'success': True,
+            'message': f'Deleted traffic recording {recording_id}'
+        })
+        
+    except KeyError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e).strip("'")
+        }), 404
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+
 if __name__ == '__main__':
     logger.info("Starting JAX MNIST API server...")
     logger.info(f"JAX devices available: {jax.devices()}")
+    # The reloader's parent process only watches files; the child it starts serves (and warms up)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warmup()
+        traffic_recorder.follow_sessions()
     app.run(debug=True, host='0.0.0.0', port=5000) 
\ No newline at end of file
@@ -0,0 +1,352 @@
+"""Microbenchmarks for the calculator kernels and the API endpoints.
+
+Usage:
+    python benchmark.py run [--output results.json] [--baseline baseline.json] [options]
+    python benchmark.py compare baseline.json results.json [--threshold 0.1]
+
+``run`` times the JAXMNISTCalculator entry points across similarity metrics,
+batch sizes and dtypes, and the tensor endpoints end to end through the Flask
+test client (JSON encoding, request handling and JSON decoding timed
+separately). Results are written as JSON; with ``--baseline`` (or with the
+``compare`` command) every benchmark whose median got slower than the baseline
+by more than the threshold is flagged, and the exit status is 1.
+
+Each benchmark's first call, which includes compilation, is reported as
+``first_call_seconds`` and excluded from the timed repeats.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+METRICS = ['dotProduct', 'euclidean', 'cosine', 'manhattan', 'rbf', 'yatProduct']
+BATCH_SIZES = [1, 32, 128]
+DTYPES = ['float32', 'float64']
+NUM_CLASSES, NUM_FEATURES = 10, 784
+
+
+def _prepare_environment():
+    """Keep importing the API free of startup work and of files in the working directory"""
+    scratch = tempfile.mkdtemp(prefix='vortex-benchmark-')
+    for key, value in {
+        'JAX_WARMUP': '0',
+        'MODEL_STATE_BACKEND': 'memory',
+        'CHECKPOINT_EVERY_STEPS': '0',
+        'MNIST_PRELOAD_DATASETS': '',
+        # No persistent compilation cache, so first calls measure real compilations
+        'JAX_COMPILATION_CACHE_DIR': '',
+        'CHECKPOINT_DIR': os.path.join(scratch, 'checkpoints'),
+        'DISTRIBUTED_DIR': os.path.join(scratch, 'distributed_runs'),
+        'PROFILE_DIR': os.path.join(scratch, 'profiles')
+    }.items():
+        os.environ.setdefault(key, value)
+
+
+def _block(value: Any) -> Any:
+    import jax
+    return jax.block_until_ready(value)
+
+
+def measure(fn: Callable[[], Any], repeats: int, min_time: float) -> Dict[str, Any]:
+    """Time ``fn`` (which must wait for its own results): first call, then at least ``repeats`` calls and ``min_time``"""
+    start = time.perf_counter()
+    fn()
+    first_call = time.perf_counter() - start
+
+    times = []
+    deadline = time.perf_counter() + min_time
+    while len(times) < repeats or time.perf_counter() < deadline:
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    times = np.array(times)
+    return {
+        'first_call_seconds': first_call,
+        'repeats': len(times),
+        'median_seconds': float(np.median(times)),
+        'mean_seconds': float(times.mean()),
+        'min_seconds': float(times.min()),
+        'p90_seconds': float(np.percentile(times, 90)),
+        'stdev_seconds': float(times.std())
+    }
+
+
+def benchmark_key(result: Dict[str, Any]) -> str:
+    params = ','.join(f"{key}={value}" for key, value in sorted(result['params'].items()))
+    return f"{result['group']}/{result['name']}[{params}]"
+
+
+def kernel_benchmarks(metrics: List[str], batch_sizes: List[int], dtypes: List[str]):
+    """(name, params, fn) for every calculator kernel configuration"""
+    import jax
+    import jax.numpy as jnp
+    import app
+
+    calc = app.JAXMNISTCalculator(use_ternary_weights=True)
+    rng = np.random.default_rng(0)
+    # Pure (traceable) functions run under jit, as they do inside the app's compiled kernels
+    compute_loss = jax.jit(calc.compute_loss, static_argnames=('similarity_metric', 'activation_function'))
+    compute_accuracy = jax.jit(calc.compute_accuracy, static_argnames=('similarity_metric', 'activation_function'))
+    quantize = jax.jit(calc._quantize_to_ternary)
+
+    for dtype in dtypes:
+        weights = jnp.asarray(rng.normal(0.0, 0.1, (NUM_CLASSES, NUM_FEATURES)), dtype=dtype)
+        biases = jnp.zeros(NUM_CLASSES, dtype=dtype)
+        yield 'quantize_to_ternary', {'dtype': dtype}, lambda weights=weights: _block(quantize(weights))
+
+        for metric in metrics:
+            sample = jnp.asarray(rng.random(NUM_FEATURES), dtype=dtype)
+            # forward_pass takes a single sample and returns Python values (so it waits for itself)
+            yield ('forward_pass', {'dtype': dtype, 'metric': metric, 'batch_size': 1},
+                   lambda sample=sample, metric=metric: calc.forward_pass(weights, biases, sample, metric, 'softmax'))
+
+            for batch_size in batch_sizes:
+                features = jnp.asarray(rng.random((batch_size, NUM_FEATURES)), dtype=dtype)
+                labels = jnp.asarray(rng.integers(0, NUM_CLASSES, batch_size))
+                params = {'dtype': dtype, 'metric': metric, 'batch_size': batch_size}
+                yield ('compute_loss', params,
+                       lambda features=features, labels=labels, metric=metric: _block(
+                           compute_loss(weights, biases, features, labels, metric, 'softmax')))
+                yield ('compute_gradients', params,
+                       lambda features=features, labels=labels, metric=metric: _block(calc.compute_gradients(
+                           weights, biases, features, labels, metric, 'softmax')))
+                yield ('compute_optax_gradients', params,
+                       lambda features=features, labels=labels, metric=metric: _block(calc.compute_optax_gradients(
+                           (weights, biases), features, labels, metric)))
+                yield ('compute_accuracy', params,
+                       lambda features=features, labels=labels, metric=metric: _block(
+                           compute_accuracy(weights, biases, features, labels, metric, 'softmax')))
+
+
+def endpoint_benchmarks(metrics: List[str], batch_sizes: List[int]):
+    """(name, params, setup, payload) for the tensor endpoints; setup prepares the model state"""
+    rng = np.random.default_rng(0)
+    weights = rng.normal(0.0, 0.1, (NUM_CLASSES, NUM_FEATURES)).tolist()
+    biases = [0.0] * NUM_CLASSES
+
+    def reset_model(client):
+        client.post('/model/weights', json={'weights': weights, 'biases': biases})
+        client.post('/optimizer/init', json={'optimizer_type': 'adam', 'learning_rate': 0.001})
+
+    for metric in metrics:
+        yield ('POST /forward', {'metric': metric, 'batch_size': 1}, None, {
+            'weights': weights, 'biases': biases, 'features': rng.random(NUM_FEATURES).tolist(),
+            'similarity_metric': metric, 'activation_function': 'softmax'
+        })
+        for batch_size in batch_sizes:
+            features = rng.random((batch_size, NUM_FEATURES)).tolist()
+            labels = rng.integers(0, NUM_CLASSES, batch_size).tolist()
+            params = {'metric': metric, 'batch_size': batch_size}
+            yield ('POST /batch_forward', params, None, {
+                'weights': weights, 'biases': biases, 'batch_features': features,
+                'similarity_metric': metric, 'activation_function': 'softmax'
+            })
+            yield ('POST /gradients', params, None, {
+                'weights': weights, 'biases': biases, 'batch_features': features, 'batch_labels': labels,
+                'similarity_metric': metric, 'activation_function': 'softmax'
+            })
+            yield ('POST /train_step', params, reset_model, {
+                'weights': weights, 'biases': biases, 'batch_features': features, 'batch_labels': labels,
+                'similarity_metric': metric, 'activation_function': 'softmax', 'learning_rate': 0.01
+            })
+            yield ('POST /train_step_optax', params, reset_model, {
+                'batch_features': features, 'batch_labels': labels, 'similarity_metric': metric
+            })
+            yield ('POST /accuracy', params, None, {
+                'weights': weights, 'biases': biases, 'test_features': features, 'test_labels': labels,
+                'similarity_metric': metric, 'activation_function': 'softmax'
+            })
+    yield 'GET /model/weights', {}, reset_model, None
+
+
+def measure_endpoint(client, name: str, payload: Optional[Dict[str, Any]], repeats: int,
+                     min_time: float) -> Dict[str, Any]:
+    """Time JSON encoding, the request itself and JSON decoding of the response separately"""
+    method, path = name.split(' ', 1)
+    encode, request, decode = [], [], []
+
+    def call():
+        start = time.perf_counter()
+        body = json.dumps(payload) if payload is not None else None
+        encoded = time.perf_counter()
+        response = client.open(path, method=method, data=body, content_type='application/json')
+        responded = time.perf_counter()
+        result = json.loads(response.get_data())
+        decoded = time.perf_counter()
+        if response.status_code != 200 or not result.get('success'):
+            raise RuntimeError(f"{name} failed ({response.status_code}): {result.get('error')}")
+        encode.append(encoded - start)
+        request.append(responded - encoded)
+        decode.append(decoded - responded)
+
+    result = measure(call, repeats, min_time)
+    # Drop the first (compiling) call from the phase breakdown
+    result.update(
+        encode_median_seconds=statistics.median(encode[1:]),
+        request_median_seconds=statistics.median(request[1:]),
+        decode_median_seconds=statistics.median(decode[1:]),
+        request_bytes=len(json.dumps(payload)) if payload is not None else 0
+    )
+    return result
+
+
+def environment_info() -> Dict[str, Any]:
+    import jax
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'timestamp': time.time(),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'jax': jax.__version__,
+        'devices': [str(device) for device in jax.devices()],
+        'cpu_count': os.cpu_count()
+    }
+
+
+def run(args) -> Dict[str, Any]:
+    _prepare_environment()
+    import app
+
+    results = []
+
+    def record(group: str, name: str, params: Dict[str, Any], timings: Dict[str, Any]):
+        result = dict(group=group, name=name, params=params, **timings)
+        results.append(result)
+        print(f"{benchmark_key(result):<80} {result['median_seconds'] * 1000:10.3f} ms "
+              f"(first call {result['first_call_seconds'] * 1000:.1f} ms)", file=sys.stderr)
+
+    def selected(group: str, name: str, params: Dict[str, Any]) -> bool:
+        return not args.filter or args.filter in benchmark_key({'group': group, 'name': name, 'params': params})
+
+    if not args.skip_kernels:
+        for name, params, fn in kernel_benchmarks(args.metrics, args.batch_sizes, args.dtypes):
+            if selected('kernel', name, params):
+                record('kernel', name, params, measure(fn, args.repeats, args.min_time))
+
+    if not args.skip_endpoints:
+        client = app.app.test_client()
+        for name, params, setup, payload in endpoint_benchmarks(args.metrics, args.batch_sizes):
+            if selected('endpoint', name, params):
+                if setup is not None:
+                    setup(client)
+                record('endpoint', name, params, measure_endpoint(client, name, payload, args.repeats, args.min_time))
+
+    return {
+        'environment': environment_info(),
+        'settings': {
+            'metrics': args.metrics, 'batch_sizes': args.batch_sizes, 'dtypes': args.dtypes,
+            'repeats': args.repeats, 'min_time': args.min_time, 'filter': args.filter
+        },
+        'results': results
+    }
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float,
+            min_delta: float) -> Dict[str, Any]:
+    """Median ratios of the benchmarks in both runs; slower by more than threshold (and min_delta seconds) regresses"""
+    baseline_results = {benchmark_key(result): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        key = benchmark_key(result)
+        previous = baseline_results.get(key)
+        if previous is None:
+            continue
+        ratio = result['median_seconds'] / previous['median_seconds'] if previous['median_seconds'] else float('inf')
+        delta = result['median_seconds'] - previous['median_seconds']
+        rows.append({
+            'benchmark': key,
+            'baseline_median_seconds': previous['median_seconds'],
+            'median_seconds': result['median_seconds'],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold and delta > min_delta,
+            'improvement': ratio < 1 / (1 + threshold) and -delta > min_delta
+        })
+    current_keys = {benchmark_key(result) for result in current['results']}
+    return {
+        'threshold': threshold,
+        'min_delta_seconds': min_delta,
+        'compared': len(rows),
+        'regressions': [row for row in rows if row['regression']],
+        'improvements': [row for row in rows if row['improvement']],
+        'missing_from_current': sorted(set(baseline_results) - current_keys),
+        'new_in_current': sorted(current_keys - set(baseline_results)),
+        'rows': rows
+    }
+
+
+def print_comparison(comparison: Dict[str, Any]):
+    for row in comparison['rows']:
+        flag = 'REGRESSION' if row['regression'] else ('improved' if row['improvement'] else '')
+        print(f"{row['benchmark']:<80} {row['baseline_median_seconds'] * 1000:10.3f} -> "
+              f"{row['median_seconds'] * 1000:10.3f} ms  x{row['ratio']:.2f}  {flag}", file=sys.stderr)
+    print(f"{comparison['compared']} compared, {len(comparison['regressions'])} regressions, "
+          f"{len(comparison['improvements'])} improvements (threshold {comparison['threshold']:.0%})", file=sys.stderr)
+
+
+def _read(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--output', help='Write results as JSON to this file (default: stdout)')
+    run_parser.add_argument('--baseline', help='Compare against these stored results and flag regressions')
+    run_parser.add_argument('--metrics', nargs='+', default=METRICS, choices=METRICS)
+    run_parser.add_argument('--batch-sizes', nargs='+', type=int, default=BATCH_SIZES)
+    run_parser.add_argument('--dtypes', nargs='+', default=DTYPES, choices=DTYPES)
+    run_parser.add_argument('--repeats', type=int, default=20, help='Minimum timed calls per benchmark')
+    run_parser.add_argument('--min-time', type=float, default=0.2, help='Minimum timed seconds per benchmark')
+    run_parser.add_argument('--filter', help='Only run benchmarks whose key contains this text')
+    run_parser.add_argument('--skip-kernels', action='store_true')
+    run_parser.add_argument('--skip-endpoints', action='store_true')
+
+    compare_parser = commands.add_parser('compare', help='Compare two stored results')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    for command_parser in (run_parser, compare_parser):
+        command_parser.add_argument('--threshold', type=float, default=0.10,
+                                    help='Relative slowdown of the median that counts as a regression')
+        command_parser.add_argument('--min-delta', type=float, default=0.00005,
+                                    help='Absolute slowdown (seconds) below which nothing is flagged')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        current = run(args)
+        baseline = _read(args.baseline) if args.baseline else None
+    else:
+        current, baseline = _read(args.current), _read(args.baseline)
+
+    if baseline is not None:
+        current['comparison'] = compare(baseline, current, args.threshold, args.min_delta)
+        print_comparison(current['comparison'])
+
+    if args.command == 'compare':
+        json.dump(current['comparison'], sys.stdout, indent=2)
+    elif args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+    else:
+        json.dump(current, sys.stdout, indent=2)
+
+    return 1 if baseline is not None and current['comparison']['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Asynchronous checkpoints of full model training state"""
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from jobs import Job, JobManager
+from state_backend import read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Tag of the checkpoints the app writes every CHECKPOINT_EVERY_STEPS training steps
+AUTO_TAG = 'auto'
+
+
+def _is_ternary(array: np.ndarray) -> bool:
+    return (np.issubdtype(array.dtype, np.floating) and array.size > 0
+            and bool(np.all((array == -1) | (array == 0) | (array == 1))))
+
+
+def _kind(tag: Optional[str]) -> str:
+    return 'auto' if tag == AUTO_TAG else 'manual'
+
+
+class CheckpointManager:
+    """Saves model snapshots (see state_backend) under ``directory/<model_id>/<checkpoint_id>/``.
+
+    Saves run on a background worker: the caller hands over a snapshot that is
+    copied on the request thread, so the model can keep training while it is
+    written. Arrays holding only -1/0/1 (quantized ternary weights) are stored
+    as int8, everything else at full precision. Restores memory-map the files;
+    packed arrays stay int8 until they are on the device (see load).
+    Per model, only the newest ``max_to_keep`` manual checkpoints and the newest
+    ``max_auto_to_keep`` automatic ones (tagged AUTO_TAG) are retained, so
+    frequent automatic checkpoints never push out manual ones.
+    """
+
+    def __init__(self, directory: str, max_to_keep: int = 5, max_auto_to_keep: Optional[int] = None,
+                 max_workers: int = 1):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_to_keep = max_to_keep
+        self.max_auto_to_keep = max_to_keep if max_auto_to_keep is None else max_auto_to_keep
+        self.jobs = JobManager(max_workers=max_workers, name='checkpoints')
+
+    def _model_dir(self, model_id: str) -> Path:
+        if not model_id or '/' in model_id or model_id.startswith('.'):
+            raise ValueError(f"Invalid model id: {model_id}")
+        return self.directory / model_id
+
+    def save(self, model_id: str, snapshot: Dict[str, Any], step: int, tag: Optional[str] = None) -> Job:
+        """Queue a checkpoint write and return its job"""
+        # Copy now: arrays may be donated/replaced and the history appended to while the write is queued
+        arrays = {name: np.array(array) for name, array in snapshot['arrays'].items()}
+        meta = json.loads(json.dumps(snapshot['meta'], default=lambda value: np.asarray(value).tolist()))
+        checkpoint_id = f"{step:08d}-{uuid.uuid4().hex[:6]}"
+        return self.jobs.submit('checkpoint', f"{model_id}/{checkpoint_id}", self._write,
+                                model_id, checkpoint_id, arrays, meta, step, tag)
+
+    def _write(self, job: Job, model_id: str, checkpoint_id: str, arrays: Dict[str, np.ndarray],
+               meta: Dict[str, Any], step: int, tag: Optional[str]) -> Dict[str, Any]:
+        start = time.time()
+        packed = {}
+        for name, array in arrays.items():
+            if _is_ternary(array):
+                packed[name] = array.dtype.str
+                arrays[name] = array.astype(np.int8)
+
+        model_dir = self._model_dir(model_id)
+        tmp_dir = model_dir / f".tmp-{checkpoint_id}"
+        meta.update({
+            'checkpoint_id': checkpoint_id,
+            'model_id': model_id,
+            'step': step,
+            'tag': tag,
+            'created_at': time.time(),
+            'packed_arrays': packed
+        })
+        write_snapshot(tmp_dir, {'arrays': arrays, 'meta': meta})
+        # Renaming the finished directory makes the checkpoint appear atomically
+        os.rename(tmp_dir, model_dir / checkpoint_id)
+
+        removed = self._apply_retention(model_id, _kind(tag))
+        info = self._info(model_dir / checkpoint_id)
+        logger.info(f"Saved checkpoint {model_id}/{checkpoint_id} ({info['bytes'] / 1e3:.1f} KB) "
+                    f"in {time.time() - start:.3f}s")
+        return dict(info, removed=removed)
+
+    def _apply_retention(self, model_id: str, kind: str) -> List[str]:
+        """Delete the oldest checkpoints of one kind beyond its limit"""
+        max_to_keep = self.max_auto_to_keep if kind == 'auto' else self.max_to_keep
+        if max_to_keep <= 0:
+            return []
+        checkpoints = [info for info in self.list(model_id) if info['kind'] == kind]
+        removed = [info['checkpoint_id'] for info in checkpoints[max_to_keep:]]
+        for checkpoint_id in removed:
+            self.delete(model_id, checkpoint_id)
+        return removed
+
+    def _info(self, checkpoint_dir: Path) -> Dict[str, Any]:
+        with open(checkpoint_dir / 'meta.json', 'r') as f:
+            meta = json.load(f)
+        return {
+            'checkpoint_id': meta['checkpoint_id'],
+            'model_id': meta['model_id'],
+            'step': meta['step'],
+            'tag': meta.get('tag'),
+            'kind': _kind(meta.get('tag')),
+            'created_at': meta['created_at'],
+            'model_version': meta.get('model_version'),
+            'bytes': sum(path.stat().st_size for path in checkpoint_dir.iterdir())
+        }
+
+    def list(self, model_id: str) -> List[Dict[str, Any]]:
+        """Checkpoints of a model, newest first"""
+        model_dir = self._model_dir(model_id)
+        if not model_dir.exists():
+            return []
+        checkpoints = [self._info(path) for path in model_dir.iterdir()
+                       if path.is_dir() and not path.name.startswith('.') and (path / 'meta.json').exists()]
+        return sorted(checkpoints, key=lambda info: info['created_at'], reverse=True)
+
+    def load(self, model_id: str, checkpoint_id: Optional[str] = None) -> Dict[str, Any]:
+        """Snapshot of a checkpoint (the newest if no ID is given).
+        
+        Arrays are memory-mapped; those named in meta['packed_arrays'] stay
+        int8, to be widened to the recorded dtype after the transfer to the device.
+        """
+        if checkpoint_id is None:
+            checkpoints = self.list(model_id)
+            if not checkpoints:
+                raise KeyError(f"No checkpoints for model {model_id}")
+            checkpoint_id = checkpoints[0]['checkpoint_id']
+        checkpoint_dir = self._model_dir(model_id) / checkpoint_id
+        if '/' in checkpoint_id or not (checkpoint_dir / 'meta.json').exists():
+            raise KeyError(f"Unknown checkpoint: {model_id}/{checkpoint_id}")
+
+        return read_snapshot(checkpoint_dir)
+
+    def delete(self, model_id: str, checkpoint_id: str):
+        checkpoint_dir = self._model_dir(model_id) / checkpoint_id
+        if '/' in checkpoint_id or not checkpoint_dir.exists():
+            raise KeyError(f"Unknown checkpoint: {model_id}/{checkpoint_id}")
+        shutil.rmtree(checkpoint_dir)
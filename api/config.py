@@ -0,0 +1,110 @@
+"""Runtime configuration for the JAX MNIST API, read from environment variables"""
+import os
+from typing import List
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.environ.get(name)
+    return float(value) if value not in (None, '') else default
+
+
+def _env_list(name: str, default: List[str] = None) -> List[str]:
+    value = os.environ.get(name)
+    if value is None:
+        return list(default or [])
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+# Dataset storage
+DATA_DIR = os.environ.get('MNIST_DATA_DIR', './mnist_data')
+
+# Dataset downloads
+DOWNLOAD_MAX_WORKERS = _env_int('MNIST_DOWNLOAD_WORKERS', 4)
+DOWNLOAD_RETRIES = _env_int('MNIST_DOWNLOAD_RETRIES', 3)
+DOWNLOAD_TIMEOUT = _env_float('MNIST_DOWNLOAD_TIMEOUT', 30.0)
+DOWNLOAD_MIRRORS = _env_list('MNIST_DOWNLOAD_MIRRORS')  # Extra base URLs tried before the built-in ones
+DOWNLOAD_MANIFEST = os.environ.get(
+    'MNIST_DOWNLOAD_MANIFEST',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset_manifest.json')
+)
+
+# Kaggle
+KAGGLE_PROBE_TTL = _env_float('KAGGLE_PROBE_TTL', 300.0)  # Seconds to cache the `kaggle --version` probe
+KAGGLE_DOWNLOAD_WORKERS = _env_int('KAGGLE_DOWNLOAD_WORKERS', 2)
+
+# Dataset loading
+DATASET_LOAD_WORKERS = _env_int('MNIST_LOAD_WORKERS', 2)
+# Datasets to load in the background at startup, as "name" (train and test) or "name:subset"
+DATASET_PRELOAD = _env_list('MNIST_PRELOAD_DATASETS')
+
+# Dataset cache
+DATASET_CACHE_MAX_BYTES = _env_int('MNIST_CACHE_MAX_BYTES', 2 * 1024 ** 3)
+DATASET_CACHE_POLICY = os.environ.get('MNIST_CACHE_POLICY', 'lru')  # 'lru' or 'lfu'
+
+# Model registry
+MODEL_IDLE_TTL = _env_float('MODEL_IDLE_TTL', 3600.0)  # Seconds before an unused, persisted or empty model is evicted
+MAX_MODELS = _env_int('MAX_MODELS', 32)
+
+# Model state: 'memory' (per-process) or, for multi-worker deployments, 'local' (shared through files in
+# STATE_DIR, written after every state-changing request and restored on restart)
+STATE_BACKEND = os.environ.get('MODEL_STATE_BACKEND', 'memory')
+STATE_DIR = os.environ.get('MODEL_STATE_DIR', './model_state')
+
+# JAX compilation: persistent cache of compiled executables (GPU/TPU only; jax does not cache CPU executables)
+JAX_CACHE_DIR = os.environ.get('JAX_COMPILATION_CACHE_DIR', '')  # A directory enables it; empty (the default) disables it
+# Batch sizes that gradient and training requests are padded up to (padding is masked out of the loss), so
+# each kernel compiles once per bucket. Larger batches are padded to a multiple of the largest bucket.
+BATCH_BUCKETS = sorted(int(size) for size in _env_list('BATCH_BUCKETS', ['32', '128']))
+
+# Server warm-up (started by the server entry point, not on import): kernels compiled for every batch bucket
+# before /health reports ready
+WARMUP_ENABLED = bool(_env_int('JAX_WARMUP', 1))
+WARMUP_METRICS = _env_list('WARMUP_METRICS', ['dotProduct', 'euclidean', 'cosine', 'manhattan', 'rbf', 'yatProduct'])
+WARMUP_ACTIVATIONS = _env_list('WARMUP_ACTIVATIONS', ['softmax'])
+WARMUP_OPTIMIZERS = _env_list('WARMUP_OPTIMIZERS', ['sgd', 'adam'])
+
+# Checkpoints
+CHECKPOINT_DIR = os.environ.get('CHECKPOINT_DIR', './checkpoints')
+CHECKPOINT_MAX_TO_KEEP = _env_int('CHECKPOINT_MAX_TO_KEEP', 5)  # Manual checkpoints per model; 0 keeps everything
+CHECKPOINT_MAX_AUTO_TO_KEEP = _env_int('CHECKPOINT_MAX_AUTO_TO_KEEP', 5)  # Automatic checkpoints per model, kept apart
+CHECKPOINT_EVERY_STEPS = _env_int('CHECKPOINT_EVERY_STEPS', 100)  # Auto-checkpoint interval in training steps; 0 disables
+
+# Data-parallel training (opt-in): number of XLA devices the host CPU is split into. 1 (the default) leaves the
+# CPU as one device; set e.g. to the core count to train with optimizers initialised with data_parallel
+HOST_DEVICE_COUNT = _env_int('JAX_HOST_DEVICE_COUNT', 1)
+
+# Multi-process distributed training: worker processes on this host coordinated through jax.distributed
+DISTRIBUTED_DIR = os.environ.get('DISTRIBUTED_DIR', './distributed_runs')
+DISTRIBUTED_MAX_WORKERS = _env_int('DISTRIBUTED_MAX_WORKERS', 8)
+DISTRIBUTED_TIMEOUT = _env_float('DISTRIBUTED_TIMEOUT', 300.0)  # Seconds a worker waits for its peers
+
+# Hyperparameter sweeps (see /training/sweep): limits on the work one request may ask for
+SWEEP_MAX_VARIANTS = _env_int('SWEEP_MAX_VARIANTS', 64)  # Per similarity metric
+SWEEP_MAX_VARIANT_STEPS = _env_int('SWEEP_MAX_VARIANT_STEPS', 200000)  # Variants x metrics x steps
+
+# Sampled per-step diagnostics (see /diagnostics); off by default so the training hot path does no extra work
+DIAGNOSTICS_ENABLED = bool(_env_int('DIAGNOSTICS_ENABLED', 0))
+DIAGNOSTICS_SAMPLE_EVERY = _env_int('DIAGNOSTICS_SAMPLE_EVERY', 100)  # Record every Nth event of each kind
+DIAGNOSTICS_BUFFER_SIZE = _env_int('DIAGNOSTICS_BUFFER_SIZE', 1000)
+
+# Metrics (see /metrics): window in seconds of the training steps-per-second gauge
+METRICS_RATE_WINDOW = _env_float('METRICS_RATE_WINDOW', 60.0)
+
+# Per-request phase timing in Server-Timing headers (see /timing); when off, only requests sending
+# `X-Server-Timing: 1` are timed
+SERVER_TIMING_ENABLED = bool(_env_int('SERVER_TIMING_ENABLED', 0))
+SERVER_TIMING_HISTORY = _env_int('SERVER_TIMING_HISTORY', 200)  # Timed requests kept per route for the breakdown
+
+# On-demand profiling sessions (see /profiler/start)
+PROFILE_DIR = os.environ.get('PROFILE_DIR', './profiles')
+PROFILE_MAX_SECONDS = _env_float('PROFILE_MAX_SECONDS', 600.0)  # Longest session a request may ask for
+
+# Request recording for replay.py (see /traffic/recording/start); when enabled, each process records from startup
+TRAFFIC_RECORDING_DIR = os.environ.get('TRAFFIC_RECORDING_DIR', './traffic')
+TRAFFIC_RECORDING_ENABLED = bool(_env_int('TRAFFIC_RECORDING_ENABLED', 0))
+TRAFFIC_RECORD_BODIES = bool(_env_int('TRAFFIC_RECORD_BODIES', 0))  # Whole JSON bodies, not just their shapes
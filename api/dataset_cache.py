@@ -0,0 +1,169 @@
+"""Memory-budgeted cache for loaded datasets"""
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def dataset_nbytes(dataset: Dict[str, Any]) -> int:
+    """Bytes held by the numpy arrays of a dataset entry"""
+    return int(sum(value.nbytes for value in dataset.values() if isinstance(value, np.ndarray)))
+
+
+class DatasetCache:
+    """Dict-like dataset store with a byte budget, LRU/LFU eviction and pinning.
+
+    Pinned entries (e.g. datasets feeding an active training run) are never
+    evicted. An entry larger than the whole budget is still kept, after
+    everything evictable has been dropped, so a single oversized dataset
+    does not thrash. ``on_remove(key, value)`` is called (under the cache
+    lock) whenever an entry is evicted, popped or cleared, e.g. to release
+    resources held alongside its arrays.
+    """
+
+    def __init__(self, max_bytes: int, policy: str = 'lru',
+                 on_remove: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        if policy not in ('lru', 'lfu'):
+            raise ValueError(f"Unknown eviction policy: {policy}. Use 'lru' or 'lfu'")
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.on_remove = on_remove
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._frequency: Dict[str, int] = {}
+        self._pins: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    @property
+    def current_bytes(self) -> int:
+        return sum(self._sizes.values())
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __getitem__(self, key: str) -> Dict[str, Any]:
+        value = self.get(key)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: Dict[str, Any]):
+        self.put(key, value)
+
+    def keys(self) -> List[str]:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up an entry without touching its recency or the hit/miss counters"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._entries.move_to_end(key)
+            self._frequency[key] = self._frequency.get(key, 0) + 1
+            return self._entries[key]
+
+    def put(self, key: str, value: Dict[str, Any]):
+        with self._lock:
+            if key in self._entries:
+                self._entries.pop(key)
+            self._entries[key] = value
+            self._sizes[key] = dataset_nbytes(value)
+            self._frequency.setdefault(key, 0)
+            self._evict(protect=key)
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            self._sizes.pop(key, None)
+            self._frequency.pop(key, None)
+            if key not in self._entries:
+                return default
+            value = self._entries.pop(key)
+            if self.on_remove is not None:
+                self.on_remove(key, value)
+            return value
+
+    def _evict(self, protect: Optional[str] = None):
+        """Drop unpinned entries until the cache fits its budget"""
+        while self.current_bytes > self.max_bytes:
+            candidates = [k for k in self._entries if k != protect and not self._pins.get(k)]
+            if not candidates:
+                logger.warning(f"Dataset cache over budget ({self.current_bytes} > {self.max_bytes} bytes) "
+                               f"with nothing evictable")
+                return
+            if self.policy == 'lfu':
+                # Least frequently used; candidates are in LRU order so ties go to the oldest
+                victim = min(candidates, key=lambda k: self._frequency.get(k, 0))
+            else:
+                victim = candidates[0]
+            size = self._sizes.get(victim, 0)
+            self.pop(victim)
+            self.evictions += 1
+            self.evicted_bytes += size
+            logger.info(f"Evicted {victim} from dataset cache ({size / 1e6:.1f} MB)")
+
+    def pin(self, key: str):
+        """Protect an entry (loaded or not yet loaded) from eviction; pins are reference counted"""
+        with self._lock:
+            self._pins[key] = self._pins.get(key, 0) + 1
+
+    def unpin(self, key: str):
+        with self._lock:
+            if self._pins.get(key, 0) <= 1:
+                self._pins.pop(key, None)
+            else:
+                self._pins[key] -= 1
+            self._evict()
+
+    def is_pinned(self, key: str) -> bool:
+        return bool(self._pins.get(key))
+
+    def clear(self, include_pinned: bool = False) -> int:
+        """Drop cached entries, returning how many were removed"""
+        with self._lock:
+            keys = [k for k in self._entries if include_pinned or not self._pins.get(k)]
+            for key in keys:
+                self.pop(key)
+            return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'policy': self.policy,
+                'max_bytes': self.max_bytes,
+                'current_bytes': self.current_bytes,
+                'num_entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'evicted_bytes': self.evicted_bytes,
+                'entries': [
+                    {
+                        'key': key,
+                        'bytes': self._sizes.get(key, 0),
+                        'accesses': self._frequency.get(key, 0),
+                        'pinned': self.is_pinned(key)
+                    }
+                    for key in self._entries
+                ],
+                'pinned_keys': [key for key, count in self._pins.items() if count]
+            }
@@ -0,0 +1,102 @@
+"""Sampled training diagnostics, collected off the request thread into a ring buffer"""
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def _to_python(value: Any) -> Any:
+    if isinstance(value, (str, bool, int, float)) or value is None:
+        return value
+    if isinstance(value, dict):
+        return {key: _to_python(item) for key, item in value.items()}
+    # Device arrays (and numpy values): this waits for the computation and copies to the host
+    return np.asarray(value).tolist()
+
+
+class DiagnosticsCollector:
+    """Keeps the newest ``capacity`` diagnostic records, sampling every ``sample_every``-th event per kind.
+
+    Call sites ask ``sample(kind)`` before computing anything; while diagnostics
+    are disabled that is a single attribute check, so the hot path pays nothing.
+    Values handed to ``record`` may be device arrays: JAX computes them
+    asynchronously and the worker thread waits for and converts them, so the
+    request thread never blocks on a host transfer or formats a string.
+    """
+
+    def __init__(self, enabled: bool = False, sample_every: int = 100, capacity: int = 1000):
+        self.enabled = enabled
+        self.sample_every = max(1, sample_every)
+        self._records = deque(maxlen=capacity)
+        self._counters: Dict[str, int] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='diagnostics')
+
+    def sample(self, kind: str) -> bool:
+        """Whether this event of ``kind`` should be recorded"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            count = self._counters.get(kind, 0)
+            self._counters[kind] = count + 1
+        return count % self.sample_every == 0
+
+    def record(self, kind: str, values: Dict[str, Any], **context):
+        """Queue a record; ``values`` are converted to JSON-compatible Python values on the worker thread"""
+        self._executor.submit(self._store, kind, time.time(), values, context)
+
+    def _store(self, kind: str, timestamp: float, values: Dict[str, Any], context: Dict[str, Any]):
+        try:
+            values = _to_python(values)
+        except Exception as e:
+            logger.warning(f"Dropped {kind} diagnostics: {e}")
+            return
+        with self._lock:
+            self._records.append(dict(context, id=self._next_id, kind=kind, timestamp=timestamp, values=values))
+            self._next_id += 1
+
+    def flush(self, timeout: float = 5.0):
+        """Wait until every record queued so far is stored"""
+        self._executor.submit(lambda: None).result(timeout=timeout)
+
+    def query(self, kind: Optional[str] = None, since_id: int = 0, limit: int = 100) -> List[Dict[str, Any]]:
+        """Newest records (oldest first), optionally of one kind and after a record ID"""
+        with self._lock:
+            records = [record for record in self._records
+                       if record['id'] > since_id and (kind is None or record['kind'] == kind)]
+        return records[-limit:] if limit > 0 else records
+
+    def configure(self, enabled: Optional[bool] = None, sample_every: Optional[int] = None,
+                  capacity: Optional[int] = None):
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if sample_every is not None:
+                self.sample_every = max(1, sample_every)
+                self._counters.clear()
+            if capacity is not None and capacity != self._records.maxlen:
+                self._records = deque(self._records, maxlen=max(1, capacity))
+
+    def clear(self) -> int:
+        with self._lock:
+            cleared = len(self._records)
+            self._records.clear()
+            self._counters.clear()
+        return cleared
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'sample_every': self.sample_every,
+                'capacity': self._records.maxlen,
+                'records': len(self._records),
+                'events_seen': dict(self._counters)
+            }
@@ -0,0 +1,218 @@
+"""Multi-process data-parallel training runs on this host, coordinated through jax.distributed.
+
+A run lives in ``directory/<run_id>/``:
+
+- ``spec.json``: coordinator address, worker count and training settings
+- ``initial/``: snapshot of the model to train (see state_backend)
+- ``dataset/``: features and labels, written once and memory-mapped by every worker
+- ``worker-<i>.json`` / ``worker-<i>.log``: progress and output of each worker
+- ``result/``: the trained model snapshot, written by process 0 when training finishes
+
+Workers are ``distributed_worker.py`` processes. The API launches them, or with
+launch=False only prepares the run and returns the commands so the workers can
+be started (attached) by hand on this host.
+"""
+import json
+import logging
+import os
+import shutil
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from state_backend import read_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+WORKER_SCRIPT = str(Path(__file__).resolve().parent / 'distributed_worker.py')
+
+# Worker processes import the API module for its calculator; keep that import free of startup work
+WORKER_ENV = {
+    'JAX_WARMUP': '0',
+    'MODEL_STATE_BACKEND': 'memory',
+    'CHECKPOINT_EVERY_STEPS': '0',
+    'MNIST_PRELOAD_DATASETS': '',
+    'JAX_HOST_DEVICE_COUNT': '1'
+}
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def read_json(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_json(path: Path, value: Dict[str, Any]):
+    """Write a JSON file atomically (readers never see a partial file)"""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f)
+    os.replace(tmp_path, path)
+
+
+class DistributedTrainingManager:
+    """Prepares run directories, launches worker processes and reports on their progress"""
+
+    def __init__(self, directory: str, timeout: float = 300.0, python: str = sys.executable):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.python = python
+        self._processes: Dict[str, List[subprocess.Popen]] = {}
+        self._lock = threading.Lock()
+
+    def _run_dir(self, run_id: str) -> Path:
+        run_dir = self.directory / run_id
+        if '/' in run_id or run_id.startswith('.') or not (run_dir / 'spec.json').exists():
+            raise KeyError(f"Unknown distributed run: {run_id}")
+        return run_dir
+
+    def worker_commands(self, run_id: str) -> List[str]:
+        spec = read_json(self._run_dir(run_id) / 'spec.json')
+        return [f"{self.python} {WORKER_SCRIPT} {self.directory.resolve() / run_id} {i}"
+                for i in range(spec['num_workers'])]
+
+    def create(self, model_id: str, snapshot: Dict[str, Any], features: np.ndarray, labels: np.ndarray,
+               num_workers: int, training: Dict[str, Any], launch: bool = True) -> Dict[str, Any]:
+        """Prepare a run for a model snapshot and dataset, and start its workers unless launch is False"""
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        if len(labels) < num_workers:
+            raise ValueError(f"{len(labels)} samples cannot be sharded over {num_workers} workers")
+
+        run_id = uuid.uuid4().hex[:12]
+        run_dir = self.directory / run_id
+        write_snapshot(run_dir / 'initial', snapshot)
+        write_snapshot(run_dir / 'dataset', {
+            'arrays': {'features': np.asarray(features), 'labels': np.asarray(labels)},
+            'meta': {'num_samples': len(labels)}
+        })
+        # spec.json last: a run directory without it is incomplete
+        write_json(run_dir / 'spec.json', dict(
+            training,
+            run_id=run_id,
+            model_id=model_id,
+            num_workers=num_workers,
+            num_samples=len(labels),
+            coordinator_address=f"127.0.0.1:{_free_port()}",
+            timeout=self.timeout,
+            created_at=time.time()
+        ))
+
+        if launch:
+            self.launch(run_id)
+        return self.status(run_id)
+
+    def launch(self, run_id: str):
+        """Start one worker process per shard; process 0 hosts the jax.distributed coordination service"""
+        run_dir = self._run_dir(run_id)
+        spec = read_json(run_dir / 'spec.json')
+        env = dict(os.environ, **WORKER_ENV)
+        processes = []
+        for process_id in range(spec['num_workers']):
+            with open(run_dir / f"worker-{process_id}.log", 'w') as log_file:
+                processes.append(subprocess.Popen(
+                    [self.python, WORKER_SCRIPT, str(run_dir.resolve()), str(process_id)],
+                    stdout=log_file, stderr=subprocess.STDOUT, env=env
+                ))
+        with self._lock:
+            self._processes[run_id] = processes
+        logger.info(f"Launched {len(processes)} workers for distributed run {run_id} "
+                    f"(coordinator {spec['coordinator_address']})")
+
+    def stop(self, run_id: str) -> int:
+        """Terminate the run's launched workers; returns how many were still running"""
+        self._run_dir(run_id)
+        with self._lock:
+            processes = self._processes.get(run_id, [])
+        stopped = 0
+        for process in processes:
+            if process.poll() is None:
+                process.send_signal(signal.SIGTERM)
+                stopped += 1
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        return stopped
+
+    def status(self, run_id: str) -> Dict[str, Any]:
+        run_dir = self._run_dir(run_id)
+        spec = read_json(run_dir / 'spec.json')
+        with self._lock:
+            processes = self._processes.get(run_id)
+
+        workers = []
+        for process_id in range(spec['num_workers']):
+            worker = read_json(run_dir / f"worker-{process_id}.json") or {'process_id': process_id, 'state': 'pending'}
+            if processes is not None:
+                worker['returncode'] = processes[process_id].poll()
+                if worker['returncode'] not in (None, 0) and worker['state'] != 'completed':
+                    worker['state'] = 'failed'
+            workers.append(worker)
+
+        states = {worker['state'] for worker in workers}
+        if (run_dir / 'result' / 'meta.json').exists() and states == {'completed'}:
+            state = 'completed'
+        elif 'failed' in states:
+            state = 'failed'
+        elif states == {'pending'}:
+            state = 'pending' if processes is not None else 'waiting_for_workers'
+        else:
+            state = 'running'
+
+        # Every worker applies the same all-reduced update, so process 0 speaks for the run
+        lead = workers[0]
+        return {
+            'run_id': run_id,
+            'model_id': spec['model_id'],
+            'state': state,
+            'launched': processes is not None,
+            'num_workers': spec['num_workers'],
+            'num_samples': spec['num_samples'],
+            'coordinator_address': spec['coordinator_address'],
+            'created_at': spec['created_at'],
+            'epoch': lead.get('epoch'),
+            'step': lead.get('step'),
+            'total_steps': lead.get('total_steps'),
+            'loss': lead.get('loss'),
+            'epoch_losses': lead.get('epoch_losses', []),
+            'workers': workers
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Runs in the directory (including ones from before a restart), newest first"""
+        runs = [self.status(path.name) for path in self.directory.iterdir()
+                if path.is_dir() and (path / 'spec.json').exists()]
+        return sorted(runs, key=lambda run: run['created_at'], reverse=True)
+
+    def result(self, run_id: str) -> Dict[str, Any]:
+        """Trained model snapshot of a completed run"""
+        run_dir = self._run_dir(run_id)
+        if not (run_dir / 'result' / 'meta.json').exists():
+            raise ValueError(f"Distributed run {run_id} has not completed")
+        return read_snapshot(run_dir / 'result')
+
+    def delete(self, run_id: str):
+        run_dir = self._run_dir(run_id)
+        self.stop(run_id)
+        with self._lock:
+            self._processes.pop(run_id, None)
+        shutil.rmtree(run_dir)
@@ -0,0 +1,183 @@
+"""Worker process of a distributed training run (see distributed_training.py).
+
+Usage: python distributed_worker.py <run_dir> <process_id>
+
+Each worker trains on its own contiguous shard of the run's dataset. Every
+step it computes the summed loss and gradients of its batch, all-reduces them
+with the other workers and applies the mean gradient with the model's optax
+optimizer, so all workers hold identical parameters after every step.
+"""
+import base64
+import logging
+import os
+import sys
+import time
+import traceback
+from pathlib import Path
+
+import numpy as np
+
+from distributed_training import WORKER_ENV, read_json, write_json
+
+logger = logging.getLogger('distributed_worker')
+
+
+class CoordinationAllReduce:
+    """Sums float64 vectors across the processes of a run through the jax.distributed key-value store.
+
+    The CPU backend of this jax version cannot run collectives across
+    processes, so each process publishes its vector under a per-step key and
+    reads everyone else's. Peers are summed in process order, which keeps the
+    result bit-identical on every worker.
+    """
+
+    def __init__(self, client, run_id: str, process_id: int, num_processes: int, timeout: float):
+        self.client = client
+        self.prefix = f"allreduce/{run_id}"
+        self.process_id = process_id
+        self.num_processes = num_processes
+        self.timeout_ms = int(timeout * 1000)
+
+    def sum(self, step: int, vector: np.ndarray) -> np.ndarray:
+        vector = np.ascontiguousarray(vector, dtype=np.float64)
+        self.client.key_value_set(f"{self.prefix}/{step}/{self.process_id}",
+                                  base64.b64encode(vector.tobytes()).decode('ascii'))
+        total = np.zeros_like(vector)
+        for peer in range(self.num_processes):
+            value = self.client.blocking_key_value_get(f"{self.prefix}/{step}/{peer}", self.timeout_ms)
+            total += np.frombuffer(base64.b64decode(value), dtype=np.float64)
+        # Every peer published this step, so all of them have read the previous one
+        if step > 0:
+            try:
+                self.client.key_value_delete(f"{self.prefix}/{step - 1}/{self.process_id}")
+            except TypeError:
+                # jaxlib 0.4.20 deletes the key but cannot convert the returned status to Python
+                pass
+        return total
+
+
+def coordination_client():
+    """This process's jax.distributed client, for its key-value store and barriers.
+
+    jax 0.4.20 has no public accessor for the client, so this is the one place
+    that reaches into jax._src for it.
+    """
+    import jax
+    try:
+        from jax._src import distributed as jax_distributed
+        client = jax_distributed.global_state.client
+    except (ImportError, AttributeError) as e:
+        raise RuntimeError(f"jax {jax.__version__} does not expose the jax.distributed client "
+                           f"(jax._src.distributed.global_state.client) that distributed training uses") from e
+    if client is None:
+        raise RuntimeError("jax.distributed.initialize() has not been called in this process")
+    return client
+
+
+def run_worker(run_dir: Path, process_id: int):
+    spec = read_json(run_dir / 'spec.json')
+    num_workers = spec['num_workers']
+    status_path = run_dir / f"worker-{process_id}.json"
+    status = {'process_id': process_id, 'pid': os.getpid(), 'state': 'starting', 'epoch_losses': []}
+
+    def report(**fields):
+        status.update(fields, updated_at=time.time())
+        write_json(status_path, status)
+
+    report()
+    try:
+        import jax
+
+        # Must come before anything initialises a JAX backend, including importing the API module
+        jax.distributed.initialize(spec['coordinator_address'], num_workers, process_id,
+                                   initialization_timeout=int(spec['timeout']))
+        client = coordination_client()
+
+        for key, value in WORKER_ENV.items():
+            os.environ[key] = value
+        import jax.numpy as jnp
+        import app
+        from state_backend import read_snapshot, write_snapshot
+
+        state = app.new_model_state()
+        app.import_model_state(state, read_snapshot(run_dir / 'initial'))
+        if state['weights'] is None or state['opt_state'] is None:
+            raise ValueError("The run's model has no weights or no optimizer state")
+        calc = app.get_calculator(state)
+        similarity_metric = spec['similarity_metric']
+        loss_and_grad = jax.jit(calc._masked_loss_sum_and_grad, static_argnames=('similarity_metric',))
+        apply_gradients = jax.jit(
+            lambda params, opt_state, loss, gradients: calc._optax_apply_gradients(
+                state['optimizer'], params, opt_state, loss, gradients
+            )
+        )
+
+        dataset = read_snapshot(run_dir / 'dataset')
+        shard = np.array_split(np.arange(spec['num_samples']), num_workers)[process_id]
+        batch_size = spec['batch_size']
+        # Every worker runs the same number of steps; the smallest shard decides it
+        steps_per_epoch = max(1, -(-(spec['num_samples'] // num_workers) // batch_size))
+        total_steps = steps_per_epoch * spec['epochs']
+        allreduce = CoordinationAllReduce(client, spec['run_id'], process_id, num_workers, spec['timeout'])
+        weight_shape, bias_shape = state['weights'].shape, state['biases'].shape
+        weight_size = int(np.prod(weight_shape))
+        report(state='training', shard_size=len(shard), total_steps=total_steps, epoch=0, step=0)
+        logger.info(f"Worker {process_id}/{num_workers}: {len(shard)} samples, {total_steps} steps")
+
+        step_index = 0
+        start = time.time()
+        for epoch in range(spec['epochs']):
+            order = np.random.default_rng([spec.get('seed', 0), epoch, process_id]).permutation(shard)
+            epoch_loss = 0.0
+            for step in range(steps_per_epoch):
+                indices = np.sort(order[step * batch_size:(step + 1) * batch_size])
+                # Fixed-size batches (padding masked out) so the step compiles once
+                mask = np.arange(batch_size) < len(indices)
+                indices = np.resize(indices, batch_size) if len(indices) else np.zeros(batch_size, dtype=int)
+                features = jnp.asarray(np.asarray(dataset['arrays']['features'][indices], dtype=np.float64))
+                labels = jnp.asarray(np.asarray(dataset['arrays']['labels'][indices]))
+
+                params = (state['weights'], state['biases'])
+                loss_sum, (weight_gradients, bias_gradients) = loss_and_grad(
+                    params, features, labels, jnp.asarray(mask), similarity_metric=similarity_metric
+                )
+                total = allreduce.sum(step_index, np.concatenate([
+                    [float(loss_sum), float(mask.sum())],
+                    np.ravel(weight_gradients), np.ravel(bias_gradients)
+                ]))
+                count = total[1]
+                loss = total[0] / count
+                if not np.isfinite(loss):
+                    loss = 1000.0
+                gradients = (jnp.asarray(total[2:2 + weight_size].reshape(weight_shape) / count),
+                             jnp.asarray(total[2 + weight_size:].reshape(bias_shape) / count))
+
+                result = apply_gradients(params, state['opt_state'], jnp.asarray(loss), gradients)
+                app.record_optax_step(state, result, similarity_metric)
+                epoch_loss += loss
+                step_index += 1
+                report(epoch=epoch + 1, step=step_index, loss=loss)
+
+            status['epoch_losses'].append(epoch_loss / steps_per_epoch)
+            logger.info(f"Worker {process_id}: epoch {epoch + 1} loss {epoch_loss / steps_per_epoch:.4f}")
+
+        if process_id == 0:
+            write_snapshot(run_dir / 'result', app.export_model_state(state))
+        # Nobody leaves (shutting down the coordination service) before the result is written
+        client.wait_at_barrier(f"{spec['run_id']}/done", int(spec['timeout'] * 1000))
+        report(state='completed', train_seconds=time.time() - start)
+        jax.distributed.shutdown()
+
+    except Exception as e:
+        logger.error(f"Worker {process_id} failed: {str(e)}")
+        traceback.print_exc()
+        report(state='failed', error=str(e))
+        raise
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    try:
+        run_worker(Path(sys.argv[1]), int(sys.argv[2]))
+    except Exception:
+        sys.exit(1)
@@ -0,0 +1,167 @@
+"""Concurrent, resumable dataset downloads with integrity verification"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadError(RuntimeError):
+    """Raised when a file could not be fetched and verified from any mirror"""
+
+
+def load_manifest(manifest_path: str) -> Dict[str, Any]:
+    """Load the dataset manifest (mirrors and checksums), or an empty one if missing"""
+    path = Path(manifest_path)
+    if not path.exists():
+        logger.warning(f"Download manifest not found at {path}, checksums will not be verified")
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def file_digest(filepath: Path, algorithm: str = 'sha256', chunk_size: int = 1 << 20) -> str:
+    """Hash a file in chunks"""
+    digest = hashlib.new(algorithm)
+    with open(filepath, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadManager:
+    """Fetch dataset files concurrently with HTTP Range resume, mirrors and checksum verification.
+
+    Partial downloads live in ``<name>.part`` next to the destination and are only
+    renamed into place once complete and verified, so a file at its final path is
+    always whole.
+    """
+
+    def __init__(self, max_workers: int = 4, retries: int = 3, timeout: float = 30.0,
+                 chunk_size: int = 1 << 16):
+        self.max_workers = max_workers
+        self.retries = retries
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='download')
+        # One lock per destination so concurrent loads never write the same .part file
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Files already verified in this process, keyed by path -> (size, mtime)
+        self._verified: Dict[str, tuple] = {}
+
+    def _lock_for(self, filepath: Path) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(str(filepath), threading.Lock())
+
+    def verify(self, filepath: Path, expected: Optional[Dict[str, Any]] = None) -> bool:
+        """Check a file against its manifest entry (size, sha256 and/or md5)"""
+        if not filepath.exists():
+            return False
+        if not expected:
+            return True
+
+        stat = filepath.stat()
+        if self._verified.get(str(filepath)) == (stat.st_size, stat.st_mtime):
+            return True
+
+        if 'size' in expected and stat.st_size != expected['size']:
+            logger.warning(f"Size mismatch for {filepath.name}: {stat.st_size} != {expected['size']}")
+            return False
+        for algorithm in ('sha256', 'md5'):
+            if algorithm in expected:
+                actual = file_digest(filepath, algorithm)
+                if actual != expected[algorithm]:
+                    logger.warning(f"{algorithm} mismatch for {filepath.name}: {actual} != {expected[algorithm]}")
+                    return False
+                break
+
+        self._verified[str(filepath)] = (stat.st_size, stat.st_mtime)
+        return True
+
+    def _fetch_once(self, url: str, part_path: Path) -> None:
+        """Fetch ``url`` into ``part_path``, resuming from its current size when possible"""
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        req = urllib.request.Request(url)
+        if offset > 0:
+            req.add_header('Range', f'bytes={offset}-')
+
+        try:
+            response = urllib.request.urlopen(req, timeout=self.timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 416 and offset > 0:
+                # Requested range not satisfiable: the .part file is already complete
+                return
+            raise
+
+        with response:
+            if offset > 0 and response.status == 206:
+                mode = 'ab'
+                logger.info(f"Resuming {part_path.name} from byte {offset}")
+            else:
+                # Server ignored the Range header, start over
+                mode = 'wb'
+            with open(part_path, mode) as f:
+                for chunk in iter(lambda: response.read(self.chunk_size), b''):
+                    f.write(chunk)
+
+    def fetch(self, urls: List[str], filepath: Path, expected: Optional[Dict[str, Any]] = None) -> Path:
+        """Download ``filepath`` from the first mirror in ``urls`` that yields a verified file"""
+        filepath = Path(filepath)
+        with self._lock_for(filepath):
+            if self.verify(filepath, expected):
+                return filepath
+            if filepath.exists():
+                logger.warning(f"Discarding corrupt cached file {filepath.name}")
+                filepath.unlink()
+
+            part_path = filepath.with_name(filepath.name + '.part')
+            errors = []
+            for url in urls:
+                for attempt in range(1, self.retries + 1):
+                    try:
+                        logger.info(f"Downloading {filepath.name} from {url} (attempt {attempt})")
+                        self._fetch_once(url, part_path)
+                    except Exception as e:
+                        errors.append(f"{url}: {e}")
+                        logger.warning(f"Download of {filepath.name} from {url} failed: {e}")
+                        if attempt < self.retries:
+                            time.sleep(min(2 ** (attempt - 1), 8) * 0.5)
+                        continue
+
+                    if self.verify(part_path, expected):
+                        os.replace(part_path, filepath)
+                        stat = self._verified.pop(str(part_path), None)
+                        if stat is not None:
+                            self._verified[str(filepath)] = stat
+                        logger.info(f"Downloaded {filepath.name}")
+                        return filepath
+
+                    # Corrupt content: do not resume from it and move on to the next mirror
+                    errors.append(f"{url}: checksum verification failed")
+                    part_path.unlink(missing_ok=True)
+                    break
+
+            raise DownloadError(f"Failed to download {filepath.name}: {'; '.join(errors) or 'no URLs'}")
+
+    def fetch_many(self, jobs: List[Dict[str, Any]]) -> Dict[str, Path]:
+        """Download several files concurrently.
+
+        Each job is a dict with ``urls``, ``filepath`` and optional ``expected``.
+        Returns a mapping of file name to path, or raises the first ``DownloadError``.
+        """
+        futures = {
+            Path(job['filepath']).name: self._executor.submit(
+                self.fetch, job['urls'], job['filepath'], job.get('expected')
+            )
+            for job in jobs
+        }
+        return {name: future.result() for name, future in futures.items()}
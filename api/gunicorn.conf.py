@@ -0,0 +1,8 @@
+"""gunicorn settings for the API, read automatically when gunicorn is started from this directory"""
+
+
+def post_worker_init(worker):
+    """Per-worker startup the app's import leaves out: the kernel warm-up and following traffic recording sessions"""
+    import app
+    app.start_warmup()
+    app.traffic_recorder.follow_sessions()
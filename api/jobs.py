@@ -0,0 +1,134 @@
+"""Background jobs with status and progress reporting"""
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """A unit of background work. The worker function receives the job and reports progress on it."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    def __init__(self, kind: str, key: str):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.key = key
+        self.status = Job.PENDING
+        self.progress = 0.0
+        self.message = 'Queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in (Job.PENDING, Job.RUNNING)
+
+    def update(self, progress: Optional[float] = None, message: Optional[str] = None):
+        """Report progress (0.0 - 1.0) and/or a status message"""
+        if progress is not None:
+            self.progress = max(0.0, min(1.0, float(progress)))
+        if message is not None:
+            self.message = message
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False on timeout"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict[str, Any]:
+        elapsed_end = self.finished_at or time.time()
+        return {
+            'job_id': self.job_id,
+            'kind': self.kind,
+            'key': self.key,
+            'status': self.status,
+            'progress': round(self.progress, 4),
+            'message': self.message,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'elapsed_seconds': round(elapsed_end - self.started_at, 3) if self.started_at else None
+        }
+
+
+class JobManager:
+    """Run jobs on a worker pool, de-duplicating active jobs with the same (kind, key)"""
+
+    def __init__(self, max_workers: int = 2, name: str = 'jobs', max_finished: int = 100):
+        self.name = name
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs: 'OrderedDict[str, Job]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, key: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue ``fn(job, *args, **kwargs)``, or return the already active job for (kind, key)"""
+        with self._lock:
+            existing = self._find_active(kind, key)
+            if existing is not None:
+                return existing
+
+            job = Job(kind, key)
+            self._jobs[job.job_id] = job
+            self._prune()
+
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        job.update(message='Running')
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = Job.COMPLETED
+            job.update(progress=1.0, message='Completed')
+        except Exception as e:
+            logger.error(f"{self.name} job {job.kind}:{job.key} failed: {e}")
+            job.error = str(e)
+            job.status = Job.FAILED
+            job.update(message='Failed')
+        finally:
+            job.finished_at = time.time()
+            job._done.set()
+
+    def _find_active(self, kind: str, key: str) -> Optional[Job]:
+        for job in self._jobs.values():
+            if job.kind == kind and job.key == key and job.active:
+                return job
+        return None
+
+    def _prune(self):
+        """Drop the oldest finished jobs beyond ``max_finished``"""
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def find(self, kind: str, key: str) -> Optional[Job]:
+        """Most recent job for (kind, key), active or not"""
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.kind == kind and job.key == key:
+                    return job
+        return None
+
+    def list(self, kind: Optional[str] = None) -> List[Job]:
+        with self._lock:
+            return [job for job in self._jobs.values() if kind is None or job.kind == kind]
@@ -0,0 +1,371 @@
+"""Concurrent load test of the API with the traffic mix the frontend produces.
+
+Usage:
+    python load_test.py --start-server --workers 2 --threads 4 --duration 60 [options]
+    python load_test.py --url http://127.0.0.1:5000 --trainers 4 --canvas-users 8 [options]
+
+Virtual users run on threads, each with its own keep-alive session:
+
+- trainers: fetch a batch (/datasets/batch) and train on it (/train_step_optax), in a loop
+- canvas users: bursts of /forward calls (one per stroke update), then a pause
+- pollers: /model/weights and /training/metrics on an interval, like the frontend's weight sync
+
+By default every trainer shares one model, which is what exposes contention on
+its state lock; --models spreads trainers over that many separate models.
+Throughput and p50/p95/p99 latency are reported per route (excluding the
+--warmup period), as a table on stderr and JSON on stdout or --output.
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import requests
+
+NUM_CLASSES, NUM_FEATURES = 10, 784
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class LocalServer:
+    """The API under gunicorn on a free local port, with its state in a scratch directory"""
+
+    def __init__(self, workers: int = 1, threads: int = 4, env: Optional[Dict[str, str]] = None,
+                 startup_timeout: float = 300.0):
+        self.workers = workers
+        self.threads = threads
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.startup_timeout = startup_timeout
+        scratch = tempfile.mkdtemp(prefix='vortex-server-')
+        self.env = dict(os.environ, **{
+            'MODEL_STATE_DIR': os.path.join(scratch, 'model_state'),
+            'CHECKPOINT_DIR': os.path.join(scratch, 'checkpoints'),
+            'DISTRIBUTED_DIR': os.path.join(scratch, 'distributed_runs'),
+            'PROFILE_DIR': os.path.join(scratch, 'profiles'),
+            'TRAFFIC_RECORDING_DIR': os.path.join(scratch, 'traffic'),
+            'CHECKPOINT_EVERY_STEPS': '0',
+            # Workers only see each other's models through the shared file backend
+            'MODEL_STATE_BACKEND': 'local' if workers > 1 else 'memory',
+            **(env or {})
+        })
+        self.log_path = os.path.join(scratch, 'server.log')
+        self.process: Optional[subprocess.Popen] = None
+
+    def __enter__(self) -> 'LocalServer':
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        with open(self.log_path, 'w') as log_file:
+            self.process = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '--workers', str(self.workers), '--threads', str(self.threads),
+                 '--bind', f"127.0.0.1:{self.port}", '--timeout', '300', 'app:app'],
+                cwd=os.path.dirname(os.path.abspath(__file__)), env=self.env, stdout=log_file, stderr=subprocess.STDOUT
+            )
+        # /health answers 503 until the startup warm-up has finished
+        deadline = time.time() + self.startup_timeout
+        while time.time() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with {self.process.returncode}; see {self.log_path}")
+            try:
+                if requests.get(f"{self.url}/health", timeout=5).status_code == 200:
+                    return
+            except requests.RequestException:
+                pass
+            time.sleep(0.5)
+        self.stop()
+        raise RuntimeError(f"Server did not become healthy within {self.startup_timeout:g}s; see {self.log_path}")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class LatencyRecorder:
+    """Thread-safe log of (route, start, latency, ok) samples"""
+
+    def __init__(self):
+        self.samples: List[tuple] = []
+        self._lock = threading.Lock()
+
+    def add(self, route: str, started: float, latency: float, ok: bool):
+        with self._lock:
+            self.samples.append((route, started, latency, ok))
+
+    def between(self, since: float, until: float) -> List[tuple]:
+        """Samples of requests started in [since, until)"""
+        with self._lock:
+            return [sample for sample in self.samples if since <= sample[1] < until]
+
+    def summary(self, since: float, until: float) -> Dict[str, Dict[str, Any]]:
+        """Per-route throughput, error count and latency percentiles for requests started in [since, until)"""
+        samples = self.between(since, until)
+        window = max(until - since, 1e-9)
+        routes: Dict[str, List[tuple]] = {}
+        for sample in samples:
+            routes.setdefault(sample[0], []).append(sample)
+        return {route: latency_summary([s[2] for s in route_samples], sum(not s[3] for s in route_samples), window)
+                for route, route_samples in sorted(routes.items())}
+
+
+def latency_summary(latencies: List[float], errors: int, window: float) -> Dict[str, Any]:
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'throughput_rps': len(latencies) / window,
+        'mean_ms': float(latencies.mean()),
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'p99_ms': float(np.percentile(latencies, 99)),
+        'max_ms': float(latencies.max())
+    }
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, name: str, url: str, recorder: LatencyRecorder, stop: threading.Event, seed: int):
+        super().__init__(name=name, daemon=True)
+        self.url = url
+        self.recorder = recorder
+        self.stop_event = stop
+        self.session = requests.Session()
+        self.rng = np.random.default_rng(seed)
+
+    def call(self, method: str, path: str, **kwargs) -> Optional[Dict[str, Any]]:
+        started = time.time()
+        try:
+            response = self.session.request(method, f"{self.url}{path}", timeout=120, **kwargs)
+            body = response.json()
+            ok = response.status_code < 400 and body.get('success', True)
+        except (requests.RequestException, ValueError):
+            body, ok = None, False
+        self.recorder.add(f"{method} {path.split('?')[0]}", started, time.time() - started, ok)
+        return body if ok else None
+
+    def pace(self, scheduled: float) -> float:
+        """Wait until `interval` after the previous iteration's schedule (no catching up when behind)"""
+        if self.interval <= 0:
+            return scheduled
+        scheduled = max(scheduled + self.interval, time.time())
+        self.stop_event.wait(scheduled - time.time())
+        return scheduled
+
+    def run(self):
+        scheduled = time.time()
+        while not self.stop_event.is_set():
+            self.step()
+            scheduled = self.pace(scheduled)
+
+
+class Trainer(VirtualUser):
+    def __init__(self, *args, model_id: Optional[str], batch_size: int, rate: float, metric: str,
+                 synthetic_batches: bool, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.model_id = model_id
+        self.batch_size = batch_size
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self.metric = metric
+        self.synthetic_batches = synthetic_batches
+
+    def step(self):
+        if self.synthetic_batches:
+            batch = {'features': self.rng.random((self.batch_size, NUM_FEATURES)).tolist(),
+                     'labels': self.rng.integers(0, NUM_CLASSES, self.batch_size).tolist()}
+        else:
+            result = self.call('POST', '/datasets/batch', json={'batch_size': self.batch_size})
+            if result is None:
+                return
+            batch = result['batch']
+        payload = {'batch_features': batch['features'], 'batch_labels': batch['labels'],
+                   'similarity_metric': self.metric}
+        if self.model_id:
+            payload['model_id'] = self.model_id
+        self.call('POST', '/train_step_optax', json=payload)
+
+
+class CanvasUser(VirtualUser):
+    def __init__(self, *args, weights: List[List[float]], burst_size: int, burst_gap: float,
+                 burst_interval: float, metric: str, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.weights = weights
+        self.burst_size = burst_size
+        self.burst_gap = burst_gap
+        self.interval = burst_interval
+        self.metric = metric
+
+    def step(self):
+        # Strokes fill in the drawing, so successive requests carry a growing image
+        image = np.zeros(NUM_FEATURES)
+        for _ in range(self.burst_size):
+            if self.stop_event.is_set():
+                return
+            image[self.rng.integers(0, NUM_FEATURES, 20)] = 1.0
+            self.call('POST', '/forward', json={
+                'weights': self.weights, 'biases': [0.0] * NUM_CLASSES, 'features': image.tolist(),
+                'similarity_metric': self.metric, 'activation_function': 'softmax'
+            })
+            self.stop_event.wait(self.burst_gap)
+
+
+class Poller(VirtualUser):
+    def __init__(self, *args, model_id: Optional[str], interval: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.query = f"?model_id={model_id}" if model_id else ''
+        self.interval = interval
+
+    def step(self):
+        self.call('GET', f"/model/weights{self.query}")
+        self.call('GET', f"/training/metrics{self.query}")
+
+
+def prepare_models(url: str, count: int, rng: np.random.Generator) -> List[Optional[str]]:
+    """Initialise the model(s) under test: the default model, or `count` new models"""
+    model_ids: List[Optional[str]] = [None]
+    if count > 1:
+        model_ids = []
+        for _ in range(count):
+            response = requests.post(f"{url}/models", json={}, timeout=60).json()
+            if not response.get('success'):
+                raise RuntimeError(f"Could not create a model: {response.get('error')}")
+            model_ids.append(response['model_id'])
+    for model_id in model_ids:
+        extra = {'model_id': model_id} if model_id else {}
+        for path, payload in (
+            ('/model/weights', {'weights': rng.normal(0.0, 0.1, (NUM_CLASSES, NUM_FEATURES)).tolist(),
+                                'biases': [0.0] * NUM_CLASSES}),
+            ('/optimizer/init', {'optimizer_type': 'adam', 'learning_rate': 0.001})
+        ):
+            response = requests.post(f"{url}{path}", json=dict(payload, **extra), timeout=120).json()
+            if not response.get('success'):
+                raise RuntimeError(f"{path} failed: {response.get('error')}")
+    return model_ids
+
+
+def run_load(url: str, args) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    model_ids = prepare_models(url, args.models, rng)
+
+    synthetic = args.synthetic_batches
+    if not synthetic:
+        probe = requests.post(f"{url}/datasets/batch", json={'batch_size': 1}, timeout=300).json()
+        if not probe.get('success'):
+            print(f"No dataset batches ({probe.get('error')}); trainers use synthetic batches", file=sys.stderr)
+            synthetic = True
+
+    recorder = LatencyRecorder()
+    stop = threading.Event()
+    common = {'recorder': recorder, 'stop': stop}
+    weights = rng.normal(0.0, 0.1, (NUM_CLASSES, NUM_FEATURES)).tolist()
+    users: List[VirtualUser] = []
+    for i in range(args.trainers):
+        users.append(Trainer(f"trainer-{i}", url, seed=args.seed + len(users), model_id=model_ids[i % len(model_ids)],
+                             batch_size=args.batch_size, rate=args.train_rate, metric=args.metric,
+                             synthetic_batches=synthetic, **common))
+    for i in range(args.canvas_users):
+        users.append(CanvasUser(f"canvas-{i}", url, seed=args.seed + len(users), weights=weights,
+                                burst_size=args.burst_size, burst_gap=args.burst_gap,
+                                burst_interval=args.burst_interval, metric=args.metric, **common))
+    for i in range(args.pollers):
+        users.append(Poller(f"poller-{i}", url, seed=args.seed + len(users), model_id=model_ids[i % len(model_ids)],
+                            interval=args.poll_interval, **common))
+
+    start = time.time()
+    for user in users:
+        user.start()
+    stop.wait(args.warmup + args.duration)
+    stop.set()
+    end = time.time()
+    for user in users:
+        user.join(timeout=130)
+
+    measured_from = start + args.warmup
+    routes = recorder.summary(measured_from, end)
+    measured = recorder.between(measured_from, end)
+    return {
+        'settings': {key: value for key, value in vars(args).items() if key != 'output'},
+        'synthetic_batches': synthetic,
+        'measured_seconds': end - measured_from,
+        'total': latency_summary([s[2] for s in measured], sum(not s[3] for s in measured), end - measured_from)
+        if measured else None,
+        'routes': routes
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{'route':<28} {'requests':>9} {'errors':>7} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}", file=sys.stderr)
+    rows = list(report['routes'].items()) + ([('total', report['total'])] if report['total'] else [])
+    for route, stats in rows:
+        print(f"{route:<28} {stats['requests']:>9} {stats['errors']:>7} {stats['throughput_rps']:>8.1f} "
+              f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}",
+              file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    target = parser.add_argument_group('server')
+    target.add_argument('--url', default='http://127.0.0.1:5000', help='API to load (ignored with --start-server)')
+    target.add_argument('--start-server', action='store_true', help='Start the API under gunicorn for the run')
+    target.add_argument('--workers', type=int, default=1, help='gunicorn worker processes (with --start-server)')
+    target.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker (with --start-server)')
+    target.add_argument('--server-env', nargs='*', default=[], metavar='KEY=VALUE',
+                        help='Extra environment for the started server, e.g. JAX_WARMUP=0')
+
+    traffic = parser.add_argument_group('traffic')
+    traffic.add_argument('--duration', type=float, default=30.0, help='Measured seconds')
+    traffic.add_argument('--warmup', type=float, default=5.0, help='Seconds of load before measuring')
+    traffic.add_argument('--trainers', type=int, default=2)
+    traffic.add_argument('--train-rate', type=float, default=0.0, help='Steps per second per trainer (0: unthrottled)')
+    traffic.add_argument('--batch-size', type=int, default=32)
+    traffic.add_argument('--synthetic-batches', action='store_true',
+                         help='Generate batches client-side instead of calling /datasets/batch')
+    traffic.add_argument('--models', type=int, default=1, help='Spread trainers and pollers over this many models')
+    traffic.add_argument('--canvas-users', type=int, default=2)
+    traffic.add_argument('--burst-size', type=int, default=10, help='/forward calls per canvas burst')
+    traffic.add_argument('--burst-gap', type=float, default=0.05, help='Seconds between calls in a burst')
+    traffic.add_argument('--burst-interval', type=float, default=2.0, help='Seconds from one burst to the next')
+    traffic.add_argument('--pollers', type=int, default=1)
+    traffic.add_argument('--poll-interval', type=float, default=2.0)
+    traffic.add_argument('--metric', default='dotProduct', help='Similarity metric for training and /forward')
+    traffic.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    if args.start_server:
+        env = dict(item.split('=', 1) for item in args.server_env)
+        with LocalServer(args.workers, args.threads, env) as server:
+            report = run_load(server.url, args)
+        report['server'] = {'workers': args.workers, 'threads': args.threads, 'env': env}
+    else:
+        report = run_load(args.url, args)
+
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
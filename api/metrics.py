@@ -0,0 +1,251 @@
+"""Process-wide metrics in the Prometheus text exposition format (see /metrics).
+
+Counters, gauges and histograms are plain thread-safe objects: updating one is a
+dict lookup and an addition under a lock, so they can sit on request and
+training hot paths. Values that other components already keep (such as the
+dataset cache's hit counts) are exposed through ``function=`` callbacks read at
+scrape time instead of being counted twice.
+"""
+import bisect
+import functools
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# jax.monitoring duration events of a jit compilation, by phase
+COMPILE_PHASES = {
+    '/jax/core/compile/jaxpr_trace_duration': 'trace',
+    '/jax/core/compile/jaxpr_to_mlir_module_duration': 'lower',
+    '/jax/core/compile/backend_compile_duration': 'backend_compile'
+}
+CACHE_HIT_EVENT = '/jax/compilation_cache/cache_hits'
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[Any], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class _Metric:
+    kind = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], Any]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Called at scrape time; returns a value, or {label values tuple: value} for labelled metrics
+        self.function = function
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> List[str]:
+        if self.function is not None:
+            value = self.function()
+            values = value if isinstance(value, dict) else {(): value}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                # Per-bucket (non-cumulative) counts with a final +Inf bucket, then sum
+                series = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                function: Optional[Callable[[], Any]] = None) -> Counter:
+        return self.register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], Any]] = None) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return '\n'.join(line for metric in metrics for line in metric.render()) + '\n'
+
+
+class EventRate:
+    """Events per second over a sliding window, counted in one-second buckets"""
+
+    def __init__(self, window: float = 60.0):
+        self.window = window
+        self._buckets = deque()  # [second, count], oldest first
+        self._started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def mark(self, count: int = 1):
+        second = int(time.monotonic())
+        with self._lock:
+            if self._buckets and self._buckets[-1][0] == second:
+                self._buckets[-1][1] += count
+            else:
+                self._buckets.append([second, count])
+                while self._buckets[0][0] <= second - self.window:
+                    self._buckets.popleft()
+
+    def rate(self) -> float:
+        now = time.monotonic()
+        with self._lock:
+            total = sum(count for second, count in self._buckets if second > now - self.window)
+        # Until a full window has passed, average over the time since startup
+        return total / max(min(self.window, now - self._started), 1e-9)
+
+
+class CompileTracker:
+    """Attributes JAX compilations (count and seconds per phase) to named kernels.
+
+    ``track(name, fn)`` wraps a jitted function so that compilations triggered
+    while it runs on a thread are charged to ``name``; compilations outside any
+    tracked kernel (eager jnp operations, ad-hoc jits) are charged to 'other'.
+    jax.monitoring reports every phase synchronously on the compiling thread,
+    which is what makes the thread-local attribution exact.
+    """
+
+    def __init__(self, registry: MetricsRegistry):
+        self._local = threading.local()
+        self.compilations = registry.counter(
+            'jax_compilations_total', 'XLA compilations (including persistent cache loads) per kernel', ['kernel']
+        )
+        self.compile_seconds = registry.counter(
+            'jax_compile_seconds_total', 'Seconds spent compiling per kernel and phase', ['kernel', 'phase']
+        )
+        self.cache_hits = registry.counter(
+            'jax_persistent_cache_hits_total', 'Executables loaded from the persistent compilation cache'
+        )
+
+    def install(self):
+        """Register the jax.monitoring listeners (once per process)"""
+        from jax import monitoring
+        monitoring.register_event_duration_secs_listener(self._on_duration)
+        monitoring.register_event_listener(self._on_event)
+
+    def current_kernel(self) -> str:
+        return getattr(self._local, 'kernel', 'other')
+
+    def _on_duration(self, event: str, duration: float, **kwargs):
+        phase = COMPILE_PHASES.get(event)
+        if phase is None:
+            return
+        kernel = self.current_kernel()
+        self.compile_seconds.inc(duration, kernel=kernel, phase=phase)
+        if phase == 'backend_compile':
+            self.compilations.inc(kernel=kernel)
+
+    def _on_event(self, event: str, **kwargs):
+        if event == CACHE_HIT_EVENT:
+            self.cache_hits.inc()
+
+    def track(self, name: str, fn: Callable) -> Callable:
+        local = self._local
+
+        @functools.wraps(fn)
+        def tracked(*args, **kwargs):
+            outer = getattr(local, 'kernel', 'other')
+            local.kernel = name
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                local.kernel = outer
+
+        return tracked
@@ -0,0 +1,149 @@
+"""Registry of independently trained models keyed by model ID"""
+import copy
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_ID = 'default'
+
+
+class ModelRegistry:
+    """Holds one state dict per model ID, each with its own lock.
+
+    Every entry is a plain dict with the same keys as the original global
+    model state, plus ``model_id``, ``lock``, ``created_at`` and ``last_used``.
+    Models idle for longer than ``idle_ttl`` seconds are evicted, except the
+    default model and models ``evictable`` rejects. By default only models
+    without weights are evictable, as nothing else would bring back trained
+    weights dropped from this process.
+    """
+
+    def __init__(self, state_factory: Callable[[], Dict[str, Any]], idle_ttl: float = 3600.0,
+                 max_models: int = 32, evictable: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.state_factory = state_factory
+        self.idle_ttl = idle_ttl
+        self.max_models = max_models
+        self.evictable = evictable or (lambda state: state['weights'] is None)
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.create(DEFAULT_MODEL_ID)
+
+    def _new_entry(self, model_id: str) -> Dict[str, Any]:
+        state = self.state_factory()
+        now = time.time()
+        state.update({
+            'model_id': model_id,
+            'lock': threading.RLock(),
+            'created_at': now,
+            'last_used': now
+        })
+        return state
+
+    def create(self, model_id: Optional[str] = None, **overrides) -> Dict[str, Any]:
+        """Create a new model (a random ID is generated if none is given)"""
+        self.evict_idle()
+        with self._lock:
+            model_id = model_id or uuid.uuid4().hex[:12]
+            if model_id in self._models:
+                raise ValueError(f"Model already exists: {model_id}")
+            if len(self._models) >= self.max_models:
+                raise RuntimeError(f"Model limit reached ({self.max_models}). Delete a model first.")
+            state = self._new_entry(model_id)
+            state.update(overrides)
+            self._models[model_id] = state
+            logger.info(f"Created model {model_id}")
+            return state
+
+    def get(self, model_id: str = DEFAULT_MODEL_ID) -> Dict[str, Any]:
+        with self._lock:
+            state = self._models.get(model_id)
+        if state is None:
+            raise KeyError(f"Unknown model: {model_id}")
+        state['last_used'] = time.time()
+        return state
+
+    def get_or_create(self, model_id: str = DEFAULT_MODEL_ID) -> Dict[str, Any]:
+        try:
+            return self.get(model_id)
+        except KeyError:
+            try:
+                return self.create(model_id)
+            except ValueError:
+                # Created concurrently by another request
+                return self.get(model_id)
+
+    def clone(self, source_id: str, new_model_id: Optional[str] = None) -> Dict[str, Any]:
+        """Copy a model's parameters, optimizer state, settings and history into a new model"""
+        source = self.get(source_id)
+        with source['lock']:
+            snapshot = {
+                key: value for key, value in source.items()
+                if key not in ('model_id', 'lock', 'created_at', 'last_used')
+            }
+            # Parameter and optimizer state buffers are donated (invalidated) by train steps, so they
+            # are copied rather than shared; so are the mutable containers
+            for key in ('weights', 'biases', 'shadow_weights', 'accumulated_weight_gradients', 'opt_state'):
+                if snapshot.get(key) is not None:
+                    snapshot[key] = copy.deepcopy(snapshot[key])
+            snapshot['training_history'] = list(source['training_history'])
+            snapshot['evaluation_cache'] = dict(source['evaluation_cache'])
+            if isinstance(source.get('weight_distribution'), dict):
+                snapshot['weight_distribution'] = copy.copy(source['weight_distribution'])
+        return self.create(new_model_id, **snapshot)
+
+    def delete(self, model_id: str):
+        if model_id == DEFAULT_MODEL_ID:
+            raise ValueError("The default model cannot be deleted")
+        with self._lock:
+            if self._models.pop(model_id, None) is None:
+                raise KeyError(f"Unknown model: {model_id}")
+        logger.info(f"Deleted model {model_id}")
+
+    def discard(self, model_id: str):
+        """Forget a model locally, e.g. after another worker deleted it"""
+        if model_id == DEFAULT_MODEL_ID:
+            return
+        with self._lock:
+            self._models.pop(model_id, None)
+
+    def evict_idle(self) -> List[str]:
+        """Drop evictable models not used for idle_ttl seconds (never the default model or one in use)"""
+        cutoff = time.time() - self.idle_ttl
+        evicted = []
+        with self._lock:
+            for model_id, state in list(self._models.items()):
+                if model_id == DEFAULT_MODEL_ID or state['last_used'] >= cutoff:
+                    continue
+                # Skip models whose lock is held by a request right now
+                if state['lock'].acquire(blocking=False):
+                    try:
+                        if self.evictable(state):
+                            del self._models[model_id]
+                            evicted.append(model_id)
+                    finally:
+                        state['lock'].release()
+        for model_id in evicted:
+            logger.info(f"Evicted idle model {model_id}")
+        return evicted
+
+    def list(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            states = list(self._models.values())
+        return [
+            {
+                'model_id': state['model_id'],
+                'created_at': state['created_at'],
+                'last_used': state['last_used'],
+                'has_weights': state['weights'] is not None,
+                'weight_shape': list(state['weights'].shape) if state['weights'] is not None else None,
+                'current_epoch': state['current_epoch'],
+                'model_version': state['model_version'],
+                'use_ternary_weights': state['use_ternary_weights'],
+                'optimizer_initialized': state['optimizer'] is not None
+            }
+            for state in states
+        ]
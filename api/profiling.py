@@ -0,0 +1,230 @@
+"""On-demand profiling sessions: a JAX profiler trace plus cProfile stats of the Flask handlers.
+
+A session lives in ``directory/<session_id>/``:
+
+- ``jax/``: the JAX profiler trace (``plugins/profile/<run>/*.xplane.pb`` and
+  ``*.trace.json.gz``), viewable in TensorBoard's profile plugin or Perfetto
+- ``python.pstats``: cProfile stats merged over every profiled request
+  (``python -m pstats`` or snakeviz)
+- ``python.txt``: the top functions by cumulative time, as text
+- ``meta.json``: settings, start/stop times, stop reason and profiled routes
+
+Only one session runs at a time (the JAX profiler is process-global). It stops
+after the requested number of requests, after the requested number of seconds,
+or when stopped through the API, whichever comes first.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import jax
+
+from distributed_training import read_json, write_json
+
+logger = logging.getLogger(__name__)
+
+
+class _RequestProfile:
+    """A request being profiled: its session and (when Python profiling is on) its thread's cProfile"""
+
+    def __init__(self, session_id: str, profile: Optional[cProfile.Profile]):
+        self.session_id = session_id
+        self.profile = profile
+
+
+class ProfilerManager:
+    """Runs profiling sessions and lists the artifacts of past ones"""
+
+    def __init__(self, directory: str, max_seconds: float = 600.0):
+        self.directory = Path(directory)
+        self.max_seconds = max_seconds
+        self._session: Optional[Dict[str, Any]] = None
+        self._stats: Optional[pstats.Stats] = None
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+
+    def _session_dir(self, session_id: str) -> Path:
+        session_dir = self.directory / session_id
+        if '/' in session_id or session_id.startswith('.') or not (session_dir / 'meta.json').exists():
+            raise KeyError(f"Unknown profiling session: {session_id}")
+        return session_dir
+
+    def start(self, requests: Optional[int] = None, seconds: Optional[float] = None, jax_trace: bool = True,
+              python_profile: bool = True, routes: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Profile the next ``requests`` requests (to ``routes``, if given) and/or the next ``seconds`` seconds"""
+        if requests is None and seconds is None:
+            raise ValueError("Give a number of requests, a number of seconds, or both")
+        if requests is not None and requests < 1:
+            raise ValueError("requests must be at least 1")
+        if seconds is not None and not 0 < seconds <= self.max_seconds:
+            raise ValueError(f"seconds must be in (0, {self.max_seconds:g}]")
+        if not jax_trace and not python_profile:
+            raise ValueError("Nothing to capture: enable jax_trace or python_profile")
+
+        with self._lock:
+            if self._session is not None:
+                raise ValueError(f"Profiling session {self._session['session_id']} is already running")
+            session_id = uuid.uuid4().hex[:12]
+            session_dir = self.directory / session_id
+            session_dir.mkdir(parents=True)
+            session = {
+                'session_id': session_id,
+                'state': 'running',
+                'max_requests': requests,
+                'max_seconds': seconds,
+                'jax_trace': jax_trace,
+                'python_profile': python_profile,
+                'routes': list(routes) if routes else None,
+                'requests_profiled': 0,
+                'route_counts': {},
+                'started_at': time.time()
+            }
+            if jax_trace:
+                try:
+                    jax.profiler.start_trace(str(session_dir / 'jax'))
+                except Exception as e:
+                    # Someone else (e.g. an attached profiler client) may hold the JAX profiler
+                    session['jax_trace'] = False
+                    session['jax_trace_error'] = str(e)
+                    logger.warning(f"Could not start JAX trace for profiling session {session_id}: {e}")
+            self._session = session
+            self._stats = None
+            write_json(session_dir / 'meta.json', session)
+            if seconds is not None:
+                self._timer = threading.Timer(seconds, self._finish, kwargs={'reason': 'duration'})
+                self._timer.daemon = True
+                self._timer.start()
+        logger.info(f"Started profiling session {session_id} (requests={requests}, seconds={seconds})")
+        return dict(session)
+
+    def begin_request(self, route: str) -> Optional[_RequestProfile]:
+        """Start profiling the current request's thread if a session wants this route"""
+        session = self._session
+        if session is None or route.startswith('/profiler'):
+            return None
+        if session['routes'] is not None and route not in session['routes']:
+            return None
+        profile = None
+        if session['python_profile']:
+            profile = cProfile.Profile()
+            profile.enable()
+        return _RequestProfile(session['session_id'], profile)
+
+    def end_request(self, request_profile: Optional[_RequestProfile], route: str):
+        """Stop a request's profile (from begin_request) and merge it into its session"""
+        if request_profile is None:
+            return
+        if request_profile.profile is not None:
+            request_profile.profile.disable()
+        with self._lock:
+            session = self._session
+            if session is None or session['session_id'] != request_profile.session_id:
+                return
+            if request_profile.profile is not None:
+                if self._stats is None:
+                    self._stats = pstats.Stats(request_profile.profile)
+                else:
+                    self._stats.add(request_profile.profile)
+            session['requests_profiled'] += 1
+            session['route_counts'][route] = session['route_counts'].get(route, 0) + 1
+            stop = session['max_requests'] is not None and session['requests_profiled'] >= session['max_requests']
+        if stop:
+            self._finish(reason='requests')
+
+    def stop(self, reason: str = 'stopped') -> Optional[Dict[str, Any]]:
+        """End the running session and write its artifacts; returns the session, or None if none was running"""
+        session_id = self._finish(reason)
+        return self.get(session_id) if session_id is not None else None
+
+    def _finish(self, reason: str) -> Optional[str]:
+        """Stop and write the running session; returns its ID (or None if none was running).
+
+        The duration timer and the last profiled request stop sessions through this
+        rather than stop(), as the session may be deleted before they could read it back.
+        """
+        with self._lock:
+            session, stats = self._session, self._stats
+            if session is None:
+                return None
+            self._session, self._stats = None, None
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+            session_dir = self.directory / session['session_id']
+            if session['jax_trace']:
+                try:
+                    jax.profiler.stop_trace()
+                except Exception as e:
+                    session['jax_trace_error'] = str(e)
+                    logger.warning(f"Could not stop JAX trace for profiling session {session['session_id']}: {e}")
+            if stats is not None:
+                stats.dump_stats(str(session_dir / 'python.pstats'))
+                summary = io.StringIO()
+                pstats.Stats(str(session_dir / 'python.pstats'), stream=summary).sort_stats('cumulative').print_stats(50)
+                (session_dir / 'python.txt').write_text(summary.getvalue())
+
+            session.update(state='completed', stop_reason=reason, stopped_at=time.time())
+            write_json(session_dir / 'meta.json', session)
+        logger.info(f"Profiling session {session['session_id']} stopped ({reason}) after "
+                    f"{session['requests_profiled']} requests")
+        return session['session_id']
+
+    def status(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return dict(self._session) if self._session is not None else None
+
+    def get(self, session_id: str, top: int = 20) -> Dict[str, Any]:
+        """A session's metadata, artifacts and (once stopped) its top Python functions by cumulative time"""
+        session_dir = self._session_dir(session_id)
+        session = read_json(session_dir / 'meta.json')
+        session['artifacts'] = [
+            {'path': str(path.relative_to(session_dir)), 'bytes': path.stat().st_size}
+            for path in sorted(session_dir.rglob('*')) if path.is_file() and path.name != 'meta.json'
+        ]
+        if (session_dir / 'python.pstats').exists() and top > 0:
+            session['top_functions'] = self._top_functions(session_dir / 'python.pstats', top)
+        return session
+
+    @staticmethod
+    def _top_functions(path: Path, top: int) -> List[Dict[str, Any]]:
+        stats = pstats.Stats(str(path))
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+        return [
+            {
+                'function': f"{filename}:{line}({name})",
+                'calls': calls,
+                'total_seconds': total_time,
+                'cumulative_seconds': cumulative_time
+            }
+            for (filename, line, name), (_, calls, total_time, cumulative_time, _) in rows
+        ]
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Sessions in the directory (including ones from before a restart), newest first"""
+        if not self.directory.exists():
+            return []
+        sessions = [self.get(path.name, top=0) for path in self.directory.iterdir()
+                    if path.is_dir() and (path / 'meta.json').exists()]
+        return sorted(sessions, key=lambda session: session['started_at'], reverse=True)
+
+    def artifact_path(self, session_id: str, artifact: str) -> Path:
+        session_dir = self._session_dir(session_id).resolve()
+        path = (session_dir / artifact).resolve()
+        if session_dir not in path.parents or not path.is_file():
+            raise KeyError(f"Unknown artifact {artifact} of profiling session {session_id}")
+        return path
+
+    def delete(self, session_id: str):
+        session_dir = self._session_dir(session_id)
+        with self._lock:
+            if self._session is not None and self._session['session_id'] == session_id:
+                raise ValueError(f"Profiling session {session_id} is still running")
+        shutil.rmtree(session_dir)
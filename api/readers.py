@@ -0,0 +1,186 @@
+"""Incremental readers for IDX and CSV dataset files.
+
+Each source reads records sequentially, so the first N samples can be
+returned without decompressing or parsing the rest of the file, and a
+later request for more samples continues from where the last one stopped.
+"""
+import gzip
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class IDXReader:
+    """Sequential reader for a (gzipped) IDX file of unsigned bytes"""
+
+    def __init__(self, filepath: str):
+        opener = gzip.open if str(filepath).endswith('.gz') else open
+        self._file = opener(filepath, 'rb')
+
+        # Header: two zero bytes, a type code, the number of dimensions, then one int per dimension
+        magic = int.from_bytes(self._file.read(4), 'big')
+        type_code = (magic >> 8) & 0xff
+        if type_code != 0x08:
+            raise ValueError(f"Unsupported IDX type 0x{type_code:02x} in {filepath}, expected unsigned bytes")
+        ndim = magic & 0xff
+        dims = [int.from_bytes(self._file.read(4), 'big') for _ in range(ndim)]
+
+        self.num_items = dims[0]
+        self.item_shape = tuple(dims[1:])
+        self.item_size = int(np.prod(self.item_shape)) if self.item_shape else 1
+        self.num_read = 0
+
+    def __enter__(self) -> 'IDXReader':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def exhausted(self) -> bool:
+        return self.num_read >= self.num_items
+
+    def read(self, count: Optional[int] = None) -> np.ndarray:
+        """Read the next ``count`` items (all remaining if None)"""
+        remaining = self.num_items - self.num_read
+        count = remaining if count is None else max(0, min(count, remaining))
+        # Nothing left to read once exhausted, and the file is closed by then
+        buffer = self._file.read(count * self.item_size) if count else b''
+        items = np.frombuffer(buffer, dtype=np.uint8).reshape((count,) + self.item_shape)
+        self.num_read += count
+        if self.exhausted:
+            self.close()
+        return items
+
+    def close(self):
+        self._file.close()
+
+
+class IDXDatasetSource:
+    """Paired image and label IDX files read in lockstep"""
+
+    def __init__(self, images_path: str, labels_path: str):
+        self.images = IDXReader(images_path)
+        self.labels = IDXReader(labels_path)
+        if self.images.num_items != self.labels.num_items:
+            raise ValueError(f"IDX image/label count mismatch: {self.images.num_items} != {self.labels.num_items}")
+
+    @property
+    def exhausted(self) -> bool:
+        return self.images.exhausted
+
+    def read(self, count: Optional[int] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        return self.images.read(count), self.labels.read(count)
+
+    def close(self):
+        self.images.close()
+        self.labels.close()
+
+
+def count_csv_rows(csv_path: str, chunk_size: int = 1 << 24) -> int:
+    """Count data rows (excluding the header) by scanning for newlines"""
+    rows = 0
+    last = b'\n'
+    with open(csv_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            rows += chunk.count(b'\n')
+            last = chunk[-1:]
+    if last != b'\n':
+        rows += 1  # Final line without a trailing newline
+    return max(0, rows - 1)
+
+
+class CSVDatasetSource:
+    """Kaggle-style CSV (optional label column followed by pixel columns) parsed straight to uint8.
+
+    Rows are parsed in chunks with explicit uint8 column types - by pyarrow's
+    multi-threaded reader when it is installed, otherwise by pandas' C parser -
+    and copied into a preallocated array, so no int64 DataFrame of the whole
+    file is ever built.
+    """
+
+    def __init__(self, csv_path: str, has_labels: Optional[bool] = None, chunk_rows: int = 8192):
+        self.csv_path = str(csv_path)
+        self.chunk_rows = chunk_rows
+
+        with open(self.csv_path, 'r') as f:
+            self.columns = [name.strip() for name in f.readline().split(',')]
+        if has_labels is None:
+            # Kaggle MNIST-style files name their label column "label"; unlabeled test sets start with pixels
+            has_labels = self.columns[0].lower() == 'label'
+        self.has_labels = has_labels
+
+        self.num_pixels = len(self.columns) - (1 if has_labels else 0)
+        # Reshape flattened pixels to square images (784 = 28x28)
+        self.img_size = 28 if self.num_pixels == 784 else int(np.sqrt(self.num_pixels))
+
+        self.num_read = 0
+        self._total_rows = None
+        self._pending = None
+        self._batches = self._iter_batches()
+        self._exhausted = False
+
+    @property
+    def exhausted(self) -> bool:
+        return self._exhausted
+
+    def _iter_batches(self):
+        """Yield uint8 arrays of shape (rows, columns) in file order"""
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+        except ImportError:
+            pa = None
+
+        if pa is not None:
+            reader = pa_csv.open_csv(
+                self.csv_path,
+                read_options=pa_csv.ReadOptions(block_size=1 << 22, use_threads=True),
+                convert_options=pa_csv.ConvertOptions(column_types={name: pa.uint8() for name in self.columns})
+            )
+            for batch in reader:
+                block = np.empty((batch.num_rows, batch.num_columns), dtype=np.uint8)
+                for j, column in enumerate(batch.columns):
+                    block[:, j] = column.to_numpy(zero_copy_only=False)
+                yield block
+        else:
+            import pandas as pd
+
+            for chunk in pd.read_csv(self.csv_path, dtype=np.uint8, chunksize=self.chunk_rows, engine='c'):
+                yield chunk.to_numpy(dtype=np.uint8)
+
+    def read(self, count: Optional[int] = None) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """Read the next ``count`` rows (all remaining if None) into preallocated uint8 arrays"""
+        if count is None:
+            if self._total_rows is None:
+                self._total_rows = count_csv_rows(self.csv_path)
+            count = max(0, self._total_rows - self.num_read)
+
+        label_offset = 1 if self.has_labels else 0
+        labels = np.empty(count, dtype=np.uint8) if self.has_labels else None
+        pixels = np.empty((count, self.num_pixels), dtype=np.uint8)
+        filled = 0
+        while filled < count and not self._exhausted:
+            if self._pending is None:
+                self._pending = next(self._batches, None)
+                if self._pending is None:
+                    self._exhausted = True
+                    break
+            take = min(count - filled, len(self._pending))
+            pixels[filled:filled + take] = self._pending[:take, label_offset:]
+            if labels is not None:
+                labels[filled:filled + take] = self._pending[:take, 0]
+            self._pending = self._pending[take:] if take < len(self._pending) else None
+            filled += take
+        self.num_read += filled
+
+        if self._total_rows is not None and self.num_read >= self._total_rows and self._pending is None:
+            self._exhausted = True
+        if self._exhausted:
+            self.close()
+
+        images = pixels[:filled].reshape(-1, self.img_size, self.img_size)
+        return images, (labels[:filled] if labels is not None else None)
+
+    def close(self):
+        self._batches.close()
@@ -0,0 +1,344 @@
+"""Replay recorded API traffic against a server, and compare the latency of two replays.
+
+Usage:
+    python replay.py run traffic/<recording>.jsonl.gz [...] --start-server [--speed 2] --output before.json
+    python replay.py run traffic/<recording>.jsonl.gz --url http://127.0.0.1:5000 --speed 0 --output after.json
+    python replay.py compare before.json after.json [--threshold 0.10]
+
+Recordings come from the app's traffic recorder (/traffic/recording/start, or
+TRAFFIC_RECORDING_ENABLED=1); the files of several gunicorn workers are merged
+by timestamp. Requests are re-issued in their recorded order at the recorded
+pace divided by --speed (0: back to back), from a pool of --concurrency
+threads so that requests which overlapped while recording overlap again. Bodies
+are sent as recorded when the recording has them; otherwise they are rebuilt
+from the recorded scalar fields plus random arrays of the recorded shapes.
+
+Replay manages model lifetimes itself: every model the recording refers to is
+created (and, unless --no-init-models, given random weights and an Adam
+optimizer) before the replay, and recorded POST /models and DELETE
+/models/<model_id> requests are skipped.
+
+`run` reports per-route latency percentiles as measured by the client (plus the
+recorded server-side durations, for reference) and keeps the raw latencies;
+`compare` checks two reports route by route and exits with status 1 if a route
+got slower at the median or p95 by more than --threshold (and --min-delta ms)
+with a significant two-sample Kolmogorov-Smirnov test.
+"""
+import argparse
+import gzip
+import json
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+import numpy as np
+import requests
+
+from load_test import LocalServer, LatencyRecorder, latency_summary, NUM_CLASSES, NUM_FEATURES
+
+SKIPPED_ROUTES = {('POST', '/models'), ('DELETE', '/models/<model_id>')}
+
+
+def read_recordings(paths: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """The recordings' headers, and their requests merged in timestamp order"""
+    headers, entries = [], []
+    for path in paths:
+        try:
+            with gzip.open(path, 'rt') as f:
+                for line in f:
+                    record = json.loads(line)
+                    if 'recording' in record:
+                        headers.append(dict(record['recording'], path=path))
+                    else:
+                        entries.append(record)
+        except (EOFError, zlib.error):
+            # The recording process exited without stopping the recording
+            print(f"{path} is truncated; replaying the requests read before the end", file=sys.stderr)
+    entries.sort(key=lambda entry: entry['ts'])
+    return headers, entries
+
+
+def entry_key(entry: Dict[str, Any]) -> str:
+    return f"{entry['method']} {entry['route']}"
+
+
+def referenced_models(entries: List[Dict[str, Any]]) -> List[Optional[str]]:
+    """Models the requests name in their body, query or path (None: the default model)"""
+    model_ids = set()
+    for entry in entries:
+        model_id = entry['params'].get('model_id') or parse_qs(entry['query']).get('model_id', [None])[0]
+        if '<model_id>' in entry['route']:
+            for part, value in zip(entry['route'].split('/'), entry['path'].split('/')):
+                if part == '<model_id>':
+                    model_id = value
+        model_ids.add(model_id or None)
+    return sorted(model_ids, key=lambda model_id: model_id or '')
+
+
+def prepare_models(url: str, model_ids: List[Optional[str]], init: bool, rng: np.random.Generator):
+    for model_id in model_ids:
+        if model_id is not None:
+            response = requests.post(f"{url}/models", json={'model_id': model_id}, timeout=60)
+            if response.status_code != 201 and 'already exists' not in response.json().get('error', ''):
+                raise RuntimeError(f"Could not create model {model_id}: {response.json().get('error')}")
+        if not init:
+            continue
+        extra = {'model_id': model_id} if model_id else {}
+        for path, payload in (
+            ('/model/weights', {'weights': rng.normal(0.0, 0.1, (NUM_CLASSES, NUM_FEATURES)).tolist(),
+                                'biases': [0.0] * NUM_CLASSES}),
+            ('/optimizer/init', {'optimizer_type': 'adam', 'learning_rate': 0.001})
+        ):
+            response = requests.post(f"{url}{path}", json=dict(payload, **extra), timeout=120).json()
+            if not response.get('success'):
+                raise RuntimeError(f"{path} failed for model {model_id or 'default'}: {response.get('error')}")
+
+
+class BodyBuilder:
+    """Request bodies: the recorded body, or the recorded scalars plus random arrays of the recorded shapes"""
+
+    def __init__(self, rng: np.random.Generator):
+        self.rng = rng
+        # Arrays are generated once per (field, shape, dtype) and shared by the requests that need them
+        self._arrays: Dict[tuple, list] = {}
+
+    def array(self, field: str, shape: List[int], dtype: str) -> list:
+        key = (field, tuple(shape), dtype)
+        if key not in self._arrays:
+            if dtype == 'int':
+                self._arrays[key] = self.rng.integers(0, NUM_CLASSES, shape).tolist()
+            else:
+                self._arrays[key] = self.rng.random(shape).tolist()
+        return self._arrays[key]
+
+    def body(self, entry: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if 'body' in entry:
+            return entry['body']
+        if not entry['params'] and not entry['arrays']:
+            return None
+        body = dict(entry['params'])
+        for field, spec in entry['arrays'].items():
+            body[field] = self.array(field, spec['shape'], spec['dtype'])
+        return body
+
+
+def replay(url: str, entries: List[Dict[str, Any]], args) -> Dict[str, Any]:
+    rng = np.random.default_rng(args.seed)
+    if args.routes:
+        entries = [entry for entry in entries if entry['route'] in args.routes]
+    skipped = [entry for entry in entries if (entry['method'], entry['route']) in SKIPPED_ROUTES]
+    entries = [entry for entry in entries if (entry['method'], entry['route']) not in SKIPPED_ROUTES]
+    if not entries:
+        raise ValueError("Nothing to replay")
+    prepare_models(url, referenced_models(entries), not args.no_init_models, rng)
+
+    builder = BodyBuilder(rng)
+    local = threading.local()
+
+    def send(entry: Dict[str, Any], scheduled: float, recorder: LatencyRecorder, lags: List[float]):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.time()
+        lags.append(started - scheduled)
+        path = entry['path'] + (f"?{entry['query']}" if entry['query'] else '')
+        try:
+            response = session.request(entry['method'], f"{url}{path}", json=builder.body(entry), timeout=args.timeout)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            ok = False
+        recorder.add(entry_key(entry), started, time.time() - started, ok)
+
+    def play(speed: float, recorder: LatencyRecorder, lags: List[float]) -> Tuple[float, float]:
+        first_ts = entries[0]['ts']
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for entry in entries:
+                scheduled = start + (entry['ts'] - first_ts) / speed if speed > 0 else time.time()
+                delay = scheduled - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(send, entry, scheduled, recorder, lags)
+        return start, time.time()
+
+    # Unmeasured passes, back to back, so the measured one doesn't pay for first-call compilation
+    for _ in range(args.warmup_passes):
+        play(0.0, LatencyRecorder(), [])
+    recorder = LatencyRecorder()
+    lags: List[float] = []
+    start, end = play(args.speed, recorder, lags)
+
+    routes: Dict[str, List[float]] = {}
+    recorded: Dict[str, List[float]] = {}
+    for route, _, latency, _ in recorder.samples:
+        routes.setdefault(route, []).append(latency)
+    for entry in entries:
+        recorded.setdefault(entry_key(entry), []).append(entry['duration_ms'] / 1000)
+    lags_ms = np.array(lags) * 1000
+    return {
+        'settings': {key: value for key, value in vars(args).items() if key not in ('output', 'command')},
+        'requests': len(entries),
+        'skipped': len(skipped),
+        'replay_seconds': end - start,
+        'recorded_seconds': entries[-1]['ts'] - entries[0]['ts'],
+        # How late requests were sent relative to their schedule (high values: the replay could not keep pace)
+        'lag_ms': {'p50': float(np.percentile(lags_ms, 50)), 'p95': float(np.percentile(lags_ms, 95)),
+                   'max': float(lags_ms.max())},
+        'total': latency_summary([s[2] for s in recorder.samples], sum(not s[3] for s in recorder.samples),
+                                 end - start),
+        'routes': recorder.summary(start, end),
+        'recorded_server_ms': {route: {'p50': float(np.percentile(values, 50)) * 1000,
+                                       'p95': float(np.percentile(values, 95)) * 1000}
+                               for route, values in sorted(recorded.items())},
+        'latencies_ms': {route: [round(latency * 1000, 3) for latency in values]
+                         for route, values in sorted(routes.items())}
+    }
+
+
+def ks_test(a: List[float], b: List[float]) -> Tuple[float, float]:
+    """Two-sample Kolmogorov-Smirnov statistic and its asymptotic p-value"""
+    a, b = np.sort(a), np.sort(b)
+    values = np.concatenate([a, b])
+    statistic = float(np.max(np.abs(np.searchsorted(a, values, side='right') / len(a) -
+                                    np.searchsorted(b, values, side='right') / len(b))))
+    n = len(a) * len(b) / (len(a) + len(b))
+    lam = (np.sqrt(n) + 0.12 + 0.11 / np.sqrt(n)) * statistic
+    if lam < 1e-3:
+        return statistic, 1.0
+    k = np.arange(1, 101)
+    p_value = float(np.clip(2 * np.sum((-1) ** (k - 1) * np.exp(-2 * k ** 2 * lam ** 2)), 0.0, 1.0))
+    return statistic, p_value
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, min_delta: float,
+            alpha: float) -> Dict[str, Any]:
+    """Per-route latency distributions of two replays; slower (p50 or p95) and significantly different regresses"""
+    rows = []
+    for route, latencies in current['latencies_ms'].items():
+        previous = baseline['latencies_ms'].get(route)
+        if not previous or not latencies:
+            continue
+        statistic, p_value = ks_test(previous, latencies)
+        row = {'route': route, 'baseline_requests': len(previous), 'requests': len(latencies),
+               'ks_statistic': statistic, 'p_value': p_value}
+        slower = faster = False
+        for q in (50, 95):
+            before, after = float(np.percentile(previous, q)), float(np.percentile(latencies, q))
+            ratio = after / before if before else float('inf')
+            row.update({f"baseline_p{q}_ms": before, f"p{q}_ms": after, f"p{q}_ratio": ratio})
+            slower |= ratio > 1 + threshold and after - before > min_delta
+            faster |= ratio < 1 / (1 + threshold) and before - after > min_delta
+        row['regression'] = slower and p_value < alpha
+        row['improvement'] = faster and not slower and p_value < alpha
+        rows.append(row)
+    return {
+        'threshold': threshold,
+        'min_delta_ms': min_delta,
+        'alpha': alpha,
+        'compared': len(rows),
+        'regressions': [row for row in rows if row['regression']],
+        'improvements': [row for row in rows if row['improvement']],
+        'missing_from_current': sorted(set(baseline['latencies_ms']) - set(current['latencies_ms'])),
+        'new_in_current': sorted(set(current['latencies_ms']) - set(baseline['latencies_ms'])),
+        'rows': rows
+    }
+
+
+def print_report(report: Dict[str, Any]):
+    print(f"{report['requests']} requests replayed in {report['replay_seconds']:.1f}s "
+          f"(recorded over {report['recorded_seconds']:.1f}s), {report['skipped']} skipped; "
+          f"send lag p95 {report['lag_ms']['p95']:.1f} ms", file=sys.stderr)
+    print(f"{'route':<40} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'rec p50':>9}", file=sys.stderr)
+    for route, stats in report['routes'].items():
+        print(f"{route:<40} {stats['requests']:>9} {stats['errors']:>7} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {report['recorded_server_ms'][route]['p50']:>9.1f}",
+              file=sys.stderr)
+
+
+def print_comparison(comparison: Dict[str, Any]):
+    for row in comparison['rows']:
+        flag = 'REGRESSION' if row['regression'] else ('improved' if row['improvement'] else '')
+        print(f"{row['route']:<40} p50 {row['baseline_p50_ms']:9.1f} -> {row['p50_ms']:9.1f} ms  "
+              f"p95 {row['baseline_p95_ms']:9.1f} -> {row['p95_ms']:9.1f} ms  KS p={row['p_value']:.3f}  {flag}",
+              file=sys.stderr)
+    print(f"{comparison['compared']} routes compared, {len(comparison['regressions'])} regressions, "
+          f"{len(comparison['improvements'])} improvements (threshold {comparison['threshold']:.0%})", file=sys.stderr)
+
+
+def _read(path: str) -> Dict[str, Any]:
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _write(result: Dict[str, Any], path: Optional[str]):
+    if path:
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        json.dump(result, sys.stdout, indent=2)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Replay recordings and report latencies')
+    run_parser.add_argument('recordings', nargs='+', help='Recording files (.jsonl.gz) of one session')
+    run_parser.add_argument('--url', default='http://127.0.0.1:5000', help='API to replay against')
+    run_parser.add_argument('--start-server', action='store_true', help='Start the API under gunicorn for the replay')
+    run_parser.add_argument('--workers', type=int, default=1, help='gunicorn worker processes (with --start-server)')
+    run_parser.add_argument('--threads', type=int, default=4, help='gunicorn threads per worker (with --start-server)')
+    run_parser.add_argument('--server-env', nargs='*', default=[], metavar='KEY=VALUE',
+                            help='Extra environment for the started server, e.g. JAX_WARMUP=0')
+    run_parser.add_argument('--speed', type=float, default=1.0,
+                            help='Pace relative to the recording (2: twice as fast; 0: back to back)')
+    run_parser.add_argument('--concurrency', type=int, default=8, help='Requests in flight at most')
+    run_parser.add_argument('--warmup-passes', type=int, default=0,
+                            help='Replay the recording this many times (unmeasured) before the measured pass')
+    run_parser.add_argument('--routes', nargs='+', help='Only replay these routes (e.g. /forward)')
+    run_parser.add_argument('--no-init-models', action='store_true',
+                            help="Don't give the recording's models random weights and an optimizer first")
+    run_parser.add_argument('--timeout', type=float, default=120.0, help='Seconds per request')
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--output', help='Write the JSON report to this file (default: stdout)')
+
+    compare_parser = commands.add_parser('compare', help='Compare the latencies of two replays')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Relative slowdown of p50 or p95 that counts as a regression')
+    compare_parser.add_argument('--min-delta', type=float, default=1.0,
+                                help='Absolute slowdown (ms) below which nothing is flagged')
+    compare_parser.add_argument('--alpha', type=float, default=0.01,
+                                help='KS test significance level for a difference to count')
+    compare_parser.add_argument('--output', help='Write the comparison as JSON to this file')
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        headers, entries = read_recordings(args.recordings)
+        if args.start_server:
+            env = dict(item.split('=', 1) for item in args.server_env)
+            with LocalServer(args.workers, args.threads, env) as server:
+                report = replay(server.url, entries, args)
+            report['server'] = {'workers': args.workers, 'threads': args.threads, 'env': env}
+        else:
+            report = replay(args.url, entries, args)
+        report['recordings'] = headers
+        print_report(report)
+        _write(report, args.output)
+        return 0
+
+    comparison = compare(_read(args.baseline), _read(args.current), args.threshold, args.min_delta, args.alpha)
+    print_comparison(comparison)
+    if args.output:
+        _write(comparison, args.output)
+    return 1 if comparison['regressions'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
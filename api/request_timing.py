@@ -0,0 +1,143 @@
+"""Per-request phase timing, reported in Server-Timing response headers (see /timing)"""
+import functools
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional
+
+import jax
+import numpy as np
+
+# In the order a tensor-carrying request goes through them
+PHASES = ('parse', 'transfer', 'compute', 'sync', 'convert', 'serialize')
+
+_NOT_TIMED = nullcontext()
+
+
+class _Phase:
+    def __init__(self, local: threading.local, name: str):
+        self.local = local
+        self.name = name
+
+    def __enter__(self):
+        # Phases do not nest: time inside an open phase belongs to the outer one
+        self.outermost = not self.local.in_phase
+        if self.outermost:
+            self.local.in_phase = True
+            self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        if self.outermost:
+            phases = self.local.phases
+            phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.started
+            self.local.in_phase = False
+        return False
+
+
+class RequestTimer:
+    """Attributes the wall time of a request to phases (JSON parsing, host-to-device transfer, compute, ...).
+
+    Timing is opt-in: for every request while ``enabled``, otherwise only for
+    requests that ask for it (see app.py). While a request is timed, kernels
+    wrapped with ``time_kernel`` wait for their results inside the compute
+    phase, so device work is charged to compute rather than to whichever later
+    conversion happens to block on it; untimed requests keep JAX's asynchronous
+    dispatch. Whatever no phase covers (validation, state bookkeeping, eager
+    jnp operations) is reported as 'other'.
+    """
+
+    def __init__(self, enabled: bool = False, history: int = 200):
+        self.enabled = enabled
+        self.history = history
+        self._local = threading.local()
+        self._recent: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def begin(self, requested: bool = False):
+        """Start timing the current request (on this thread) if timing is enabled or was requested"""
+        timed = self.enabled or requested
+        self._local.phases = {} if timed else None
+        self._local.in_phase = False
+        self._local.started = time.perf_counter()
+
+    def active(self) -> bool:
+        return getattr(self._local, 'phases', None) is not None
+
+    def phase(self, name: str):
+        """Context manager charging its wall time to ``name`` (a no-op outside timed requests)"""
+        if getattr(self._local, 'phases', None) is None:
+            return _NOT_TIMED
+        return _Phase(self._local, name)
+
+    def time_kernel(self, fn: Callable) -> Callable:
+        """Wrap a jitted function so timed requests charge its dispatch and execution to 'compute'"""
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            if getattr(self._local, 'phases', None) is None:
+                return fn(*args, **kwargs)
+            with self.phase('compute'):
+                return jax.block_until_ready(fn(*args, **kwargs))
+
+        return timed
+
+    def finish(self, route: str) -> Optional[str]:
+        """End the current request's timing; returns its Server-Timing header value, if it was timed"""
+        phases = getattr(self._local, 'phases', None)
+        if phases is None:
+            return None
+        self._local.phases = None
+        total = time.perf_counter() - self._local.started
+        timings = {name: phases[name] for name in PHASES if name in phases}
+        timings['other'] = max(0.0, total - sum(timings.values()))
+        timings['total'] = total
+
+        with self._lock:
+            recent = self._recent.get(route)
+            if recent is None or recent.maxlen != self.history:
+                recent = self._recent[route] = deque(recent or (), maxlen=self.history)
+            recent.append(timings)
+        return ', '.join(f"{name};dur={seconds * 1000:.3f}" for name, seconds in timings.items())
+
+    def breakdown(self, route: Optional[str] = None) -> Dict[str, Any]:
+        """Mean milliseconds per phase and total latency percentiles, per route over its recent timed requests"""
+        with self._lock:
+            recent = {key: list(value) for key, value in self._recent.items() if route is None or key == route}
+        result = {}
+        for key, timings in sorted(recent.items()):
+            totals = np.array([timing['total'] for timing in timings]) * 1000
+            names = [name for name in PHASES + ('other',) if any(name in timing for timing in timings)]
+            result[key] = {
+                'requests': len(timings),
+                'mean_ms': {name: float(np.mean([timing.get(name, 0.0) for timing in timings]) * 1000)
+                            for name in names},
+                'total_ms': {
+                    'mean': float(totals.mean()),
+                    'p50': float(np.percentile(totals, 50)),
+                    'p95': float(np.percentile(totals, 95)),
+                    'max': float(totals.max())
+                }
+            }
+        return result
+
+    def configure(self, enabled: Optional[bool] = None, history: Optional[int] = None):
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            if history is not None:
+                self.history = max(1, history)
+
+    def clear(self) -> int:
+        with self._lock:
+            cleared = sum(len(value) for value in self._recent.values())
+            self._recent.clear()
+        return cleared
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'history': self.history,
+                'routes': len(self._recent)
+            }
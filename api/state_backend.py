@@ -0,0 +1,191 @@
+"""Model state shared between worker processes (e.g. several gunicorn workers).
+
+A snapshot of a model is a dict with ``arrays`` (name -> numpy array) and
+``meta`` (JSON-serialisable values including a ``revision`` counter). Each
+worker keeps its own in-memory copy and reloads it when the backend holds a
+newer revision.
+"""
+import contextlib
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def write_snapshot(directory: Path, snapshot: Dict[str, Any]):
+    """Write a snapshot as one .npy file per array plus meta.json (written last)"""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    arrays = snapshot['arrays']
+    for name, array in arrays.items():
+        tmp_path = directory / f".{name}.tmp.npy"
+        np.save(tmp_path, np.asarray(array))
+        os.replace(tmp_path, directory / f"{name}.npy")
+
+    # Remove arrays that no longer exist in the state (e.g. after an optimizer reset)
+    for stale in directory.glob('*.npy'):
+        if stale.stem not in arrays:
+            stale.unlink()
+
+    # meta.json goes last: its revision is what other workers check
+    meta = dict(snapshot['meta'], array_names=sorted(arrays))
+    tmp_meta = directory / '.meta.json.tmp'
+    with open(tmp_meta, 'w') as f:
+        json.dump(meta, f, default=lambda value: np.asarray(value).tolist())
+    os.replace(tmp_meta, directory / 'meta.json')
+
+
+def read_snapshot(directory: Path) -> Dict[str, Any]:
+    """Read a snapshot written by write_snapshot, with arrays memory-mapped rather than read"""
+    directory = Path(directory)
+    with open(directory / 'meta.json', 'r') as f:
+        meta = json.load(f)
+    arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in meta.get('array_names', [])}
+    return {'arrays': arrays, 'meta': meta}
+
+
+class MemoryStateBackend:
+    """No sharing: state lives only in this process (single-worker deployments)"""
+
+    shared = False
+
+    def lock(self, model_id: str, shared: bool = False):
+        return contextlib.nullcontext()
+
+    def revision(self, model_id: str) -> Optional[int]:
+        return None
+
+    def exists(self, model_id: str) -> bool:
+        return False
+
+    def load(self, model_id: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    def save(self, model_id: str, snapshot: Dict[str, Any]):
+        pass
+
+    def delete(self, model_id: str):
+        pass
+
+    def list_ids(self) -> List[str]:
+        return []
+
+
+class LocalFileStateBackend:
+    """Snapshots stored as one .npy file per array plus meta.json, guarded by an flock per model.
+
+    Arrays are read back memory-mapped, so checking for and loading a newer
+    revision costs little more than reading meta.json. Every file is written to
+    a temporary name and renamed into place while the exclusive lock is held.
+    """
+
+    shared = True
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock_files: Dict[str, Any] = {}
+        self._lock_files_guard = threading.Lock()
+
+    def _model_dir(self, model_id: str) -> Path:
+        if not model_id or '/' in model_id or model_id.startswith('.'):
+            raise ValueError(f"Invalid model id: {model_id}")
+        return self.directory / model_id
+
+    def _lock_path(self, model_id: str) -> Path:
+        return self.directory / f".{model_id}.lock"
+
+    def _is_current(self, model_id: str, lock_file) -> bool:
+        """Whether an open lock file is still the one at the model's lock path (delete unlinks it)"""
+        try:
+            path_stat = os.stat(self._lock_path(model_id))
+        except FileNotFoundError:
+            return False
+        file_stat = os.fstat(lock_file.fileno())
+        return (path_stat.st_dev, path_stat.st_ino) == (file_stat.st_dev, file_stat.st_ino)
+
+    def _lock_file(self, model_id: str):
+        with self._lock_files_guard:
+            lock_file = self._lock_files.get(model_id)
+            if lock_file is not None and not self._is_current(model_id, lock_file):
+                # Deleted by another worker since; a recreated model locks the new file
+                lock_file.close()
+                lock_file = None
+            if lock_file is None:
+                lock_file = open(self._lock_path(model_id), 'a+')
+                self._lock_files[model_id] = lock_file
+            return lock_file
+
+    @contextlib.contextmanager
+    def lock(self, model_id: str, shared: bool = False):
+        """Cross-process lock for one model (shared for readers, exclusive for writers)"""
+        while True:
+            lock_file = self._lock_file(model_id)
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            if self._is_current(model_id, lock_file):
+                break
+            # The model was deleted while we waited: the lock is on an unlinked file, so take the new one
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+        try:
+            yield
+        finally:
+            # delete() closes the file, which releases the lock
+            if not lock_file.closed:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _read_meta(self, model_id: str) -> Optional[Dict[str, Any]]:
+        meta_path = self._model_dir(model_id) / 'meta.json'
+        try:
+            with open(meta_path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def revision(self, model_id: str) -> Optional[int]:
+        meta = self._read_meta(model_id)
+        return meta['revision'] if meta else None
+
+    def exists(self, model_id: str) -> bool:
+        return (self._model_dir(model_id) / 'meta.json').exists()
+
+    def load(self, model_id: str) -> Optional[Dict[str, Any]]:
+        if self._read_meta(model_id) is None:
+            return None
+        return read_snapshot(self._model_dir(model_id))
+
+    def save(self, model_id: str, snapshot: Dict[str, Any]):
+        """Write a snapshot; the caller must hold the exclusive lock"""
+        write_snapshot(self._model_dir(model_id), snapshot)
+
+    def delete(self, model_id: str):
+        """Remove a model's snapshot and lock file; the caller must hold the exclusive lock"""
+        shutil.rmtree(self._model_dir(model_id), ignore_errors=True)
+        with self._lock_files_guard:
+            lock_file = self._lock_files.pop(model_id, None)
+            # Unlinked before the lock is released, so workers waiting on it retry on a new file
+            self._lock_path(model_id).unlink(missing_ok=True)
+            if lock_file is not None:
+                lock_file.close()
+
+    def list_ids(self) -> List[str]:
+        return sorted(path.name for path in self.directory.iterdir()
+                      if path.is_dir() and (path / 'meta.json').exists())
+
+
+def create_state_backend(kind: str, directory: str):
+    """Build the configured backend: 'memory' (per-process, default) or 'local' (shared files)"""
+    if kind == 'memory':
+        return MemoryStateBackend()
+    if kind == 'local':
+        logger.info(f"Sharing model state between workers via {directory}")
+        return LocalFileStateBackend(directory)
+    raise ValueError(f"Unknown state backend: {kind}. Use 'local' or 'memory'")
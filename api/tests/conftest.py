@@ -0,0 +1,65 @@
+"""Make the api modules importable the way app.py imports them (flat, from the api directory)"""
+import gzip
+import sys
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from distributed_training import WORKER_ENV  # noqa: E402
+
+
+def write_idx(path: Path, array: np.ndarray) -> Path:
+    """Write a uint8 array as a (gzipped, for a .gz path) IDX file"""
+    array = np.asarray(array, dtype=np.uint8)
+    header = bytes([0, 0, 0x08, array.ndim]) + b''.join(dim.to_bytes(4, 'big') for dim in array.shape)
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, 'wb') as f:
+        f.write(header + array.tobytes())
+    return path
+
+
+@pytest.fixture(scope='session')
+def api(tmp_path_factory):
+    """The API module, with its (and distributed workers') state in a scratch directory and no startup work"""
+    scratch = tmp_path_factory.mktemp('api')
+    with pytest.MonkeyPatch.context() as patch:
+        for name, directory in [('CHECKPOINT_DIR', 'checkpoints'), ('MODEL_STATE_DIR', 'model_state'),
+                                ('DISTRIBUTED_DIR', 'distributed_runs'), ('PROFILE_DIR', 'profiles'),
+                                ('TRAFFIC_RECORDING_DIR', 'traffic'), ('MNIST_DATA_DIR', 'mnist_data')]:
+            patch.setenv(name, str(scratch / directory))
+        patch.setenv('JAX_COMPILATION_CACHE_DIR', '')
+        for name, value in WORKER_ENV.items():
+            patch.setenv(name, value)
+        yield pytest.importorskip('app')
+
+
+@pytest.fixture
+def client(api):
+    return api.app.test_client()
+
+
+@pytest.fixture
+def idx_loader(api, tmp_path, monkeypatch):
+    """A fresh dataset loader whose direct datasets are 50-sample IDX files on local disk"""
+    rng = np.random.default_rng(0)
+    images = rng.integers(0, 256, (50, 28, 28), dtype=np.uint8)
+    labels = rng.integers(0, 10, 50, dtype=np.uint8)
+    paths = (write_idx(tmp_path / 'images-idx3-ubyte.gz', images), write_idx(tmp_path / 'labels-idx1-ubyte.gz', labels))
+    loader = api.MNISTDatasetLoader(data_dir=str(tmp_path / 'data'))
+    monkeypatch.setattr(loader, 'download_dataset_files', lambda dataset_name, subset: paths)
+    loader.test_images, loader.test_labels = images, labels
+    return loader
+
+
+@pytest.fixture
+def model_id(client):
+    """A fresh model with 784-feature ternary weights, deleted afterwards"""
+    model_id = f"test-{uuid.uuid4().hex[:8]}"
+    response = client.post('/model/initialize_ternary', json={'model_id': model_id})
+    assert response.status_code == 200, response.get_json()
+    yield model_id
+    client.delete(f'/models/{model_id}')
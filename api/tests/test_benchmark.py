@@ -0,0 +1,59 @@
+"""The microbenchmark runner and the comparison that flags regressions"""
+import json
+
+import pytest
+
+import benchmark
+
+
+def result(name, median, **params):
+    return {'group': 'kernel', 'name': name, 'params': params, 'median_seconds': median}
+
+
+def test_measure_excludes_the_first_call():
+    calls = []
+    timings = benchmark.measure(lambda: calls.append(1), repeats=5, min_time=0.0)
+    assert len(calls) == 6 and timings['repeats'] == 5
+    assert timings['min_seconds'] <= timings['median_seconds'] <= timings['p90_seconds']
+
+
+def test_compare_flags_slowdowns_beyond_threshold_and_min_delta():
+    baseline = {'results': [result('a', 0.010, batch_size=1), result('b', 0.010), result('c', 1e-6),
+                            result('gone', 0.01)]}
+    current = {'results': [result('a', 0.013, batch_size=1), result('b', 0.005), result('c', 1e-5),
+                           result('new', 0.01)]}
+    comparison = benchmark.compare(baseline, current, threshold=0.1, min_delta=5e-5)
+
+    assert [row['benchmark'] for row in comparison['regressions']] == ['kernel/a[batch_size=1]']
+    assert [row['benchmark'] for row in comparison['improvements']] == ['kernel/b[]']
+    # 10x slower, but by less than min_delta
+    assert not any(row['regression'] for row in comparison['rows'] if row['benchmark'] == 'kernel/c[]')
+    assert comparison['missing_from_current'] == ['kernel/gone[]']
+    assert comparison['new_in_current'] == ['kernel/new[]']
+
+
+def test_compare_command_exit_status(tmp_path, capsys):
+    baseline, current = tmp_path / 'baseline.json', tmp_path / 'current.json'
+    baseline.write_text(json.dumps({'results': [result('a', 0.01)]}))
+    current.write_text(json.dumps({'results': [result('a', 0.02)]}))
+    assert benchmark.main(['compare', str(baseline), str(current)]) == 1
+    assert json.loads(capsys.readouterr().out)['regressions'][0]['ratio'] == pytest.approx(2.0)
+    assert benchmark.main(['compare', str(current), str(baseline)]) == 0
+
+
+@pytest.mark.parametrize('selection', [['--skip-endpoints', '--filter', 'kernel/compute_loss'],
+                                       ['--skip-kernels', '--filter', 'POST /train_step_optax']])
+def test_run_writes_selected_results(api, tmp_path, selection):
+    output = tmp_path / 'results.json'
+    status = benchmark.main(['run', '--metrics', 'dotProduct', '--batch-sizes', '4', '--dtypes', 'float64',
+                             '--repeats', '3', '--min-time', '0', '--output', str(output)] + selection)
+    assert status == 0
+    results = json.loads(output.read_text())
+    assert results['environment']['jax'] and results['settings']['filter'] == selection[-1]
+    assert len(results['results']) == 1
+    timings = results['results'][0]
+    assert timings['params'] == {'metric': 'dotProduct', 'batch_size': 4, **(
+        {'dtype': 'float64'} if timings['group'] == 'kernel' else {})}
+    assert timings['repeats'] >= 3 and timings['first_call_seconds'] > 0
+    if timings['group'] == 'endpoint':
+        assert timings['request_bytes'] > 0 and timings['request_median_seconds'] > 0
@@ -0,0 +1,76 @@
+"""Checkpoints: int8 packing of ternary arrays, restores and retention per kind"""
+import numpy as np
+import pytest
+
+from checkpoints import AUTO_TAG, CheckpointManager
+
+
+def snapshot(weights, **meta):
+    return {'arrays': {'weights': weights, 'biases': np.linspace(-1.0, 1.0, weights.shape[0])},
+            'meta': dict({'model_version': 1}, **meta)}
+
+
+def save(manager, step, tag=None, weights=None):
+    job = manager.save('m', snapshot(np.zeros((3, 4)) if weights is None else weights), step, tag=tag)
+    job.wait()
+    assert job.error is None, job.error
+    return job.result
+
+
+def test_ternary_arrays_are_packed_to_int8(tmp_path):
+    manager = CheckpointManager(str(tmp_path))
+    weights = np.random.default_rng(0).integers(-1, 2, (10, 784)).astype(np.float64)
+    info = save(manager, 3, weights=weights)
+
+    loaded = manager.load('m')
+    assert loaded['meta']['packed_arrays'] == {'weights': '<f8'}
+    assert loaded['arrays']['weights'].dtype == np.int8
+    np.testing.assert_array_equal(loaded['arrays']['weights'], weights)
+    # Not ternary, so kept at full precision
+    assert loaded['arrays']['biases'].dtype == np.float64
+    assert info['bytes'] < weights.nbytes / 4
+
+
+def test_packed_arrays_are_widened_on_the_device(api, tmp_path):
+    manager = CheckpointManager(str(tmp_path))
+    weights = np.array([[1.0, 0.0, -1.0]])
+    save(manager, 1, weights=weights)
+    array = api.snapshot_device_array(manager.load('m'), 'weights')
+    assert array.dtype == np.float64
+    np.testing.assert_array_equal(np.asarray(array), weights)
+
+
+def test_retention_counts_each_kind_separately(tmp_path):
+    manager = CheckpointManager(str(tmp_path), max_to_keep=2, max_auto_to_keep=3)
+    manual = [save(manager, step)['checkpoint_id'] for step in range(3)]
+    auto = [save(manager, step, tag=AUTO_TAG)['checkpoint_id'] for step in range(10, 15)]
+
+    checkpoints = manager.list('m')
+    assert [info['checkpoint_id'] for info in checkpoints if info['kind'] == 'manual'] == manual[:0:-1]
+    assert [info['checkpoint_id'] for info in checkpoints if info['kind'] == 'auto'] == auto[:1:-1]
+    assert save(manager, 20, tag='best')['removed'] == [manual[1]]
+
+
+def test_unknown_checkpoints_raise_key_error(tmp_path):
+    manager = CheckpointManager(str(tmp_path))
+    with pytest.raises(KeyError):
+        manager.load('m')
+    with pytest.raises(KeyError):
+        manager.delete('m', 'missing')
+
+
+def test_restored_model_keeps_training(api, client, model_id):
+    saved = client.post('/checkpoints/save', json={'model_id': model_id, 'wait': True})
+    assert saved.status_code == 200, saved.get_json()
+    restored = client.post('/checkpoints/restore', json={'model_id': model_id})
+    assert restored.status_code == 200, restored.get_json()
+
+    state = api.model_registry.get(model_id)
+    rng = np.random.default_rng(0)
+    response = client.post('/train_step', json={
+        'model_id': model_id, 'weights': np.asarray(state['weights']).tolist(),
+        'biases': np.asarray(state['biases']).tolist(), 'batch_features': rng.random((4, 784)).tolist(),
+        'batch_labels': [0, 1, 2, 3], 'similarity_metric': 'dotProduct', 'activation_function': 'softmax'
+    })
+    assert response.status_code == 200, response.get_json()
+    assert state['current_epoch'] == 1
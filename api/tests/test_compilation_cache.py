@@ -0,0 +1,21 @@
+"""The persistent compilation cache stays off on CPU and by default"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+API_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_cache_is_off_by_default(tmp_path):
+    env = {key: value for key, value in os.environ.items() if key != 'JAX_COMPILATION_CACHE_DIR'}
+    env['PYTHONPATH'] = str(API_DIR)
+    result = subprocess.run([sys.executable, '-c', 'import config; print(repr(config.JAX_CACHE_DIR))'],
+                            cwd=tmp_path, env=env, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "''"
+
+
+def test_cpu_processes_create_no_cache_directory(api, tmp_path):
+    assert api.jax.default_backend() == 'cpu'
+    api.enable_compilation_cache(str(tmp_path / 'jax_cache'))
+    assert not (tmp_path / 'jax_cache').exists()
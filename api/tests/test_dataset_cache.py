@@ -0,0 +1,83 @@
+"""DatasetCache byte budget, LRU/LFU eviction and pinning"""
+import numpy as np
+import pytest
+
+from dataset_cache import DatasetCache
+
+
+def entry(nbytes: int):
+    return {'features': np.zeros(nbytes, dtype=np.uint8), 'class_names': ['0']}
+
+
+def test_lru_evicts_least_recently_used():
+    cache = DatasetCache(max_bytes=300, policy='lru')
+    cache['a'], cache['b'], cache['c'] = entry(100), entry(100), entry(100)
+    cache.get('a')
+    cache['d'] = entry(100)
+
+    assert cache.keys() == ['c', 'a', 'd']
+    assert cache.current_bytes == 300 and cache.evictions == 1 and cache.evicted_bytes == 100
+
+
+def test_lfu_evicts_least_frequently_used():
+    cache = DatasetCache(max_bytes=300, policy='lfu')
+    cache['a'], cache['b'], cache['c'] = entry(100), entry(100), entry(100)
+    for key in ('a', 'a', 'b', 'c'):
+        cache.get(key)
+    cache.get('b')
+    cache['d'] = entry(100)
+
+    assert 'c' not in cache and set(cache.keys()) == {'a', 'b', 'd'}
+
+
+def test_pinned_entries_are_not_evicted_until_unpinned():
+    removed = []
+    cache = DatasetCache(max_bytes=200, on_remove=lambda key, value: removed.append(key))
+    cache['a'] = entry(100)
+    cache.pin('a')
+    cache.pin('a')
+    cache['b'], cache['c'] = entry(100), entry(100)
+    assert 'a' in cache and removed == ['b']
+
+    cache['d'] = entry(100)
+    assert removed == ['b', 'c']
+    cache.unpin('a')
+    assert cache.is_pinned('a') and 'a' in cache
+    cache.max_bytes = 100
+    cache.unpin('a')
+    # Evictable once the last pin goes, and the least recently used
+    assert not cache.is_pinned('a') and cache.keys() == ['d'] and removed == ['b', 'c', 'a']
+
+
+def test_oversized_entry_is_kept_alone():
+    cache = DatasetCache(max_bytes=100)
+    cache['a'] = entry(50)
+    cache['big'] = entry(500)
+    assert cache.keys() == ['big']
+
+
+def test_counters_and_pop():
+    removed = []
+    cache = DatasetCache(max_bytes=1000, on_remove=lambda key, value: removed.append(key))
+    cache['a'] = entry(10)
+    assert cache.get('missing') is None and cache['a'] is cache.peek('a')
+    with pytest.raises(KeyError):
+        cache['missing']
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['current_bytes']) == (1, 2, 10)
+    assert cache.pop('a') is not None and removed == ['a'] and cache.current_bytes == 0
+
+    with pytest.raises(ValueError):
+        DatasetCache(max_bytes=1, policy='fifo')
+
+
+def test_loader_pins_a_split_while_in_use(idx_loader):
+    dataset = idx_loader.get_dataset('mnist_original', 'test')
+    cache = idx_loader.loaded_datasets
+    with idx_loader.pinned('mnist_original', 'test'):
+        assert idx_loader.dataset_status()['mnist_original']['test']['pinned']
+        cache.max_bytes = 0
+        cache['other'] = entry(10)
+        assert cache.peek('mnist_original_test') is dataset
+    assert 'mnist_original_test' not in cache
+    assert idx_loader.dataset_status()['mnist_original']['test']['state'] != 'ready'
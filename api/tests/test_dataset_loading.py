@@ -0,0 +1,81 @@
+"""Background dataset loads: JobManager de-duplication and the loader's shared load jobs"""
+import threading
+
+import numpy as np
+import pytest
+
+from jobs import Job, JobManager
+
+
+def test_active_jobs_are_deduplicated_by_kind_and_key():
+    jobs = JobManager(max_workers=2)
+    release = threading.Event()
+    calls = []
+
+    def work(job, value):
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    first = jobs.submit('load', 'a', work, 1)
+    assert jobs.submit('load', 'a', work, 1) is first
+    other = jobs.submit('load', 'b', work, 2)
+    assert other is not first
+    release.set()
+    assert first.wait(5) and other.wait(5)
+    assert (first.status, first.result, first.progress) == (Job.COMPLETED, 2, 1.0)
+    assert sorted(calls) == [1, 2]
+
+    # A finished job is not joined: the same key runs again
+    again = jobs.submit('load', 'a', work, 3)
+    assert again is not first and again.wait(5) and again.result == 6
+    assert jobs.find('load', 'a') is again
+
+
+def test_failed_job_reports_its_error():
+    jobs = JobManager(max_workers=1)
+
+    def fail(job):
+        raise ValueError('no such file')
+
+    job = jobs.submit('load', 'x', fail)
+    assert job.wait(5)
+    assert job.status == Job.FAILED and job.error == 'no such file' and not job.active
+    assert job.to_dict()['status'] == 'failed'
+
+
+def test_finished_jobs_beyond_the_limit_are_pruned():
+    jobs = JobManager(max_workers=1, max_finished=2)
+    for i in range(4):
+        jobs.submit('load', str(i), lambda job: None).wait(5)
+    jobs.submit('load', 'last', lambda job: None).wait(5)
+    assert len(jobs.list()) <= 3
+    assert jobs.find('load', 'last') is not None and jobs.find('load', '0') is None
+
+
+def test_concurrent_requests_share_one_load(idx_loader):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(idx_loader.get_dataset('mnist_original', 'test')))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(10)
+
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    assert len(idx_loader.load_jobs.list()) == 1
+    np.testing.assert_array_equal(results[0]['labels'], idx_loader.test_labels)
+    np.testing.assert_allclose(results[0]['features'], idx_loader.test_images.reshape(50, -1) / 255.0, rtol=1e-6)
+    status = idx_loader.dataset_status()['mnist_original']
+    assert status['test']['state'] == 'ready' and status['test']['num_samples'] == 50
+    assert status['train']['state'] == 'not_loaded'
+
+
+def test_failed_load_is_reported(idx_loader, monkeypatch):
+    def missing(dataset_name, subset):
+        raise FileNotFoundError('mirror unavailable')
+
+    monkeypatch.setattr(idx_loader, 'download_dataset_files', missing)
+    with pytest.raises(RuntimeError, match='mirror unavailable'):
+        idx_loader.get_dataset('mnist_original', 'train')
+    assert idx_loader.dataset_status()['mnist_original']['train']['state'] == 'failed'
@@ -0,0 +1,85 @@
+"""Sampled diagnostics: sampling, the ring buffer and records from training steps"""
+import numpy as np
+import pytest
+
+from diagnostics import DiagnosticsCollector
+
+
+def test_disabled_collector_samples_nothing():
+    collector = DiagnosticsCollector()
+    assert not any(collector.sample('step') for _ in range(10))
+    assert collector.stats()['events_seen'] == {}
+
+
+def test_every_nth_event_of_each_kind_is_sampled():
+    collector = DiagnosticsCollector(enabled=True, sample_every=3)
+    assert [collector.sample('a') for _ in range(7)] == [True, False, False, True, False, False, True]
+    assert collector.sample('b')
+    assert collector.stats()['events_seen'] == {'a': 7, 'b': 1}
+
+    collector.configure(sample_every=2)
+    assert [collector.sample('a') for _ in range(3)] == [True, False, True]
+
+
+def test_records_are_converted_off_thread_into_a_ring_buffer():
+    collector = DiagnosticsCollector(enabled=True, capacity=3)
+    for step in range(5):
+        collector.record('step', {'loss': np.float64(step), 'norms': np.arange(2) * step, 'nested': {'x': None}},
+                         model_id='m')
+    collector.flush()
+
+    records = collector.query()
+    assert [record['id'] for record in records] == [3, 4, 5]
+    assert records[-1]['values'] == {'loss': 4.0, 'norms': [0, 4], 'nested': {'x': None}}
+    assert records[-1]['model_id'] == 'm' and records[-1]['kind'] == 'step'
+    assert [record['id'] for record in collector.query(since_id=3, limit=1)] == [5]
+
+    collector.record('other', {'value': 1})
+    collector.flush()
+    assert [record['kind'] for record in collector.query(kind='other')] == ['other']
+    collector.configure(capacity=2)
+    assert len(collector.query()) == 2
+    assert collector.clear() == 2 and collector.query() == []
+
+
+class DeletedArray:
+    def __array__(self, dtype=None):
+        raise RuntimeError('Array has been deleted')
+
+
+def test_unconvertible_values_are_dropped():
+    collector = DiagnosticsCollector(enabled=True)
+    collector.record('bad', {'value': DeletedArray()})
+    collector.flush()
+    assert collector.query() == []
+
+
+@pytest.fixture
+def diagnostics(api, client):
+    assert client.post('/diagnostics/config', json={'enabled': True, 'sample_every': 2}).status_code == 200
+    client.post('/diagnostics/clear')
+    yield api.diagnostics
+    client.post('/diagnostics/config', json={'enabled': False, 'sample_every': api.config.DIAGNOSTICS_SAMPLE_EVERY})
+    client.post('/diagnostics/clear')
+
+
+def test_training_steps_are_sampled(api, client, model_id, diagnostics):
+    state = api.model_registry.get(model_id)
+    rng = np.random.default_rng(0)
+    for _ in range(3):
+        response = client.post('/train_step', json={
+            'model_id': model_id, 'weights': np.asarray(state['weights']).tolist(),
+            'biases': np.asarray(state['biases']).tolist(), 'batch_features': rng.random((4, 784)).tolist(),
+            'batch_labels': [0, 1, 2, 3], 'similarity_metric': 'dotProduct', 'activation_function': 'softmax',
+            'learning_rate': 0.05
+        })
+        assert response.status_code == 200, response.get_json()
+    diagnostics.flush()
+
+    result = client.get('/diagnostics', query_string={'kind': 'train_step'}).get_json()
+    assert result['config']['events_seen']['train_step'] == 3
+    assert len(result['records']) == 2
+    assert {record['model_id'] for record in result['records']} == {model_id}
+    assert set(result['records'][0]['values']) == {'loss', 'weight_gradient_norm', 'bias_gradient_norm',
+                                                   'weight_norm', 'learning_rate'}
+    assert client.get('/diagnostics', query_string={'since': 'x'}).status_code == 400
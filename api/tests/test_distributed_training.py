@@ -0,0 +1,63 @@
+"""A two-worker distributed run on localhost against the same step taken in a single process"""
+import time
+
+import numpy as np
+import pytest
+
+import distributed_worker
+
+
+def wait_for(manager, run_id, timeout=120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        run = manager.status(run_id)
+        if run['state'] in ('completed', 'failed'):
+            return run
+        time.sleep(0.2)
+    manager.stop(run_id)
+    raise AssertionError(f"Run {run_id} did not finish within {timeout:g}s: {manager.status(run_id)}")
+
+
+def test_two_workers_match_a_single_process_step(api, tmp_path):
+    from distributed_training import DistributedTrainingManager
+    import jax.numpy as jnp
+
+    rng = np.random.default_rng(0)
+    weights = rng.normal(0.0, 0.1, (10, 16))
+    biases = np.zeros(10)
+    features = rng.random((8, 16))
+    labels = rng.integers(0, 10, 8)
+
+    state = api.new_model_state()
+    state['weights'], state['biases'] = jnp.asarray(weights), jnp.asarray(biases)
+    state['optimizer_config'] = {'optimizer_type': 'sgd', 'learning_rate': 0.1, 'momentum': 0.9}
+    state['optimizer'] = api.build_optimizer(state['optimizer_config'])
+    state['opt_state'] = state['optimizer'].init((state['weights'], state['biases']))
+
+    # One step per worker: each trains on a full batch of its 4-sample shard
+    manager = DistributedTrainingManager(str(tmp_path / 'runs'), timeout=60.0)
+    run = manager.create('default', api.export_model_state(state), features, labels, 2, {
+        'similarity_metric': 'dotProduct', 'epochs': 1, 'batch_size': 4, 'seed': 0
+    })
+    run = wait_for(manager, run['run_id'])
+    assert run['state'] == 'completed', [(tmp_path / 'runs' / run['run_id'] / f"worker-{i}.log").read_text()
+                                         for i in range(2)]
+    assert run['total_steps'] == 1
+    result = manager.result(run['run_id'])['arrays']
+
+    # The same step on the whole batch in this process
+    params = (jnp.asarray(weights), jnp.asarray(biases))
+    train_step = api.calculator.optax_train_step(state['optimizer'], 'test-sgd')
+    expected = train_step(params, state['optimizer'].init(params), jnp.asarray(features), jnp.asarray(labels),
+                          similarity_metric='dotProduct')
+
+    np.testing.assert_allclose(result['shadow_weights'], np.asarray(expected['shadow_weights']), rtol=1e-10)
+    np.testing.assert_allclose(result['biases'], np.asarray(expected['biases']), rtol=1e-10, atol=1e-12)
+    np.testing.assert_array_equal(result['weights'], np.asarray(expected['weights']))
+    assert run['loss'] == pytest.approx(float(expected['loss']), rel=1e-10)
+
+
+def test_coordination_client_requires_initialize():
+    pytest.importorskip('jax')
+    with pytest.raises(RuntimeError, match='initialize'):
+        distributed_worker.coordination_client()
@@ -0,0 +1,19 @@
+"""Train steps update parameters in place: responses must not keep the donated buffers alive"""
+import numpy as np
+import pytest
+
+
+@pytest.mark.parametrize('optimizer', ['sgd', 'adam'])
+def test_optax_steps_donate_the_previous_parameters(api, client, model_id, optimizer):
+    assert client.post('/optimizer/init', json={'model_id': model_id, 'optimizer_type': optimizer}).status_code == 200
+    rng = np.random.default_rng(0)
+    batch = {'model_id': model_id, 'batch_features': rng.random((8, 784)).tolist(),
+             'batch_labels': rng.integers(0, 10, 8).tolist(), 'similarity_metric': 'dotProduct'}
+
+    state = api.model_registry.get(model_id)
+    for _ in range(3):
+        weights, biases = state['weights'], state['biases']
+        response = client.post('/train_step_optax', json=batch)
+        assert response.status_code == 200, response.get_json()
+        assert np.shape(response.get_json()['result']['new_weights']) == (10, 784)
+        assert weights.is_deleted() and biases.is_deleted()
@@ -0,0 +1,118 @@
+"""DownloadManager against a local HTTP server: Range resume, mirror fallback and verification"""
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import downloads
+from downloads import DownloadError, DownloadManager
+
+PAYLOAD = bytes(range(256)) * 64
+GOOD = {'size': len(PAYLOAD), 'sha256': hashlib.sha256(PAYLOAD).hexdigest()}
+
+
+class FileServer(ThreadingHTTPServer):
+    """Serves ``files`` (path -> bytes), honouring single ``bytes=N-`` Range requests"""
+
+    def __init__(self, files):
+        super().__init__(('127.0.0.1', 0), FileHandler)
+        self.files = files
+        self.requests = []
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server_address[1]}{path}"
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.server.requests.append((self.path, self.headers.get('Range')))
+        body = self.server.files.get(self.path)
+        if body is None:
+            self.send_error(404)
+            return
+        range_header = self.headers.get('Range')
+        if range_header:
+            offset = int(range_header[len('bytes='):].rstrip('-'))
+            if offset >= len(body):
+                self.send_error(416)
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {offset}-{len(body) - 1}/{len(body)}")
+            body = body[offset:]
+        else:
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = FileServer({'/good.bin': PAYLOAD, '/corrupt.bin': b'\0' * len(PAYLOAD)})
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(downloads.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def test_resumes_partial_file_with_range_request(server, tmp_path):
+    target = tmp_path / 'data.bin'
+    (tmp_path / 'data.bin.part').write_bytes(PAYLOAD[:1000])
+
+    DownloadManager().fetch([server.url('/good.bin')], target, GOOD)
+
+    assert target.read_bytes() == PAYLOAD
+    assert not (tmp_path / 'data.bin.part').exists()
+    assert server.requests == [('/good.bin', 'bytes=1000-')]
+
+
+def test_checksum_mismatch_falls_through_to_next_mirror(server, tmp_path, no_sleep):
+    target = tmp_path / 'data.bin'
+
+    DownloadManager().fetch([server.url('/corrupt.bin'), server.url('/good.bin')], target, GOOD)
+
+    assert target.read_bytes() == PAYLOAD
+    # The corrupt mirror is not retried, and the good one starts from scratch rather than resuming
+    assert server.requests == [('/corrupt.bin', None), ('/good.bin', None)]
+    assert no_sleep == []
+
+
+def test_size_mismatch_fails_verification(server, tmp_path, no_sleep):
+    target = tmp_path / 'data.bin'
+
+    with pytest.raises(DownloadError, match='checksum verification failed'):
+        DownloadManager().fetch([server.url('/good.bin')], target, {'size': len(PAYLOAD) + 1})
+
+    assert not target.exists()
+    assert not (tmp_path / 'data.bin.part').exists()
+
+
+def test_verify_checks_size_and_checksum(tmp_path):
+    target = tmp_path / 'data.bin'
+    target.write_bytes(PAYLOAD)
+
+    assert DownloadManager().verify(target, GOOD)
+    assert not DownloadManager().verify(target, dict(GOOD, size=len(PAYLOAD) - 1))
+    assert not DownloadManager().verify(target, dict(GOOD, sha256='0' * 64))
+
+
+def test_no_sleep_after_last_attempt(server, tmp_path, no_sleep):
+    with pytest.raises(DownloadError):
+        DownloadManager(retries=3).fetch([server.url('/missing.bin'), server.url('/missing.bin')],
+                                         tmp_path / 'data.bin')
+
+    assert len(server.requests) == 6
+    # Backoff between attempts at a mirror only
+    assert no_sleep == [0.5, 1.0, 0.5, 1.0]
@@ -0,0 +1,68 @@
+"""Server-side evaluation of a cached split in fixed-size chunks"""
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def dataset(api, idx_loader, monkeypatch):
+    monkeypatch.setattr(api, 'dataset_loader', idx_loader)
+    return idx_loader.get_dataset('mnist_original', 'test')
+
+
+def expected_predictions(api, model_id, features):
+    weights = np.asarray(api.model_registry.get(model_id)['weights'])
+    return np.argmax(np.asarray(features) @ weights.T, axis=1)
+
+
+def evaluate(client, model_id, **options):
+    response = client.post('/evaluate', json=dict({'model_id': model_id, 'dataset_name': 'mnist_original'}, **options))
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['result']
+
+
+@pytest.mark.parametrize('chunk_size', [7, 50, 64])
+def test_chunked_evaluation_matches_a_single_pass(api, client, model_id, dataset, chunk_size):
+    predictions = expected_predictions(api, model_id, dataset['features'])
+    labels = np.asarray(dataset['labels']).astype(np.int64)
+    confusion = np.zeros((10, 10), dtype=np.int64)
+    np.add.at(confusion, (labels, predictions), 1)
+
+    result = evaluate(client, model_id, chunk_size=chunk_size)
+    assert result['num_samples'] == 50
+    assert result['accuracy'] == pytest.approx(np.mean(predictions == labels))
+    assert result['confusion_matrix'] == confusion.tolist()
+    assert [entry['support'] for entry in result['per_class']] == np.bincount(labels, minlength=10).tolist()
+
+
+def test_results_are_cached_per_model_version(api, client, model_id, dataset):
+    first = evaluate(client, model_id)
+    assert not first['cached']
+    assert evaluate(client, model_id)['cached']
+
+    # New weights invalidate the cached result
+    client.post('/model/initialize_ternary', json={'model_id': model_id})
+    fresh = evaluate(client, model_id)
+    assert not fresh['cached']
+    assert fresh['model_version'] == first['model_version'] + 1
+    assert list(api.model_registry.get(model_id)['evaluation_cache']) == [
+        (fresh['model_version'], 'mnist_original', 'test', 'dotProduct', 'softmax', None)
+    ]
+
+
+def test_partial_evaluation_leaves_the_model_accuracy_alone(api, client, model_id, dataset):
+    full = evaluate(client, model_id)
+    assert api.model_registry.get(model_id)['last_test_accuracy'] == full['accuracy']
+
+    partial = evaluate(client, model_id, max_samples=10)
+    assert partial['num_samples'] == 10
+    predictions = expected_predictions(api, model_id, dataset['features'][:10])
+    assert partial['accuracy'] == pytest.approx(np.mean(predictions == np.asarray(dataset['labels'][:10])))
+    assert api.model_registry.get(model_id)['last_test_accuracy'] == full['accuracy']
+
+
+def test_unlabeled_split_is_rejected(api, client, model_id, idx_loader, monkeypatch):
+    monkeypatch.setattr(api, 'dataset_loader', idx_loader)
+    monkeypatch.setattr(idx_loader, 'get_dataset', lambda *args: {'features': np.zeros((1, 784)), 'labels': None})
+    response = client.post('/evaluate', json={'model_id': model_id, 'dataset_name': 'mnist_original'})
+    assert response.status_code == 400
+    assert 'no labels' in response.get_json()['error']
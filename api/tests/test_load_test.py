@@ -0,0 +1,49 @@
+"""The load-test harness: latency summaries and a short run against a local gunicorn server"""
+import json
+import threading
+
+import pytest
+
+import load_test
+
+
+def test_summary_covers_requests_started_in_the_window():
+    recorder = load_test.LatencyRecorder()
+    for i in range(100):
+        recorder.add('POST /forward', 10.0 + i * 0.1, (i + 1) / 1000, ok=i % 10 != 0)
+    recorder.add('GET /model/weights', 5.0, 0.5, ok=True)
+    recorder.add('GET /model/weights', 25.0, 0.5, ok=True)
+
+    summary = recorder.summary(10.0, 20.0)
+    assert list(summary) == ['POST /forward']
+    forward = summary['POST /forward']
+    assert forward['requests'] == 100 and forward['errors'] == 10
+    assert forward['throughput_rps'] == pytest.approx(10.0)
+    assert forward['p50_ms'] == pytest.approx(50.5)
+    assert forward['p99_ms'] == pytest.approx(99.01)
+    assert forward['max_ms'] == pytest.approx(100.0)
+
+
+def test_failed_calls_are_recorded_as_errors():
+    recorder = load_test.LatencyRecorder()
+    user = load_test.Poller('poller', f'http://127.0.0.1:{load_test._free_port()}', recorder=recorder,
+                            stop=threading.Event(), seed=0, model_id='m', interval=1.0)
+    user.step()
+    assert [(route, ok) for route, _, _, ok in recorder.samples] == [
+        ('GET /model/weights', False), ('GET /training/metrics', False)
+    ]
+
+
+def test_short_run_against_a_local_server(api, tmp_path):
+    output = tmp_path / 'report.json'
+    status = load_test.main(['--start-server', '--threads', '4', '--server-env', 'JAX_WARMUP=0',
+                             '--duration', '2', '--warmup', '0.5', '--trainers', '1', '--synthetic-batches',
+                             '--batch-size', '4', '--canvas-users', '1', '--burst-gap', '0.01',
+                             '--pollers', '1', '--poll-interval', '0.2', '--output', str(output)])
+    assert status == 0
+    report = json.loads(output.read_text())
+    assert set(report['routes']) == {'POST /train_step_optax', 'POST /forward', 'GET /model/weights',
+                                     'GET /training/metrics'}
+    assert report['total']['errors'] == 0
+    assert report['total']['requests'] == sum(route['requests'] for route in report['routes'].values())
+    assert report['server'] == {'workers': 1, 'threads': 4, 'env': {'JAX_WARMUP': '0'}}
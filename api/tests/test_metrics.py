@@ -0,0 +1,113 @@
+"""Prometheus exposition, the steps-per-second window and compilation attribution"""
+import re
+
+import pytest
+
+from metrics import CompileTracker, EventRate, MetricsRegistry
+
+
+def test_exposition_format():
+    registry = MetricsRegistry()
+    requests = registry.counter('requests_total', 'Requests', ['route'])
+    requests.inc(route='/a')
+    requests.inc(2.5, route='/b "quoted"\n')
+    registry.gauge('ratio', 'A callback', function=lambda: 0.25)
+    registry.gauge('per_kind', 'Labelled callback', ['kind'], function=lambda: {('x',): 3})
+
+    assert registry.render().splitlines() == [
+        '# HELP requests_total Requests',
+        '# TYPE requests_total counter',
+        'requests_total{route="/a"} 1',
+        'requests_total{route="/b \\"quoted\\"\\n"} 2.5',
+        '# HELP ratio A callback',
+        '# TYPE ratio gauge',
+        'ratio 0.25',
+        '# HELP per_kind Labelled callback',
+        '# TYPE per_kind gauge',
+        'per_kind{kind="x"} 3'
+    ]
+    assert requests.value(route='/a') == 1.0
+
+
+def test_labels_and_names_are_checked():
+    registry = MetricsRegistry()
+    counter = registry.counter('c', 'Counter', ['kind'])
+    with pytest.raises(ValueError):
+        counter.inc(other='x')
+    with pytest.raises(ValueError):
+        registry.gauge('c', 'Duplicate')
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    latency = registry.histogram('latency_seconds', 'Latency', ['route'], buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, route='/a')
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 2',
+        'latency_seconds_bucket{route="/a",le="1"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 3.65',
+        'latency_seconds_count{route="/a"} 4'
+    ]
+
+
+def test_event_rate_averages_over_the_window(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('metrics.time.monotonic', lambda: clock[0])
+    rate = EventRate(window=10.0)
+    clock[0] += 2.0
+    rate.mark(4)
+    # Two seconds since startup
+    assert rate.rate() == pytest.approx(2.0)
+    clock[0] += 20.0
+    rate.mark(5)
+    assert rate.rate() == pytest.approx(0.5)
+
+
+def test_compile_phases_are_charged_to_the_running_kernel():
+    tracker = CompileTracker(MetricsRegistry())
+
+    def compile_step():
+        tracker._on_duration('/jax/core/compile/jaxpr_trace_duration', 0.5)
+        tracker._on_duration('/jax/core/compile/backend_compile_duration', 2.0)
+        tracker._on_duration('/jax/some/other_duration', 9.0)
+
+    tracker.track('step', compile_step)()
+    compile_step()
+    tracker._on_event('/jax/compilation_cache/cache_hits')
+
+    assert tracker.compilations.value(kernel='step') == 1.0
+    assert tracker.compilations.value(kernel='other') == 1.0
+    assert tracker.compile_seconds.value(kernel='step', phase='trace') == 0.5
+    assert tracker.compile_seconds.value(kernel='step', phase='backend_compile') == 2.0
+    assert tracker.cache_hits.value() == 1.0
+
+
+def test_tracked_jit_compiles_once(api):
+    import jax
+    import jax.numpy as jnp
+
+    kernel = api.compile_tracker.track('test_tracked_jit', jax.jit(lambda x: jnp.sin(x) * 3))
+    for _ in range(3):
+        kernel(jnp.ones(5))
+    assert api.compile_tracker.compilations.value(kernel='test_tracked_jit') == 1.0
+    kernel(jnp.ones(6))
+    assert api.compile_tracker.compilations.value(kernel='test_tracked_jit') == 2.0
+
+
+def test_metrics_endpoint_counts_requests(client):
+    client.get('/models')
+    client.get('/models/missing/checkpoints')
+    body = client.get('/metrics').get_data(as_text=True)
+
+    def value(pattern):
+        match = re.search('^' + re.escape(pattern) + r' (\S+)$', body, re.M)
+        assert match, pattern
+        return float(match.group(1))
+
+    assert value('http_requests_total{route="/models",method="GET",status="200"}') >= 1
+    assert value('http_request_duration_seconds_count{route="/models",method="GET"}') >= 1
+    assert value('http_request_errors_total{route="unmatched",method="GET",status="404"}') >= 1
+    assert '# TYPE jax_compilations_total counter' in body
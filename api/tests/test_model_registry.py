@@ -0,0 +1,104 @@
+"""Per-model state: creation, cloning, deletion, limits and idle eviction"""
+import threading
+
+import numpy as np
+import pytest
+
+from model_registry import DEFAULT_MODEL_ID, ModelRegistry
+
+
+def new_state():
+    return {'weights': None, 'biases': None, 'opt_state': None, 'optimizer': None, 'current_epoch': 0,
+            'model_version': 0, 'use_ternary_weights': False, 'training_history': [], 'evaluation_cache': {}}
+
+
+def test_create_get_and_delete():
+    registry = ModelRegistry(new_state)
+    state = registry.create('a', use_ternary_weights=True)
+    assert registry.get('a') is state and state['use_ternary_weights']
+    assert registry.get_or_create('a') is state
+    assert len(registry.create()['model_id']) == 12
+    with pytest.raises(ValueError):
+        registry.create('a')
+
+    registry.delete('a')
+    with pytest.raises(KeyError):
+        registry.get('a')
+    with pytest.raises(KeyError):
+        registry.delete('a')
+    with pytest.raises(ValueError):
+        registry.delete(DEFAULT_MODEL_ID)
+    registry.discard(DEFAULT_MODEL_ID)
+    assert registry.get(DEFAULT_MODEL_ID)['model_id'] == DEFAULT_MODEL_ID
+
+
+def test_model_limit_counts_the_default_model():
+    registry = ModelRegistry(new_state, max_models=2)
+    registry.create('a')
+    with pytest.raises(RuntimeError, match='limit'):
+        registry.create('b')
+
+
+def test_clone_copies_parameters_and_containers():
+    registry = ModelRegistry(new_state)
+    source = registry.create('a')
+    source['weights'] = np.ones((2, 3))
+    source['training_history'].append({'epoch': 1})
+    source['current_epoch'] = 1
+
+    clone = registry.clone('a', 'b')
+    assert clone['model_id'] == 'b' and clone['current_epoch'] == 1
+    assert clone['lock'] is not source['lock']
+    clone['weights'][0, 0] = 5.0
+    clone['training_history'].append({'epoch': 2})
+    assert source['weights'][0, 0] == 1.0
+    assert source['training_history'] == [{'epoch': 1}]
+
+
+def idle(registry, *model_ids):
+    for model_id in model_ids:
+        registry._models[model_id]['last_used'] -= registry.idle_ttl + 1
+
+
+def test_idle_models_without_weights_are_evicted():
+    registry = ModelRegistry(new_state, idle_ttl=10.0)
+    registry.create('empty')
+    registry.create('trained')['weights'] = np.ones((2, 3))
+    registry.create('recent')
+    idle(registry, DEFAULT_MODEL_ID, 'empty', 'trained')
+
+    # Trained weights exist only in this process by default, so they are kept
+    assert registry.evict_idle() == ['empty']
+    assert [state['model_id'] for state in registry.list()] == [DEFAULT_MODEL_ID, 'trained', 'recent']
+
+
+def test_evictable_decides_which_idle_models_go():
+    registry = ModelRegistry(new_state, idle_ttl=10.0, evictable=lambda state: True)
+    registry.create('trained')['weights'] = np.ones((2, 3))
+    busy = registry.create('busy')
+    idle(registry, 'trained', 'busy')
+
+    # A request in another thread holds the model's lock
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with busy['lock']:
+            held.set()
+            release.wait()
+
+    request = threading.Thread(target=hold)
+    request.start()
+    held.wait()
+    try:
+        assert registry.evict_idle() == ['trained']
+    finally:
+        release.set()
+        request.join()
+    assert registry.evict_idle() == ['busy']
+
+
+def test_app_keeps_idle_trained_models_without_a_shared_backend(api, client, model_id, monkeypatch):
+    idle(api.model_registry, model_id)
+    assert model_id not in api.model_registry.evict_idle()
+    monkeypatch.setattr(api.state_backend, 'shared', True)
+    assert model_id in api.model_registry.evict_idle()
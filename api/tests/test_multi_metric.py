@@ -0,0 +1,48 @@
+"""Several similarity metrics from shared statistics against each metric computed on its own"""
+import numpy as np
+import pytest
+
+METRICS = ('dotProduct', 'euclidean', 'cosine', 'manhattan', 'rbf', 'yatProduct')
+
+
+@pytest.fixture
+def batch():
+    import jax.numpy as jnp
+
+    rng = np.random.default_rng(0)
+    return (jnp.asarray(rng.normal(0.0, 0.3, (10, 12))), jnp.zeros(10), jnp.asarray(rng.random((6, 12))),
+            jnp.asarray(rng.integers(0, 10, 6), dtype=jnp.int32))
+
+
+@pytest.mark.parametrize('max_grad_norm', [np.inf, 1.0])
+def test_gradients_match_each_metric_differentiated_alone(api, batch, max_grad_norm):
+    import jax
+
+    calc = api.calculator
+    weights, biases, features, labels = batch
+    result = calc._multi_metric_diagnostics(weights, biases, features, labels, METRICS, 'softmax',
+                                            max_grad_norm=max_grad_norm)
+    for i, metric in enumerate(METRICS):
+        loss, gradients = jax.value_and_grad(calc.compute_loss)(weights, biases, features, labels, metric, 'softmax')
+        gradients = np.asarray(gradients)
+        norm = np.linalg.norm(gradients)
+        assert norm > 0, metric
+        if norm > max_grad_norm:
+            gradients = gradients * (max_grad_norm / norm)
+
+        assert float(result['loss'][i]) == pytest.approx(float(loss), rel=1e-9), metric
+        assert float(result['weight_gradient_norm'][i]) == pytest.approx(np.linalg.norm(gradients), rel=1e-6), metric
+        assert float(result['weight_gradient_max'][i]) == pytest.approx(np.abs(gradients).max(), rel=1e-6), metric
+        assert float(result['weight_gradient_mean'][i]) == pytest.approx(np.abs(gradients).mean(), rel=1e-6), metric
+
+
+def test_scores_match_each_metric_computed_alone(api, batch):
+    import jax
+
+    calc = api.calculator
+    weights, _, features, _ = batch
+    scores, _ = calc.multi_metric_scores(weights, features, METRICS)
+    for metric in METRICS:
+        expected = jax.vmap(lambda x: calc.similarity_functions[metric](weights, x))(features)
+        np.testing.assert_allclose(np.asarray(scores[metric]), np.asarray(expected), rtol=1e-9, atol=1e-12,
+                                   err_msg=metric)
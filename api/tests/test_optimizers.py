@@ -0,0 +1,79 @@
+"""Optimizers built from configs: learning rate schedules and gradient accumulation"""
+import numpy as np
+import pytest
+
+
+def config(**overrides):
+    return dict({'optimizer_type': 'sgd', 'learning_rate': 0.1}, **overrides)
+
+
+def test_constant_schedule_is_a_plain_learning_rate(api):
+    assert api.build_lr_schedule(config()) == 0.1
+
+
+@pytest.mark.parametrize('overrides, expected', [
+    ({'warmup_steps': 4}, {0: 0.0, 2: 0.05, 4: 0.1, 100: 0.1}),
+    ({'lr_schedule': 'cosine', 'decay_steps': 10, 'end_learning_rate': 0.01}, {0: 0.1, 5: 0.055, 10: 0.01, 50: 0.01}),
+    ({'lr_schedule': 'cosine', 'decay_steps': 10, 'warmup_steps': 5}, {0: 0.0, 5: 0.1, 10: 0.05, 15: 0.0}),
+    ({'lr_schedule': 'step', 'step_size': 3, 'decay_rate': 0.5}, {0: 0.1, 2: 0.1, 3: 0.05, 7: 0.025}),
+])
+def test_schedules(api, overrides, expected):
+    schedule = api.build_lr_schedule(config(**overrides))
+    assert {step: float(schedule(step)) for step in expected} == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('overrides', [{'lr_schedule': 'linear'}, {'optimizer_type': 'rmsprop'}])
+def test_unknown_settings_are_rejected(api, overrides):
+    with pytest.raises(ValueError, match='Unknown'):
+        api.build_optimizer(config(**overrides))
+
+
+def test_injected_learning_rate_follows_the_schedule(api):
+    import jax.numpy as jnp
+
+    optimizer = api.build_optimizer(config(optimizer_type='adam', warmup_steps=2))
+    params = jnp.zeros(3)
+    opt_state = optimizer.init(params)
+    rates = []
+    for _ in range(3):
+        _, opt_state = optimizer.update(jnp.ones(3), opt_state, params)
+        rates.append(api.optimizer_progress(opt_state)['learning_rate'])
+    assert rates == pytest.approx([0.0, 0.05, 0.1])
+
+
+def test_accumulation_applies_the_mean_gradient_every_k_steps(api):
+    import jax.numpy as jnp
+    import optax
+
+    optimizer = api.build_optimizer(config(accumulation_steps=3))
+    params = jnp.zeros(2)
+    opt_state = optimizer.init(params)
+    gradients = [jnp.array([1.0, 2.0]), jnp.array([3.0, 0.0]), jnp.array([2.0, 1.0])] * 2
+    for i, gradient in enumerate(gradients):
+        updates, opt_state = optimizer.update(gradient, opt_state, params)
+        params = optax.apply_updates(params, updates)
+        progress = api.optimizer_progress(opt_state)
+        assert progress['accumulation_step'] == (i + 1) % 3
+        assert progress['optimizer_steps'] == (i + 1) // 3
+        if i == 1:
+            np.testing.assert_array_equal(np.asarray(params), 0.0)
+    np.testing.assert_allclose(np.asarray(params), [-0.4, -0.2])
+
+
+def test_structure_key_ignores_injected_hyperparameters(api):
+    key = api.optimizer_structure_key
+    assert key(config(momentum=0.9)) == key(config(learning_rate=0.5, momentum=0.8)) != key(config())
+    assert key(config(lr_schedule='cosine')) != key(config(lr_schedule='cosine', learning_rate=0.5))
+
+
+def test_train_steps_report_accumulation(client, model_id):
+    init = client.post('/optimizer/init', json={'model_id': model_id, 'accumulation_steps': 2})
+    assert init.status_code == 200, init.get_json()
+    rng = np.random.default_rng(0)
+    batch = {'model_id': model_id, 'batch_features': rng.random((4, 784)).tolist(),
+             'batch_labels': [0, 1, 2, 3], 'similarity_metric': 'dotProduct'}
+    results = [client.post('/train_step_optax', json=batch).get_json()['result'] for _ in range(4)]
+    assert [(result['applied'], result['accumulation_step']) for result in results] == [
+        (False, 1), (True, 0), (False, 1), (True, 0)
+    ]
+    assert client.post('/optimizer/init', json={'model_id': model_id, 'accumulation_steps': 0}).status_code == 400
@@ -0,0 +1,110 @@
+"""Profiling sessions: limits, route filters, artifacts and requests that raise"""
+import sys
+import time
+
+import pytest
+
+from profiling import ProfilerManager
+
+
+@pytest.fixture
+def profiler(tmp_path):
+    manager = ProfilerManager(str(tmp_path), max_seconds=5.0)
+    yield manager
+    manager.stop()
+
+
+def profile_request(profiler, route):
+    request_profile = profiler.begin_request(route)
+    sum(range(1000))
+    profiler.end_request(request_profile, route)
+    return request_profile
+
+
+@pytest.mark.parametrize('options', [{}, {'requests': 0}, {'seconds': 10.0}, {'seconds': 0.0},
+                                     {'requests': 1, 'jax_trace': False, 'python_profile': False}])
+def test_invalid_sessions_are_rejected(profiler, options):
+    with pytest.raises(ValueError):
+        profiler.start(**options)
+
+
+def test_session_stops_after_its_requests(profiler):
+    session = profiler.start(requests=2, jax_trace=False, routes=['/a'])
+    with pytest.raises(ValueError, match='already running'):
+        profiler.start(requests=1)
+
+    assert profile_request(profiler, '/b') is None
+    assert profile_request(profiler, '/profiler/status') is None
+    profile_request(profiler, '/a')
+    assert profiler.status()['requests_profiled'] == 1
+    profile_request(profiler, '/a')
+    assert profiler.status() is None
+    assert profiler.begin_request('/a') is None
+
+    stopped = profiler.get(session['session_id'])
+    assert stopped['state'] == 'completed' and stopped['stop_reason'] == 'requests'
+    assert stopped['route_counts'] == {'/a': 2}
+    assert {artifact['path'] for artifact in stopped['artifacts']} == {'python.pstats', 'python.txt'}
+    assert stopped['top_functions'] and stopped['top_functions'][0]['cumulative_seconds'] >= 0
+    assert profiler.artifact_path(session['session_id'], 'python.txt').read_text()
+    with pytest.raises(KeyError):
+        profiler.artifact_path(session['session_id'], '../meta.json')
+
+
+def test_session_stops_after_its_duration(profiler):
+    session = profiler.start(seconds=0.2, jax_trace=False)
+    with pytest.raises(ValueError, match='still running'):
+        profiler.delete(session['session_id'])
+    deadline = time.time() + 5.0
+    while profiler.status() is not None and time.time() < deadline:
+        time.sleep(0.05)
+    assert profiler.get(session['session_id'])['stop_reason'] == 'duration'
+
+    profiler.delete(session['session_id'])
+    assert profiler.list() == []
+    with pytest.raises(KeyError):
+        profiler.get(session['session_id'])
+
+
+def test_jax_trace_is_written(profiler):
+    import jax.numpy as jnp
+
+    session = profiler.start(requests=1, python_profile=False)
+    jnp.sum(jnp.ones(10)).block_until_ready()
+    stopped = profiler.stop()
+    assert stopped['session_id'] == session['session_id'] and stopped['stop_reason'] == 'stopped'
+    assert 'jax_trace_error' not in stopped
+    assert any(artifact['path'].startswith('jax/') for artifact in stopped['artifacts'])
+    assert profiler.stop() is None
+
+
+def test_profiling_through_the_api(api, client):
+    started = client.post('/profiler/start', json={'requests': 2, 'jax_trace': False, 'routes': ['/models']})
+    assert started.status_code == 200, started.get_json()
+    session_id = started.get_json()['session']['session_id']
+    assert client.post('/profiler/start', json={'requests': 1}).status_code == 400
+
+    client.get('/models')
+    client.get('/health')
+    client.get('/models')
+    assert client.get('/profiler/status').get_json()['running'] is None
+
+    session = client.get(f'/profiler/sessions/{session_id}').get_json()['session']
+    assert session['route_counts'] == {'/models': 2}
+    artifact = client.get(f'/profiler/sessions/{session_id}/artifacts/python.txt')
+    assert artifact.status_code == 200 and b'cumulative' in artifact.data
+    assert client.get(f'/profiler/sessions/{session_id}/artifacts/missing').status_code == 404
+
+
+def test_profiling_stops_when_the_handler_raises(api):
+    session = api.profiler.start(requests=1, jax_trace=False, routes=['/models'])
+    try:
+        with api.app.test_request_context('/models'):
+            api.app.preprocess_request()
+            assert sys.getprofile() is not None
+            # As if the handler raised: after_request hooks are skipped, teardown hooks still run
+            api.app.do_teardown_request(RuntimeError('handler failed'))
+        assert sys.getprofile() is None
+        assert api.profiler.get(session['session_id'])['stop_reason'] == 'requests'
+    finally:
+        api.profiler.stop()
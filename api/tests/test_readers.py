@@ -0,0 +1,142 @@
+"""Incremental IDX and CSV readers, and resumed partial loads"""
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import write_idx
+from readers import CSVDatasetSource, IDXDatasetSource, IDXReader, count_csv_rows
+
+rng = np.random.default_rng(0)
+IMAGES = rng.integers(0, 256, (30, 28, 28), dtype=np.uint8)
+LABELS = rng.integers(0, 10, 30, dtype=np.uint8)
+
+
+@pytest.mark.parametrize('name', ['images-idx3-ubyte', 'images-idx3-ubyte.gz'])
+def test_idx_reader_reads_in_steps(tmp_path, name):
+    reader = IDXReader(write_idx(tmp_path / name, IMAGES))
+    assert (reader.num_items, reader.item_shape) == (30, (28, 28))
+
+    np.testing.assert_array_equal(reader.read(10), IMAGES[:10])
+    np.testing.assert_array_equal(reader.read(5), IMAGES[10:15])
+    assert not reader.exhausted
+    np.testing.assert_array_equal(reader.read(), IMAGES[15:])
+    # Exhausted readers close their file
+    assert reader.exhausted and reader._file.closed
+    assert reader.read(5).shape == (0, 28, 28)
+
+
+def test_idx_reader_rejects_other_types(tmp_path):
+    path = tmp_path / 'floats-idx1'
+    path.write_bytes(bytes([0, 0, 0x0d, 1]) + (1).to_bytes(4, 'big') + b'\0' * 4)
+    with pytest.raises(ValueError, match='Unsupported IDX type'):
+        IDXReader(path)
+
+
+def test_idx_source_reads_images_and_labels_in_lockstep(tmp_path):
+    source = IDXDatasetSource(str(write_idx(tmp_path / 'i.gz', IMAGES)), str(write_idx(tmp_path / 'l.gz', LABELS)))
+    images, labels = source.read(7)
+    np.testing.assert_array_equal(labels, LABELS[:7])
+    assert images.shape == (7, 28, 28)
+    source.close()
+
+    with pytest.raises(ValueError, match='count mismatch'):
+        IDXDatasetSource(str(tmp_path / 'i.gz'), str(write_idx(tmp_path / 'l2.gz', LABELS[:5])))
+
+
+def test_partial_loads_resume_and_complete(idx_loader):
+    cache = idx_loader.loaded_datasets
+    first = idx_loader.load_dataset('mnist_original', 'train', max_samples=10)
+    assert len(first['labels']) == 10
+    state = cache.peek('mnist_original_train:partial')
+    source = state['source']
+    assert source.images.num_read == 10
+
+    more = idx_loader.load_dataset('mnist_original', 'train', max_samples=25)
+    assert state['source'] is source and source.images.num_read == 25
+    np.testing.assert_array_equal(more['labels'], idx_loader.test_labels[:25])
+
+    full = idx_loader.load_dataset('mnist_original', 'train')
+    np.testing.assert_array_equal(full['labels'], idx_loader.test_labels)
+    # The completed split replaces its partial state, whose source is closed
+    assert cache.peek('mnist_original_train:partial') is None and cache.peek('mnist_original_train') is full
+    assert source.images._file.closed
+
+
+def test_evicted_partial_load_closes_its_source_and_starts_over(idx_loader):
+    cache = idx_loader.loaded_datasets
+    idx_loader.load_dataset('mnist_original', 'train', max_samples=10)
+    state = cache.peek('mnist_original_train:partial')
+    source = state['source']
+
+    cache.pop('mnist_original_train:partial')
+    assert state['evicted'] and source.images._file.closed
+
+    again = idx_loader.load_dataset('mnist_original', 'train', max_samples=12)
+    np.testing.assert_array_equal(again['labels'], idx_loader.test_labels[:12])
+    assert cache.peek('mnist_original_train:partial')['source'] is not source
+
+
+def test_idx_helpers_close_their_file(idx_loader, tmp_path, monkeypatch):
+    opened = []
+    original = IDXReader.__init__
+
+    def tracking_init(self, filepath):
+        original(self, filepath)
+        opened.append(self)
+
+    monkeypatch.setattr(IDXReader, '__init__', tracking_init)
+    path = str(write_idx(tmp_path / 'x.gz', IMAGES))
+    assert idx_loader.load_idx_images(path, 3).shape == (3, 28, 28)
+    assert len(opened) == 1 and opened[0]._file.closed
+
+
+def write_csv(path, images, labels=None, trailing_newline=True):
+    pixels = images.reshape(len(images), -1)
+    header = ([] if labels is None else ['label']) + [f"pixel{i}" for i in range(pixels.shape[1])]
+    rows = [','.join(map(str, ([] if labels is None else [labels[i]]) + list(pixels[i]))) for i in range(len(pixels))]
+    path.write_text('\n'.join([','.join(header)] + rows) + ('\n' if trailing_newline else ''))
+    return path
+
+
+@pytest.fixture(params=['pyarrow', 'pandas'])
+def csv_parser(request, monkeypatch):
+    """Run with pyarrow's reader, and with pandas' when pyarrow is not installed"""
+    if request.param == 'pyarrow':
+        pytest.importorskip('pyarrow')
+    else:
+        pytest.importorskip('pandas')
+        monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    return request.param
+
+
+def test_csv_source_reads_labeled_rows_in_steps(tmp_path, csv_parser):
+    source = CSVDatasetSource(write_csv(tmp_path / 'train.csv', IMAGES, LABELS), chunk_rows=8)
+    assert source.has_labels and source.img_size == 28
+
+    images, labels = source.read(12)
+    assert images.dtype == np.uint8
+    np.testing.assert_array_equal(images, IMAGES[:12])
+    np.testing.assert_array_equal(labels, LABELS[:12])
+    images, labels = source.read()
+    np.testing.assert_array_equal(images, IMAGES[12:])
+    np.testing.assert_array_equal(labels, LABELS[12:])
+    assert source.exhausted and source.num_read == 30
+
+
+def test_csv_source_without_labels(tmp_path, csv_parser):
+    source = CSVDatasetSource(write_csv(tmp_path / 'test.csv', IMAGES[:5], trailing_newline=False))
+    images, labels = source.read()
+    assert labels is None
+    np.testing.assert_array_equal(images, IMAGES[:5])
+
+
+def test_count_csv_rows(tmp_path):
+    assert count_csv_rows(write_csv(tmp_path / 'a.csv', IMAGES[:4], LABELS[:4])) == 4
+    assert count_csv_rows(write_csv(tmp_path / 'b.csv', IMAGES[:4], trailing_newline=False), chunk_size=7) == 4
+
+
+def test_loader_reads_only_the_requested_csv_rows(idx_loader, tmp_path):
+    data = idx_loader.load_csv_dataset(str(write_csv(tmp_path / 'train.csv', IMAGES, LABELS)), max_rows=6)
+    np.testing.assert_array_equal(data['labels'], LABELS[:6])
+    np.testing.assert_allclose(data['features'], IMAGES[:6].reshape(6, -1) / 255.0, rtol=1e-6)
@@ -0,0 +1,95 @@
+"""Per-request phase timing and its Server-Timing headers"""
+import re
+import time
+
+import numpy as np
+import pytest
+
+from request_timing import RequestTimer
+
+
+def parse_header(value):
+    return {name: float(duration) for name, duration in re.findall(r'(\w+);dur=([\d.]+)', value)}
+
+
+def test_untimed_requests_have_no_phases():
+    timer = RequestTimer()
+    timer.begin()
+    assert not timer.active()
+    with timer.phase('compute'):
+        pass
+    assert timer.finish('/a') is None
+    assert timer.breakdown() == {}
+
+
+def test_phases_add_up_without_nesting():
+    timer = RequestTimer()
+    timer.begin(requested=True)
+    with timer.phase('parse'):
+        time.sleep(0.01)
+        # Inside an open phase: charged to parse
+        with timer.phase('compute'):
+            time.sleep(0.01)
+    with timer.phase('compute'):
+        time.sleep(0.01)
+    time.sleep(0.01)
+    timings = parse_header(timer.finish('/a'))
+
+    assert list(timings) == ['parse', 'compute', 'other', 'total']
+    assert timings['parse'] >= 20 and 10 <= timings['compute'] < 20 and timings['other'] >= 10
+    assert timings['total'] == pytest.approx(timings['parse'] + timings['compute'] + timings['other'], abs=0.01)
+    assert not timer.active()
+
+
+def test_breakdown_keeps_the_newest_requests_per_route():
+    timer = RequestTimer(enabled=True, history=2)
+    for route in ('/a', '/a', '/a', '/b'):
+        timer.begin()
+        timer.finish(route)
+    breakdown = timer.breakdown()
+    assert {route: entry['requests'] for route, entry in breakdown.items()} == {'/a': 2, '/b': 1}
+    assert set(breakdown['/a']['total_ms']) == {'mean', 'p50', 'p95', 'max'}
+    assert list(timer.breakdown('/b')) == ['/b']
+    assert timer.clear() == 3
+
+
+def test_kernels_wait_for_their_results_only_when_timed(api):
+    import jax
+    import jax.numpy as jnp
+
+    timer = RequestTimer()
+    kernel = timer.time_kernel(jax.jit(lambda x: x @ x))
+    timer.begin(requested=True)
+    kernel(jnp.ones((64, 64)))
+    assert 'compute' in parse_header(timer.finish('/a'))
+
+
+@pytest.fixture
+def batch(client, model_id):
+    assert client.post('/optimizer/init', json={'model_id': model_id}).status_code == 200
+    rng = np.random.default_rng(0)
+    return {'model_id': model_id, 'batch_features': rng.random((8, 784)).tolist(),
+            'batch_labels': rng.integers(0, 10, 8).tolist(), 'similarity_metric': 'dotProduct'}
+
+
+def test_requests_asking_for_timing_get_a_server_timing_header(client, batch):
+    client.post('/timing/clear')
+    assert 'Server-Timing' not in client.post('/train_step_optax', json=batch).headers
+
+    response = client.post('/train_step_optax', json=batch, headers={'X-Server-Timing': '1'})
+    assert response.status_code == 200
+    assert response.headers['Timing-Allow-Origin'] == '*'
+    timings = parse_header(response.headers['Server-Timing'])
+    assert {'parse', 'transfer', 'compute', 'convert', 'serialize', 'other', 'total'} <= set(timings)
+
+    breakdown = client.get('/timing', query_string={'route': '/train_step_optax'}).get_json()['routes']
+    assert breakdown['/train_step_optax']['requests'] == 1
+
+
+def test_enabled_timing_covers_every_request(client, batch):
+    assert client.post('/timing/config', json={'enabled': True}).get_json()['config']['enabled']
+    try:
+        assert 'Server-Timing' in client.post('/train_step_optax', json=batch).headers
+    finally:
+        client.post('/timing/config', json={'enabled': False})
+    assert 'Server-Timing' not in client.post('/train_step_optax', json=batch).headers
@@ -0,0 +1,70 @@
+"""Model state shared between workers: snapshots, locks and importing into a model"""
+import os
+
+import numpy as np
+
+from state_backend import LocalFileStateBackend, read_snapshot, write_snapshot
+
+
+def snapshot(revision, **arrays):
+    return {'arrays': arrays, 'meta': {'revision': revision}}
+
+
+def open_fds():
+    return len(os.listdir('/proc/self/fd'))
+
+
+def test_local_backend_round_trip(tmp_path):
+    backend = LocalFileStateBackend(str(tmp_path))
+    assert backend.revision('m') is None and not backend.exists('m')
+    with backend.lock('m'):
+        backend.save('m', snapshot(1, weights=np.ones((2, 3)), biases=np.zeros(2)))
+    with backend.lock('m', shared=True):
+        loaded = backend.load('m')
+    assert backend.revision('m') == 1 and backend.list_ids() == ['m']
+    np.testing.assert_array_equal(loaded['arrays']['weights'], np.ones((2, 3)))
+
+    # Arrays missing from a later snapshot are removed
+    with backend.lock('m'):
+        backend.save('m', snapshot(2, weights=np.zeros((2, 3))))
+    assert sorted(backend.load('m')['arrays']) == ['weights']
+
+
+def test_delete_closes_and_removes_the_lock_file(tmp_path):
+    backend = LocalFileStateBackend(str(tmp_path))
+    before = open_fds()
+    for i in range(5):
+        with backend.lock(f'm{i}'):
+            backend.save(f'm{i}', snapshot(1, weights=np.ones(2)))
+            backend.delete(f'm{i}')
+    assert open_fds() == before
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_other_workers_lock_a_recreated_model_through_its_new_file(tmp_path):
+    worker, other = LocalFileStateBackend(str(tmp_path)), LocalFileStateBackend(str(tmp_path))
+    with other.lock('m', shared=True):
+        pass
+    with worker.lock('m'):
+        worker.delete('m')
+    with worker.lock('m'):
+        worker.save('m', snapshot(1, weights=np.ones(2)))
+        # The other worker's open file was unlinked, so it must not lock that one
+        assert not other._is_current('m', other._lock_files['m'])
+        assert other._is_current('m', other._lock_file('m'))
+
+
+def test_imported_snapshot_keeps_training(api, client, model_id, tmp_path):
+    state = api.model_registry.get(model_id)
+    write_snapshot(tmp_path / model_id, api.export_model_state(state))
+    api.import_model_state(state, read_snapshot(tmp_path / model_id))
+    assert state['shadow_weights'] is None and state['accumulated_weight_gradients'] is None
+
+    rng = np.random.default_rng(0)
+    response = client.post('/train_step', json={
+        'model_id': model_id, 'weights': np.asarray(state['weights']).tolist(),
+        'biases': np.asarray(state['biases']).tolist(), 'batch_features': rng.random((4, 784)).tolist(),
+        'batch_labels': [0, 1, 2, 3], 'similarity_metric': 'dotProduct', 'activation_function': 'softmax'
+    })
+    assert response.status_code == 200, response.get_json()
+    assert state['shadow_weights'] is not None and state['accumulated_weight_gradients'] is not None
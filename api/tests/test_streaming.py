@@ -0,0 +1,57 @@
+"""Streaming forward passes over a dataset slice"""
+import json
+
+import numpy as np
+
+
+def read_lines(response):
+    return [json.loads(line) for line in b''.join(response.response).decode().splitlines()]
+
+
+def test_dataset_slice_streams_in_chunks(api, client, model_id, idx_loader, monkeypatch):
+    monkeypatch.setattr(api, 'dataset_loader', idx_loader)
+    response = client.post('/batch_forward/stream', json={
+        'model_id': model_id, 'dataset_name': 'mnist_original', 'start_idx': 5, 'count': 20, 'chunk_size': 8
+    })
+    assert response.status_code == 200
+    lines = read_lines(response)
+    assert [line['start'] for line in lines[:-1]] == [5, 13, 21]
+    assert lines[-1] == {'done': True, 'num_samples': 20}
+
+    dataset = idx_loader.get_dataset('mnist_original', 'test')
+    weights = np.asarray(api.model_registry.get(model_id)['weights'])
+    results = [result for line in lines[:-1] for result in line['results']]
+    assert [result['index'] for result in results] == list(range(5, 25))
+    assert [result['label'] for result in results] == dataset['labels'][5:25].tolist()
+    assert [result['predicted_class'] for result in results] == np.argmax(
+        np.asarray(dataset['features'][5:25]) @ weights.T, axis=1).tolist()
+
+
+def test_stream_survives_a_train_step_on_the_same_model(api, client, model_id, idx_loader, monkeypatch):
+    monkeypatch.setattr(api, 'dataset_loader', idx_loader)
+    # A copy: a host view of the device array would keep the train step from donating it
+    weights = np.array(api.model_registry.get(model_id)['weights'])
+    assert client.post('/optimizer/init', json={'model_id': model_id, 'learning_rate': 0.5}).status_code == 200
+
+    # Nothing is computed until the body is read, after the model lock is released
+    response = client.post('/batch_forward/stream', json={
+        'model_id': model_id, 'dataset_name': 'mnist_original', 'granularity': 'sample', 'chunk_size': 16
+    }, buffered=False)
+    dataset = idx_loader.get_dataset('mnist_original', 'test')
+    step = client.post('/train_step_optax', json={
+        'model_id': model_id, 'batch_features': dataset['features'][:8].tolist(),
+        'batch_labels': dataset['labels'][:8].tolist(), 'similarity_metric': 'dotProduct'
+    })
+    assert step.status_code == 200, step.get_json()
+
+    lines = read_lines(response)
+    assert lines[-1] == {'done': True, 'num_samples': 50}
+    assert [line['predicted_class'] for line in lines[:-1]] == np.argmax(
+        np.asarray(dataset['features']) @ weights.T, axis=1).tolist()
+
+
+def test_dataset_load_errors_are_reported(api, client, model_id, idx_loader, monkeypatch):
+    monkeypatch.setattr(api, 'dataset_loader', idx_loader)
+    response = client.post('/batch_forward/stream', json={'model_id': model_id, 'dataset_name': 'no_such_dataset'})
+    assert response.status_code == 400
+    assert not response.get_json()['success']
@@ -0,0 +1,38 @@
+"""Hyperparameter sweeps: stacked variants trained by one program per metric, within the configured limits"""
+import pytest
+
+
+def sweep(client, **options):
+    return client.post('/training/sweep', json=dict({'dataset_name': 'mnist_original', 'steps': 4, 'eval_every': 2,
+                                                     'batch_size': 4, 'eval_samples': 10}, **options))
+
+
+def test_sweep_trains_every_variant(api, client, idx_loader, monkeypatch):
+    monkeypatch.setattr(api, 'dataset_loader', idx_loader)
+    response = sweep(client, learning_rates=[0.01, 0.1], sparsity_ratios=[0.2, 0.5],
+                     similarity_metrics=['dotProduct', 'euclidean'])
+    assert response.status_code == 200, response.get_json()
+    result = response.get_json()
+    assert result['sweep']['num_variants'] == 8
+    assert result['sweep']['eval_steps'] == [2, 4]
+    assert {(variant['learning_rate'], variant['sparsity_ratio'], variant['similarity_metric'])
+            for variant in result['variants']} == {(lr, sparsity, metric) for lr in (0.01, 0.1)
+                                                   for sparsity in (0.2, 0.5) for metric in ('dotProduct', 'euclidean')}
+    assert all(len(variant['loss_curve']) == 4 and len(variant['accuracy_curve']) == 2
+               for variant in result['variants'])
+    assert result['best']['final_accuracy'] == max(variant['final_accuracy'] for variant in result['variants'])
+
+
+@pytest.mark.parametrize('options, error', [
+    ({'learning_rates': [0.1, 0.2, 0.3]}, '3 variants requested'),
+    ({'steps': 60, 'similarity_metrics': ['dotProduct', 'cosine']}, 'exceeds the limit'),
+    ({'learning_rates': []}, 'at least one'),
+    ({'similarity_metrics': []}, 'at least one'),
+    ({'batch_size': 0}, 'batch_size'),
+])
+def test_oversized_or_empty_sweeps_are_rejected(api, client, monkeypatch, options, error):
+    monkeypatch.setattr(api.config, 'SWEEP_MAX_VARIANTS', 2)
+    monkeypatch.setattr(api.config, 'SWEEP_MAX_VARIANT_STEPS', 100)
+    response = sweep(client, **options)
+    assert response.status_code == 400
+    assert error in response.get_json()['error']
@@ -0,0 +1,134 @@
+"""Traffic recordings: request lines, sessions shared between processes, and reading them back for replay"""
+import gzip
+import json
+
+import numpy as np
+import pytest
+
+import replay
+from traffic_recording import SESSION_FILE, TrafficRecorder, describe_body
+
+
+def read_lines(path):
+    with gzip.open(path, 'rt') as f:
+        return [json.loads(line) for line in f]
+
+
+def record(recorder, path='/forward', body=None):
+    recorder.record('POST', path, path, '', 200, 0.01, 100, 200, body)
+
+
+def test_bodies_are_described_by_scalars_and_array_shapes():
+    body = {'model_id': 'm', 'learning_rate': 0.1, 'flag': True, 'nested': {'x': 1},
+            'batch_features': [[0.5] * 3] * 2, 'batch_labels': [1, 2], 'empty': []}
+    assert describe_body(body) == {
+        'params': {'model_id': 'm', 'learning_rate': 0.1, 'flag': True},
+        'arrays': {'batch_features': {'shape': [2, 3], 'dtype': 'float'},
+                   'batch_labels': {'shape': [2], 'dtype': 'int'}, 'empty': {'shape': [0], 'dtype': 'float'}}
+    }
+    assert describe_body([1, 2]) == {'params': {}, 'arrays': {}}
+
+
+@pytest.mark.parametrize('bodies', [False, True])
+def test_recording_writes_a_header_and_one_line_per_request(tmp_path, bodies):
+    recorder = TrafficRecorder(str(tmp_path))
+    record(recorder)
+    started = recorder.start_local(bodies=bodies, name='run')
+    body = {'features': [0.0] * 4, 'similarity_metric': 'cosine'}
+    record(recorder, body=body)
+    record(recorder, '/model/weights')
+    with pytest.raises(ValueError, match='still running'):
+        recorder.delete(started['recording_id'])
+    stopped = recorder.close()
+
+    assert stopped['requests'] == 2 and recorder.close() is None
+    header, *lines = read_lines(stopped['path'])
+    assert header['recording']['recording_id'] == started['recording_id']
+    assert header['recording']['name'] == 'run' and header['recording']['session_id'] is None
+    assert [line['path'] for line in lines] == ['/forward', '/model/weights']
+    assert lines[0]['params'] == {'similarity_metric': 'cosine'}
+    assert lines[0]['arrays'] == {'features': {'shape': [4], 'dtype': 'float'}}
+    assert ('body' in lines[0]) == bodies
+    assert [recording['recording_id'] for recording in recorder.list()] == [started['recording_id']]
+    recorder.delete(started['recording_id'])
+    assert recorder.list() == []
+
+
+def test_sessions_are_shared_through_the_directory(tmp_path):
+    first, second = TrafficRecorder(str(tmp_path)), TrafficRecorder(str(tmp_path))
+    started = first.start(name='shared')
+    with pytest.raises(ValueError, match='already running'):
+        second.start()
+    session = second.session()
+    assert session['session_id'] == started['session_id'] and session['name'] == 'shared'
+
+    second.sync()
+    assert second.status()['session_id'] == session['session_id']
+    second.sync()
+    record(first)
+    record(second)
+
+    # A process exiting closes only its own recording
+    closed = second.close()
+    assert first.session() is not None and first.active
+    second.sync()
+    assert second.status()['recording_id'] != closed['recording_id']
+
+    stopped = first.stop()
+    assert not (tmp_path / SESSION_FILE).exists()
+    second.sync()
+    assert not second.active
+    assert first.stop() is None
+    headers = [read_lines(path)[0]['recording'] for path in tmp_path.glob('*.jsonl.gz')]
+    assert len(headers) == 3 and {header['session_id'] for header in headers} == {session['session_id']}
+    assert stopped['requests'] == 1
+
+
+def test_a_process_only_recording_is_left_to_its_process(tmp_path):
+    local, other = TrafficRecorder(str(tmp_path)), TrafficRecorder(str(tmp_path))
+    startup = local.start_local(name='startup')
+    other.start()
+    local.sync()
+    assert local.status()['recording_id'] == startup['recording_id']
+
+    # Stopping the session from a process that is not recording reports the session
+    other.close()
+    assert other.stop()['session_id'] is not None
+    local.sync()
+    assert local.active
+
+
+def test_recorded_requests_replay_in_timestamp_order(api, client, model_id, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, 'traffic_recorder', TrafficRecorder(str(tmp_path)))
+    started = client.post('/traffic/recording/start', json={'name': 'api'})
+    assert started.status_code == 200, started.get_json()
+    assert client.post('/traffic/recording/start').status_code == 400
+
+    client.get('/models')
+    client.post('/forward', json={'weights': np.zeros((10, 4)).tolist(), 'biases': [0.0] * 10,
+                                  'features': [1.0, 0.0, 0.0, 0.0], 'similarity_metric': 'dotProduct',
+                                  'activation_function': 'softmax'})
+    client.get(f'/training/metrics?model_id={model_id}')
+    client.get('/traffic/recording/status')
+    stopped = client.post('/traffic/recording/stop').get_json()['recording']
+    assert client.post('/traffic/recording/stop').status_code == 400
+
+    headers, entries = replay.read_recordings([stopped['path']])
+    assert headers[0]['name'] == 'api'
+    assert [replay.entry_key(entry) for entry in entries] == ['GET /models', 'POST /forward',
+                                                             'GET /training/metrics']
+    assert replay.referenced_models(entries) == [None, model_id]
+    body = replay.BodyBuilder(np.random.default_rng(0)).body(entries[1])
+    assert np.shape(body['weights']) == (10, 4) and body['similarity_metric'] == 'dotProduct'
+
+
+def test_replay_comparison_needs_a_significant_slowdown():
+    rng = np.random.default_rng(0)
+    baseline = {'latencies_ms': {'POST /forward': rng.normal(10, 1, 200).tolist(),
+                                 'GET /models': rng.normal(5, 1, 200).tolist()}}
+    current = {'latencies_ms': {'POST /forward': rng.normal(15, 1, 200).tolist(),
+                                'GET /models': rng.normal(5, 1, 200).tolist()}}
+    comparison = replay.compare(baseline, current, threshold=0.1, min_delta=1.0, alpha=0.01)
+    assert [row['route'] for row in comparison['regressions']] == ['POST /forward']
+    assert comparison['regressions'][0]['p_value'] < 1e-6
+    assert replay.ks_test([1.0, 2.0, 3.0], [1.0, 2.0, 3.0]) == (0.0, 1.0)
@@ -0,0 +1,268 @@
+"""Recording of incoming API requests to compact local logs, for replay with replay.py.
+
+A recording is a gzipped JSON-lines file ``directory/<recording_id>.jsonl.gz``.
+Its first line describes the recording; every other line is one request:
+
+    {"ts": 1700000000.123, "method": "POST", "path": "/train_step_optax", "route": "/train_step_optax",
+     "query": "", "status": 200, "duration_ms": 12.3, "request_bytes": 40211, "response_bytes": 163530,
+     "params": {"similarity_metric": "dotProduct"},
+     "arrays": {"batch_features": {"shape": [32, 784], "dtype": "float"}, ...},
+     "body": {...}}
+
+Scalar JSON fields are kept as ``params`` and list fields as their ``arrays``
+shape and element type, which is enough to replay requests with synthetic
+tensors of the same size. ``body`` (the whole JSON body) is only stored when
+bodies are recorded. Lines are written by a background thread, so recording
+adds little more than a shape walk to each request.
+
+Each process records its own file (gunicorn workers included); timestamps are
+absolute, so replay.py can merge the files of one session. A session started
+or stopped through any process is shared through ``directory/.session.json``:
+processes following it (see follow_sessions) start and stop their own
+recordings to match within a second.
+"""
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SESSION_FILE = '.session.json'
+
+
+def array_spec(value: List[Any]) -> Dict[str, Any]:
+    """Shape and element type of a (rectangular) nested list, from its first elements"""
+    shape = []
+    while isinstance(value, list):
+        shape.append(len(value))
+        if not value:
+            return {'shape': shape, 'dtype': 'float'}
+        value = value[0]
+    return {'shape': shape, 'dtype': 'int' if isinstance(value, int) and not isinstance(value, bool) else 'float'}
+
+
+def describe_body(body: Any) -> Dict[str, Any]:
+    """Scalar fields of a JSON object body, and the shapes of its list fields"""
+    if not isinstance(body, dict):
+        return {'params': {}, 'arrays': {}}
+    params, arrays = {}, {}
+    for key, value in body.items():
+        if isinstance(value, list):
+            arrays[key] = array_spec(value)
+        elif not isinstance(value, dict):
+            params[key] = value
+    return {'params': params, 'arrays': arrays}
+
+
+class TrafficRecorder:
+    """Writes one line per request to the active recording (at most one per process)"""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self._recording: Optional[Dict[str, Any]] = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='traffic-recorder')
+        self._follower: Optional[threading.Thread] = None
+
+    @property
+    def active(self) -> bool:
+        return self._recording is not None
+
+    def path(self, recording_id: str) -> Path:
+        path = self.directory / f"{recording_id}.jsonl.gz"
+        if '/' in recording_id or recording_id.startswith('.') or not path.exists():
+            raise KeyError(f"Unknown recording: {recording_id}")
+        return path
+
+    def session(self) -> Optional[Dict[str, Any]]:
+        """The directory's recording session, or None if none is running"""
+        try:
+            with open(self.directory / SESSION_FILE, 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def start(self, bodies: bool = False, name: Optional[str] = None) -> Dict[str, Any]:
+        """Start a recording session: this process records at once, processes following sessions shortly after"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        session = {'session_id': uuid.uuid4().hex[:12], 'name': name, 'bodies': bodies, 'started_at': time.time()}
+        try:
+            fd = os.open(self.directory / SESSION_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        except FileExistsError:
+            running = self.session()
+            raise ValueError("A recording session is already running" + (f": {running['session_id']}" if running else ''))
+        with os.fdopen(fd, 'w') as f:
+            json.dump(session, f)
+        try:
+            return self._start_local(session)
+        except Exception:
+            (self.directory / SESSION_FILE).unlink(missing_ok=True)
+            raise
+
+    def start_local(self, bodies: bool = False, name: Optional[str] = None) -> Dict[str, Any]:
+        """Record in this process only, outside any session (e.g. from startup)"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        return self._start_local({'session_id': None, 'name': name, 'bodies': bodies})
+
+    def _start_local(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        with self._lock:
+            if self._recording is not None:
+                if session['session_id'] is not None and self._recording['session_id'] == session['session_id']:
+                    return dict(self._recording)
+                raise ValueError(f"Recording {self._recording['recording_id']} is already running")
+            recording_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+            bodies = session['bodies']
+            recording = {
+                'recording_id': recording_id,
+                'session_id': session['session_id'],
+                'name': session['name'],
+                'bodies': bodies,
+                'pid': os.getpid(),
+                'started_at': time.time(),
+                'requests': 0
+            }
+            self._file = gzip.open(self.directory / f"{recording_id}.jsonl.gz", 'wt')
+            self._write(self._file, {'recording': {key: value for key, value in recording.items() if key != 'requests'}})
+            self._recording = recording
+        logger.info(f"Started traffic recording {recording_id} (bodies={bodies})")
+        return dict(recording)
+
+    def record(self, method: str, path: str, route: str, query: str, status: int, duration: float,
+               request_bytes: int, response_bytes: int, body: Any):
+        recording = self._recording
+        if recording is None:
+            return
+        line = dict(
+            ts=time.time() - duration,
+            method=method,
+            path=path,
+            route=route,
+            query=query,
+            status=status,
+            duration_ms=round(duration * 1000, 3),
+            request_bytes=request_bytes,
+            response_bytes=response_bytes,
+            **describe_body(body)
+        )
+        if recording['bodies'] and body is not None:
+            line['body'] = body
+        with self._lock:
+            if self._recording is not recording:
+                return
+            recording['requests'] += 1
+            self._executor.submit(self._write, self._file, line)
+
+    @staticmethod
+    def _write(file, line: Dict[str, Any]):
+        try:
+            file.write(json.dumps(line, separators=(',', ':')) + '\n')
+        except Exception as e:
+            logger.warning(f"Dropped a traffic recording line: {e}")
+
+    def stop(self) -> Optional[Dict[str, Any]]:
+        """End the recording session and this process's recording; processes following the session stop theirs.
+
+        Returns this process's recording, the session if this process was not
+        recording, or None if neither was running.
+        """
+        session = self.session()
+        (self.directory / SESSION_FILE).unlink(missing_ok=True)
+        recording = self.close()
+        if recording is None and session is not None:
+            return dict(session, stopped_at=time.time())
+        return recording
+
+    def close(self) -> Optional[Dict[str, Any]]:
+        """Finish this process's recording, leaving the session to other processes; returns it, or None"""
+        with self._lock:
+            recording, file = self._recording, self._file
+            if recording is None:
+                return None
+            self._recording, self._file = None, None
+        try:
+            # Queued lines are written before the file is closed
+            self._executor.submit(file.close).result()
+        except RuntimeError:
+            # At interpreter exit the writer has already drained its queue and stopped
+            file.close()
+        recording['stopped_at'] = time.time()
+        logger.info(f"Stopped traffic recording {recording['recording_id']} ({recording['requests']} requests)")
+        return dict(recording, path=str(self.directory / f"{recording['recording_id']}.jsonl.gz"))
+
+    def sync(self):
+        """Start or stop this process's recording to match the directory's session"""
+        try:
+            with open(self.directory / SESSION_FILE, 'r') as f:
+                session = json.load(f)
+        except FileNotFoundError:
+            session = None
+        except json.JSONDecodeError:
+            # Being written by the process starting it
+            return
+        recording = self._recording
+        current = recording['session_id'] if recording is not None else None
+        if session is not None and session['session_id'] != current:
+            if recording is not None and current is None:
+                # A recording of this process only (e.g. from startup) is left running
+                return
+            if recording is not None:
+                self.close()
+            self._start_local(session)
+        elif session is None and current is not None:
+            self.close()
+
+    def follow_sessions(self, interval: float = 1.0):
+        """Keep this process's recording in step with the directory's session, from a background thread.
+
+        Called by the server entry points, so a session started or stopped
+        through any gunicorn worker covers all of them.
+        """
+        with self._lock:
+            if self._follower is not None:
+                return
+            self._follower = threading.Thread(target=self._follow, args=(interval,), daemon=True,
+                                              name='traffic-session')
+        self._follower.start()
+
+    def _follow(self, interval: float):
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.warning(f"Could not follow the traffic recording session: {e}")
+            time.sleep(interval)
+
+    def status(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return dict(self._recording) if self._recording is not None else None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Recordings in the directory, newest first"""
+        if not self.directory.exists():
+            return []
+        active = self._recording['recording_id'] if self._recording is not None else None
+        recordings = []
+        for path in self.directory.glob('*.jsonl.gz'):
+            recording_id = path.name[:-len('.jsonl.gz')]
+            recordings.append({
+                'recording_id': recording_id,
+                'path': str(path),
+                'bytes': path.stat().st_size,
+                'modified_at': path.stat().st_mtime,
+                'active': recording_id == active
+            })
+        return sorted(recordings, key=lambda recording: recording['modified_at'], reverse=True)
+
+    def delete(self, recording_id: str):
+        path = self.path(recording_id)
+        if self._recording is not None and self._recording['recording_id'] == recording_id:
+            raise ValueError(f"Recording {recording_id} is still running")
+        path.unlink()